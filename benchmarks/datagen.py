@@ -0,0 +1,172 @@
+"""
+Gerador de dados sintéticos para os benchmarks.
+
+Cria (ou completa) uma cópia descartável do banco com N pacientes, médicos e
+atestados: CPFs válidos, nomes com acentuação, empresas, cargos e CIDs comuns.
+A geração é determinística para a mesma semente.
+
+Uso:
+    python -m benchmarks.datagen /tmp/bench.db --pacientes 100000 --medicos 300 --atestados 300000
+"""
+import argparse
+import os
+import random
+import shutil
+import time
+from datetime import date, timedelta
+
+from core import database
+from core.validation import fold_name
+
+PRIMEIROS_NOMES = (
+    "João", "José", "Antônio", "Francisco", "Sebastião", "Luís", "Márcio", "Fábio", "Vinícius", "Caio",
+    "Otávio", "Ícaro", "Cláudio", "Mário", "Raí", "Maria", "Ana", "Conceição", "Júlia", "Luíza",
+    "Cláudia", "Vitória", "Letícia", "Lúcia", "Patrícia", "Beatriz", "Mônica", "Flávia", "Inês", "Fernanda",
+)
+SOBRENOMES = (
+    "Silva", "Souza", "Araújo", "Gonçalves", "Conceição", "Ribeiro", "Simões", "Magalhães", "Brandão",
+    "Sant'Ana", "Falcão", "Assunção", "Lima", "Pereira", "Gusmão", "Damásio", "Estêvão", "Romão",
+    "Guimarães", "Conrado", "Barbosa", "Jordão", "Nóbrega", "Valadão", "Peçanha", "Camões",
+)
+EMPRESAS = (
+    "Construtora Horizonte LTDA", "Supermercados Pão & Cia", "Transportes Águia S.A.", "Hospital São Lucas",
+    "Metalúrgica Três Irmãos", "Comércio de Alimentos Boa Esperança", "Serviços Gerais Planalto",
+    "Indústria Têxtil Paraná", "Escola Técnica Brasília", "Clínica Veterinária Amigo Fiel",
+)
+CARGOS = (
+    "Auxiliar Administrativo", "Operador de Caixa", "Motorista", "Técnico de Enfermagem", "Pedreiro",
+    "Analista Financeiro", "Vendedor", "Auxiliar de Limpeza", "Eletricista", "Recepcionista",
+)
+CIDS = ("J11", "M54.5", "F32.9", "A09", "Z00", "K29.7", "S93.4", "R51", "J06.9", "M79.1", "F41.1", "B34.9")
+UFS = ("DF", "GO", "SP", "RJ", "MG", "BA", "PR", "RS")
+TIPOS_REGISTRO = ("CRM", "CRM", "CRM", "CRO", "RMS")
+TERMOS_CID = (
+    "Infecção", "aguda", "crônica", "dor", "lombar", "cervical", "fratura", "traumatismo", "neoplasia",
+    "maligna", "benigna", "transtorno", "síndrome", "doença", "pulmão", "fígado", "rim", "coração",
+    "joelho", "ombro", "coluna", "pele", "olho", "ouvido", "vírus", "bactéria", "lesão", "não especificada",
+)
+
+
+def cpf_valido(rng):
+    """
+    Gera um CPF (11 dígitos) com dígitos verificadores válidos.
+    """
+    digits = [rng.randrange(10) for _ in range(9)]
+    for length in (9, 10):
+        total = sum(d * w for d, w in zip(digits, range(length + 1, 1, -1)))
+        remainder = total % 11
+        digits.append(0 if remainder < 2 else 11 - remainder)
+    return ''.join(map(str, digits))
+
+def nome_completo(rng, index):
+    # O índice garante nomes distintos mesmo com poucas combinações de nomes/sobrenomes
+    return f"{rng.choice(PRIMEIROS_NOMES)} {rng.choice(SOBRENOMES)} {rng.choice(SOBRENOMES)} {index:06d}"
+
+def _unique_cpfs(rng, count):
+    seen = set()
+    while len(seen) < count:
+        seen.add(cpf_valido(rng))
+    return list(seen)
+
+def generate_database(path, pacientes=10000, medicos=200, atestados=30000, seed=42, source=None):
+    """
+    Cria o banco em 'path' (copiando 'source', se informado) e o preenche com dados sintéticos.
+    Retorna um dicionário com as quantidades geradas e o tempo gasto.
+    """
+    started = time.perf_counter()
+    rng = random.Random(seed)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    if source:
+        shutil.copyfile(source, path)
+
+    database.configure_database(path)
+    database.create_tables()
+    conn = database.get_db_connection()
+
+    with database.db_transaction() as cursor:
+        cursor.executemany(
+            "INSERT OR IGNORE INTO pacientes (nome_completo, cpf, cargo, empresa, nome_busca) VALUES (?, ?, ?, ?, ?)",
+            ((nome, cpf, rng.choice(CARGOS), rng.choice(EMPRESAS), fold_name(nome))
+             for nome, cpf in ((nome_completo(rng, i), cpf) for i, cpf in enumerate(_unique_cpfs(rng, pacientes))))
+        )
+        cursor.executemany(
+            "INSERT OR IGNORE INTO medicos (nome_completo, tipo_crm, crm, uf_crm) VALUES (?, ?, ?, ?)",
+            ((f"Dr(a). {nome_completo(rng, i)}", rng.choice(TIPOS_REGISTRO), str(10000 + i), rng.choice(UFS))
+             for i in range(medicos))
+        )
+        cursor.execute("SELECT MIN(id), MAX(id) FROM pacientes")
+        min_paciente, max_paciente = cursor.fetchone()
+        cursor.execute("SELECT MIN(id), MAX(id) FROM medicos")
+        min_medico, max_medico = cursor.fetchone()
+
+        inicio = date(2020, 1, 1)
+        def linhas_atestados():
+            for _ in range(atestados):
+                dia = inicio + timedelta(days=rng.randrange(6 * 365))
+                yield (
+                    rng.randint(min_paciente, max_paciente),
+                    rng.randint(min_medico, max_medico),
+                    dia.isoformat(),
+                    rng.choice((1, 1, 1, 2, 3, 5, 7, 10, 15, 30)),
+                    rng.choice(CIDS),
+                    (dia + timedelta(days=rng.randrange(1, 5))).isoformat(),
+                )
+        cursor.executemany(
+            "INSERT INTO atestados (paciente_id, medico_id, data_atestado, qtd_dias_atestado, codigo_cid, data_homologacao) VALUES (?, ?, ?, ?, ?, ?)",
+            linhas_atestados()
+        )
+    conn.execute("ANALYZE")
+
+    return {
+        "path": path,
+        "pacientes": pacientes,
+        "medicos": medicos,
+        "atestados": atestados,
+        "seed": seed,
+        "elapsed_s": round(time.perf_counter() - started, 3),
+    }
+
+
+def generate_cid_catalog(path, categorias_por_letra=100, seed=42):
+    """
+    Grava um catálogo CID-10 sintético no formato de data/cid10.csv (cerca de 14 mil
+    códigos: categorias com até dez subcategorias), incluindo os CIDs de CIDS.
+    Retorna o caminho do arquivo.
+    """
+    rng = random.Random(seed)
+    entries = {}
+    for letter in "ABCDEFGHIJKLMNOPQRSTUVWXYZ":
+        for number in range(categorias_por_letra):
+            category = f"{letter}{number:02d}"
+            entries[category] = " ".join(rng.sample(TERMOS_CID, 4)).capitalize()
+            for subcategory in range(rng.randrange(10)):
+                entries[f"{category}.{subcategory}"] = " ".join(rng.sample(TERMOS_CID, 5)).capitalize()
+    for code in CIDS:
+        entries.setdefault(code, " ".join(rng.sample(TERMOS_CID, 5)).capitalize())
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("codigo;descricao\n")
+        for code in sorted(entries, key=lambda code: code.replace(".", "")):
+            f.write(f"{code};{entries[code]}\n")
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera um banco de dados sintético para benchmarks.")
+    parser.add_argument("destino", help="Arquivo .db a ser criado (será sobrescrito)")
+    parser.add_argument("--pacientes", type=int, default=10000)
+    parser.add_argument("--medicos", type=int, default=200)
+    parser.add_argument("--atestados", type=int, default=30000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--origem", help="Banco a ser copiado antes da geração (ex.: data/homologacao.db)")
+    args = parser.parse_args(argv)
+
+    info = generate_database(args.destino, args.pacientes, args.medicos, args.atestados, args.seed, args.origem)
+    print(f"Banco gerado em {info['path']} em {info['elapsed_s']}s "
+          f"({info['pacientes']} pacientes, {info['medicos']} médicos, {info['atestados']} atestados).")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
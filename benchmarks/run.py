@@ -0,0 +1,102 @@
+"""
+Executa os cenários de benchmark e grava os resultados em JSON.
+
+Uso:
+    python -m benchmarks.run --pacientes 100000 --atestados 300000 --output resultados.json
+    python -m benchmarks.run --baseline baseline.json --tolerancia 0.25
+
+Com --baseline, compara o p50 de cada cenário com o resultado de referência e
+termina com código 1 se algum ficou mais lento que a tolerância permite.
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import sys
+import tempfile
+import time
+
+from benchmarks.datagen import generate_database
+from benchmarks.scenarios import SCENARIOS, BenchmarkContext, available_scenarios
+
+
+def compare(results, baseline, tolerance, min_delta_ms=0.05):
+    """
+    Retorna a lista de regressões: (cenário, p50 de referência, p50 atual, variação).
+    Diferenças absolutas abaixo de min_delta_ms são ruído de medição e não contam.
+    """
+    regressions = []
+    for name, values in results["results"].items():
+        reference = baseline.get("results", {}).get(name)
+        if not reference or not reference.get("p50_ms"):
+            continue
+        change = values["p50_ms"] / reference["p50_ms"] - 1
+        if change > tolerance and values["p50_ms"] - reference["p50_ms"] >= min_delta_ms:
+            regressions.append((name, reference["p50_ms"], values["p50_ms"], change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks do Sistema de Homologação.")
+    parser.add_argument("--pacientes", type=int, default=10000)
+    parser.add_argument("--medicos", type=int, default=200)
+    parser.add_argument("--atestados", type=int, default=30000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeticoes", type=int, default=200, help="Repetições por cenário de consulta")
+    parser.add_argument("--cenarios", default=",".join(available_scenarios()),
+                        help=f"Lista separada por vírgulas ({', '.join(SCENARIOS)})")
+    parser.add_argument("--output", help="Arquivo JSON de resultados (padrão: saída padrão)")
+    parser.add_argument("--baseline", help="Resultados de referência para detectar regressões")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="Aumento relativo do p50 aceito (0.25 = 25%%)")
+    parser.add_argument("--delta-minimo-ms", type=float, default=0.05,
+                        help="Diferença absoluta mínima do p50 para considerar regressão")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="homologacao_bench_") as work_dir:
+        db_path = os.path.join(work_dir, "homologacao_bench.db")
+        print(f"Gerando banco sintético ({args.pacientes} pacientes, {args.atestados} atestados)...", file=sys.stderr)
+        dataset = generate_database(db_path, args.pacientes, args.medicos, args.atestados, args.seed)
+
+        ctx = BenchmarkContext(db_path, work_dir, repeat=args.repeticoes, seed=args.seed)
+        for name in [n.strip() for n in args.cenarios.split(",") if n.strip()]:
+            print(f"Cenário: {name}", file=sys.stderr)
+            started = time.perf_counter()
+            SCENARIOS[name](ctx)
+            print(f"  concluído em {time.perf_counter() - started:.2f}s", file=sys.stderr)
+
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "dataset": {k: dataset[k] for k in ("pacientes", "medicos", "atestados", "seed")},
+            "dataset_generation_s": dataset["elapsed_s"],
+            "repeat": args.repeticoes,
+        },
+        "results": ctx.stats.snapshot(),
+    }
+
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"Resultados gravados em {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerancia, args.delta_minimo_ms)
+        for name, before, after, change in regressions:
+            print(f"REGRESSÃO {name}: p50 {before:.3f} ms -> {after:.3f} ms (+{change:.0%})", file=sys.stderr)
+        if regressions:
+            return 1
+        print("Nenhuma regressão acima da tolerância.", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,217 @@
+"""
+Cenários de medição. Cada cenário recebe o contexto (BenchmarkContext) e registra
+as durações de cada repetição em um StageStats, usando o nome do cenário como etapa.
+"""
+import csv
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import date, timedelta
+
+from core import database, services
+from core.instrumentation import StageStats
+from core.validation import OverlapError, format_cpf
+
+MAIN_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+
+
+class BenchmarkContext:
+    """
+    Estado compartilhado pelos cenários: banco sintético, pasta temporária,
+    amostras de chaves existentes e o agregador de tempos.
+    """
+
+    def __init__(self, db_path, work_dir, repeat=200, seed=42):
+        self.db_path = db_path
+        self.work_dir = work_dir
+        self.repeat = repeat
+        self.rng = random.Random(seed)
+        self.stats = StageStats(max_samples=100000)
+        database.configure_database(db_path)
+        with database.db_cursor() as cursor:
+            cursor.execute("SELECT cpf, nome_completo FROM pacientes ORDER BY random() LIMIT 500")
+            self.patients = [tuple(row) for row in cursor.fetchall()]
+            cursor.execute("SELECT tipo_crm, crm, nome_completo, uf_crm FROM medicos ORDER BY random() LIMIT 100")
+            self.doctors = [tuple(row) for row in cursor.fetchall()]
+
+    def measure(self, name, func, repeat=None):
+        for _ in range(repeat or self.repeat):
+            started = time.perf_counter()
+            func()
+            self.stats.record(name, time.perf_counter() - started)
+
+    def random_date(self):
+        # Datas espalhadas por décadas: poucas declarações sintéticas se sobrepõem
+        return (date(1990, 1, 1) + timedelta(days=self.rng.randrange(365 * 40))).strftime("%d/%m/%Y")
+
+    def declaration(self):
+        """
+        Dados de uma declaração usando um paciente e um médico existentes.
+        """
+        cpf, nome = self.rng.choice(self.patients)
+        tipo, crm, nome_medico, uf = self.rng.choice(self.doctors)
+        return {
+            "nome_paciente": nome, "cpf_paciente": format_cpf(cpf), "cargo_paciente": "Motorista",
+            "empresa_paciente": "Transportes Águia S.A.", "data_atestado": self.random_date(),
+            "qtd_dias_atestado": 3, "codigo_cid": "J11", "nome_medico": nome_medico,
+            "tipo_registro_medico": tipo, "crm__medico": crm, "uf_crm_medico": uf,
+        }
+
+
+def completer_load(ctx):
+    # Carga completa da lista de nomes (modelo antigo) e primeira página por prefixo (modelo paginado)
+    ctx.measure("completer.lista_completa_pacientes", services.list_patient_names, repeat=max(1, ctx.repeat // 20))
+    ctx.measure("completer.lista_medicos", services.list_doctor_names)
+    ctx.measure("completer.prefixo_pacientes", lambda: services.search_patient_names(ctx.rng.choice(ctx.patients)[1][:3]))
+
+
+def autofill_queries(ctx):
+    # Sem cache: cada consulta vai ao SQLite
+    def cold(func):
+        def run():
+            services.clear_entity_cache()
+            func()
+        return run
+    ctx.measure("autofill.paciente_cpf", cold(lambda: services.find_patient_by_cpf(ctx.rng.choice(ctx.patients)[0])))
+    ctx.measure("autofill.paciente_nome", cold(lambda: services.find_patient_by_name(ctx.rng.choice(ctx.patients)[1])))
+    ctx.measure("autofill.medico_registro", cold(lambda: services.find_doctor_by_registro(*ctx.rng.choice(ctx.doctors)[:2])))
+    ctx.measure("autofill.medico_nome", cold(lambda: services.find_doctor_by_name(ctx.rng.choice(ctx.doctors)[2])))
+    # Com cache: mesmo conjunto pequeno de chaves repetidas
+    services.clear_entity_cache()
+    ctx.measure("autofill.paciente_cpf_cache", lambda: services.find_patient_by_cpf(ctx.patients[ctx.rng.randrange(20)][0]))
+
+
+def save_declaration(ctx):
+    def save():
+        try:
+            database.save_or_update_data(ctx.declaration())
+        except OverlapError:
+            pass
+    ctx.measure("db.save_or_update_data", save)
+    ctx.measure("db.verificacao_sobreposicao", lambda: services.find_overlapping_atestados(
+        ctx.rng.choice(ctx.patients)[0], ctx.random_date(), 5))
+
+
+def concurrent_saves(ctx, threads=16):
+    # Várias estações/threads gravando ao mesmo tempo: a fila de escrita agrupa as gravações
+    from concurrent.futures import ThreadPoolExecutor
+
+    declarations = [ctx.declaration() for _ in range(ctx.repeat)]
+
+    def save(data):
+        try:
+            database.save_or_update_data(data)
+        except OverlapError:
+            pass
+
+    before = database.get_writer_stats()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(save, declarations))
+    elapsed = time.perf_counter() - started
+    ctx.stats.record(f"escrita.{threads}_threads_por_gravacao", elapsed / len(declarations))
+    after = database.get_writer_stats()
+    print(f"Fila de escrita: {len(declarations)} gravações em {after['transacoes'] - before['transacoes']} transações, "
+          f"espera pela trava {after['espera_trava_ms'] - before['espera_trava_ms']:.1f} ms", file=sys.stderr)
+
+
+def overlap_audit(ctx):
+    ctx.measure("auditoria.sobreposicoes", lambda: sum(1 for _ in services.iter_overlapping_atestados()), repeat=1)
+
+
+def reports_summary(ctx):
+    from core import reports
+
+    ctx.measure("relatorio.empresas", lambda: reports.monthly_summary("empresas"))
+    ctx.measure("relatorio.cids_por_mes", lambda: reports.monthly_summary("cids", "2025-01", "2025-12", por_mes=True))
+    ctx.measure("relatorio.medicos", reports.doctor_summary)
+
+
+def generate_document_single(ctx):
+    from core.document_generator import generate_document, render_document
+
+    output_dir = os.path.join(ctx.work_dir, "documentos")
+    os.makedirs(output_dir, exist_ok=True)
+    ctx.measure("docx.generate_document", lambda: generate_document(ctx.declaration(), open_file=False, output_dir=output_dir),
+                repeat=max(1, ctx.repeat // 4))
+    ctx.measure("docx.render_document_memoria", lambda: render_document(ctx.declaration()), repeat=max(1, ctx.repeat // 4))
+
+
+def generate_document_batch(ctx, rows=100):
+    from core.batch import run_batch
+
+    path = os.path.join(ctx.work_dir, "lote.csv")
+    declarations = [ctx.declaration() for _ in range(rows)]
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(declarations[0]))
+        writer.writeheader()
+        writer.writerows(declarations)
+    output_dir = os.path.join(ctx.work_dir, "lote")
+    os.makedirs(output_dir, exist_ok=True)
+    started = time.perf_counter()
+    report = run_batch(path, output_dir=output_dir)
+    elapsed = time.perf_counter() - started
+    ctx.stats.record(f"batch.{rows}_documentos", elapsed)
+    ctx.stats.record("batch.por_documento", elapsed / max(1, len(report.generated)))
+
+
+def startup_first_paint(ctx, runs=5):
+    # Executa main.py no modo de perfil da inicialização e lê as métricas gravadas ao sair
+    metrics_file = os.path.join(ctx.work_dir, "metricas_inicializacao.json")
+    env = dict(os.environ, HOMOLOGACAO_DB=ctx.db_path, QT_QPA_PLATFORM="offscreen", HOMOLOGACAO_METRICS_FILE=metrics_file)
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, MAIN_SCRIPT, "--perfil-inicializacao", "--alvo-ms", "1e9"],
+                       env=env, capture_output=True, check=True)
+        ctx.stats.record("startup.processo_ate_interativo", time.perf_counter() - started)
+        with open(metrics_file, encoding="utf-8") as f:
+            metrics = json.load(f)["stages"]
+        for stage in ("startup.ate_primeiro_desenho", "startup.ate_interativo"):
+            ctx.stats.record(stage, metrics[stage]["total_ms"] / 1000)
+
+
+def cid_catalog(ctx):
+    from benchmarks.datagen import CIDS, generate_cid_catalog
+    from core import cid10
+
+    # Usa o catálogo instalado; sem ele, um catálogo sintético do mesmo tamanho
+    path = cid10.CATALOG_PATH
+    if not os.path.exists(path):
+        path = generate_cid_catalog(os.path.join(ctx.work_dir, "cid10.csv"))
+    ctx.measure("cid10.carga", lambda: cid10.CidCatalog.load(path), repeat=max(1, ctx.repeat // 20))
+    catalog = cid10.CidCatalog.load(path)
+    words = [word for code in CIDS for word in (catalog.describe(code) or "").split() if len(word) > 3]
+    ctx.measure("cid10.prefixo_codigo", lambda: catalog.suggestions(ctx.rng.choice(CIDS)[:2]))
+    ctx.measure("cid10.palavra_descricao", lambda: catalog.suggestions(ctx.rng.choice(words)[:4]))
+    ctx.measure("cid10.validacao", lambda: ctx.rng.choice(CIDS) in catalog)
+
+
+def _qt_available():
+    try:
+        import PyQt5  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+SCENARIOS = {
+    "completer": completer_load,
+    "autofill": autofill_queries,
+    "save": save_declaration,
+    "escrita": concurrent_saves,
+    "reports": reports_summary,
+    "audit": overlap_audit,
+    "document": generate_document_single,
+    "batch": generate_document_batch,
+    "cid10": cid_catalog,
+    "startup": startup_first_paint,
+}
+
+def available_scenarios():
+    names = list(SCENARIOS)
+    if not _qt_available():
+        names.remove("startup")
+    return names
@@ -0,0 +1,448 @@
+"""
+Serviço HTTP opcional para que outros sistemas (ex.: o do RH) enviem homologações
+sem que a recepção precise digitá-las na janela principal. Usa apenas a biblioteca
+padrão (asyncio) e, por padrão, escuta somente em localhost.
+
+Uso:
+    python -m core servidor [--host 127.0.0.1] [--porta 8765] [--simultaneas 8] [--workers 2]
+
+Rotas:
+    POST /declaracoes                    valida, grava e gera a declaração (corpo JSON com os
+                                         campos do formulário); responde com o id do atestado e
+                                         o hash do documento arquivado ou, com ?formato=docx (ou
+                                         Accept do .docx), com o próprio .docx
+    GET  /atestados/<id>/documento       .docx arquivado do atestado
+    GET  /pacientes?cpf=...              paciente pelo CPF
+    GET  /pacientes?prefixo=...          nomes de pacientes pelo início do nome
+    GET  /medicos?tipo=CRM&registro=...  médico pelo registro (ou ?nome=...)
+    GET  /cid10?q=...                    sugestões do catálogo da CID-10
+    GET  /saude                          estado e contadores do serviço
+
+O laço de eventos nunca espera pelo banco nem pela renderização: as gravações
+(atestado e arquivo de documentos) são feitas por threads auxiliares, que as
+entregam à thread de escrita do banco (core.writer) — gravações simultâneas são
+agrupadas em uma mesma transação; as consultas usam threads leitoras com conexões
+próprias (WAL); os documentos são renderizados em um pool de processos. Um semáforo
+limita as gerações em andamento e, com a fila cheia, novas gerações recebem 503.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import re
+import signal
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from urllib.parse import parse_qs, quote, urlsplit
+
+from core import cid10, services
+from core.batch import prepare_row, render_row
+from core.database import create_tables, get_writer_stats, normalize_cpf
+from core.document_generator import default_file_name
+from core.instrumentation import span
+from core.validation import OverlapError, ValidationError, to_iso_date
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Gerações processadas ao mesmo tempo e gerações aceitas aguardando a vez
+DEFAULT_MAX_CONCURRENT = 8
+DEFAULT_MAX_PENDING = 64
+# Threads das consultas (cada uma com a sua conexão de leitura)
+READER_THREADS = 4
+
+MAX_BODY_BYTES = 1024 * 1024
+MAX_HEADERS = 100
+# Tempo máximo (s) para receber a requisição completa
+REQUEST_TIMEOUT = 30
+
+DOCX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+JSON_CONTENT_TYPE = "application/json; charset=utf-8"
+
+_STATUS_TEXT = {
+    200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    408: "Request Timeout", 409: "Conflict", 413: "Payload Too Large", 422: "Unprocessable Entity",
+    500: "Internal Server Error", 503: "Service Unavailable",
+}
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    query: dict
+    headers: dict
+    body: bytes = b""
+
+    def param(self, name, default=None):
+        values = self.query.get(name)
+        return values[0] if values else default
+
+    def json(self):
+        try:
+            payload = json.loads(self.body.decode("utf-8") or "null")
+        except (UnicodeDecodeError, ValueError):
+            raise HttpError(400, "O corpo da requisição deve ser um JSON válido em UTF-8.")
+        if not isinstance(payload, dict):
+            raise HttpError(400, "O corpo da requisição deve ser um objeto JSON.")
+        return payload
+
+
+@dataclass
+class Response:
+    status: int
+    body: bytes = b""
+    content_type: str = JSON_CONTENT_TYPE
+    headers: dict = field(default_factory=dict)
+
+
+def json_response(status, payload, headers=None):
+    return Response(status, json.dumps(payload, ensure_ascii=False).encode("utf-8"), headers=headers or {})
+
+
+class HttpError(Exception):
+    """
+    Erro devolvido ao cliente como {"erro": mensagem, ...} com o status informado.
+    """
+
+    def __init__(self, status, message, **details):
+        super().__init__(message)
+        self.status = status
+        self.details = details
+
+    def response(self):
+        return json_response(self.status, {"erro": str(self), **self.details})
+
+
+async def read_request(reader):
+    """
+    Lê uma requisição HTTP/1.x (linha inicial, cabeçalhos e corpo com Content-Length).
+    Retorna None se o cliente fechou a conexão sem enviar nada.
+    """
+    try:
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, _ = line.decode("latin-1").split()
+        except ValueError:
+            raise HttpError(400, "Linha de requisição inválida.")
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            if len(headers) >= MAX_HEADERS:
+                raise HttpError(400, "Cabeçalhos demais.")
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+    except ValueError:
+        # Linha maior que o limite do StreamReader
+        raise HttpError(400, "Requisição inválida.")
+
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise HttpError(400, "Content-Length inválido.")
+    if length > MAX_BODY_BYTES:
+        raise HttpError(413, f"O corpo da requisição passa de {MAX_BODY_BYTES} bytes.")
+    body = await reader.readexactly(length) if length > 0 else b""
+
+    url = urlsplit(target)
+    return Request(method.upper(), url.path.rstrip("/") or "/", parse_qs(url.query), headers, body)
+
+
+async def write_response(writer, response):
+    headers = {
+        "Content-Type": response.content_type,
+        "Content-Length": str(len(response.body)),
+        "Connection": "close",
+        **response.headers,
+    }
+    head = f"HTTP/1.1 {response.status} {_STATUS_TEXT.get(response.status, '')}\r\n"
+    head += "".join(f"{name}: {value}\r\n" for name, value in headers.items()) + "\r\n"
+    writer.write(head.encode("latin-1") + response.body)
+    await writer.drain()
+
+
+def _ignore_interrupt():
+    # Processos de renderização: o Ctrl+C é tratado pelo servidor, que encerra o pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _save_declaration(payload):
+    """
+    Executada em uma thread auxiliar: valida e grava a declaração como o lote faz.
+    Retorna (dados normalizados, id do atestado).
+    """
+    data = prepare_row(payload)
+    data_homologacao = payload.get("data_homologacao") or None
+    if data_homologacao is not None:
+        try:
+            data_homologacao = to_iso_date(data_homologacao)
+        except (AttributeError, TypeError, ValueError):
+            raise ValidationError(
+                "O campo 'data_homologacao' deve estar no formato dd/mm/aaaa ou aaaa-mm-dd.",
+                field="data_homologacao"
+            )
+    atestado_id = services.save_declaration(data, data_homologacao, bool(payload.get("permitir_sobreposicao")))
+    return data, atestado_id
+
+
+def _fresh_lookup(func, *args):
+    """
+    Executada em uma thread leitora: alterações feitas por outras estações desde a
+    última consulta invalidam os caches de pacientes e médicos antes de consultá-los.
+    """
+    services.clear_entity_cache_if_changed()
+    return func(*args)
+
+
+class HomologacaoServer:
+    """
+    Servidor HTTP da homologação: roteia as requisições e distribui o trabalho
+    entre as threads de gravação, as threads leitoras e o pool de renderização.
+    """
+
+    ROUTES = (
+        ("POST", re.compile(r"^/declaracoes$"), "post_declaration"),
+        ("GET", re.compile(r"^/atestados/(\d+)/documento$"), "get_document"),
+        ("GET", re.compile(r"^/pacientes$"), "get_patient"),
+        ("GET", re.compile(r"^/medicos$"), "get_doctor"),
+        ("GET", re.compile(r"^/cid10$"), "get_cid10"),
+        ("GET", re.compile(r"^/saude$"), "get_health"),
+    )
+
+    def __init__(self, max_concurrent=DEFAULT_MAX_CONCURRENT, max_pending=DEFAULT_MAX_PENDING, workers=None):
+        self.max_concurrent = max_concurrent
+        self.max_pending = max_pending
+        self.workers = workers
+        self.pending = 0
+        self.counters = {"requisicoes": 0, "geradas": 0, "rejeitadas": 0, "recusadas_fila_cheia": 0, "erros": 0}
+        self._slots = None
+        self._writers = None
+        self._readers = None
+        self._renderers = None
+
+    # --- Ciclo de vida ---
+
+    def start_pools(self):
+        # Uma thread por geração em andamento: elas só esperam a fila de escrita do banco,
+        # que grava em uma única thread e agrupa as gravações simultâneas
+        self._writers = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix="homologacao-gravacao")
+        self._readers = ThreadPoolExecutor(max_workers=READER_THREADS, thread_name_prefix="homologacao-leitura")
+        # 'spawn': os processos de renderização não herdam as threads nem as conexões do servidor
+        self._renderers = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                              initializer=_ignore_interrupt)
+
+    def shutdown_pools(self):
+        for executor in (self._renderers, self._readers, self._writers):
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, ready=None):
+        """
+        Escuta em host:port até ser cancelado. 'ready' (opcional) recebe o servidor asyncio já ouvindo.
+        """
+        self._slots = asyncio.Semaphore(self.max_concurrent)
+        self.start_pools()
+        try:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+            async with server:
+                if ready:
+                    ready(server)
+                await server.serve_forever()
+        finally:
+            self.shutdown_pools()
+
+    async def _run(self, executor, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(executor, partial(func, *args))
+
+    # --- Conexões ---
+
+    async def handle_connection(self, reader, writer):
+        try:
+            try:
+                request = await asyncio.wait_for(read_request(reader), REQUEST_TIMEOUT)
+            except asyncio.TimeoutError:
+                response = HttpError(408, "Tempo esgotado ao receber a requisição.").response()
+            except asyncio.IncompleteReadError:
+                return
+            except HttpError as e:
+                response = e.response()
+            else:
+                if request is None:
+                    return
+                response = await self.dispatch(request)
+            await write_response(writer, response)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def dispatch(self, request):
+        self.counters["requisicoes"] += 1
+        allowed = []
+        for method, pattern, handler in self.ROUTES:
+            match = pattern.match(request.path)
+            if not match:
+                continue
+            if method != request.method:
+                allowed.append(method)
+                continue
+            try:
+                return await getattr(self, handler)(request, *match.groups())
+            except HttpError as e:
+                return e.response()
+            except Exception as e:
+                self.counters["erros"] += 1
+                print(f"Erro no serviço HTTP ({request.method} {request.path}): {e}")
+                return HttpError(500, "Erro interno ao processar a requisição.").response()
+        if allowed:
+            return HttpError(405, "Método não permitido.").response()
+        return HttpError(404, "Rota não encontrada.").response()
+
+    # --- Geração ---
+
+    async def post_declaration(self, request):
+        payload = request.json()
+        if self.pending >= self.max_concurrent + self.max_pending:
+            self.counters["recusadas_fila_cheia"] += 1
+            raise HttpError(503, "Muitas declarações em processamento; tente novamente em instantes.")
+        self.pending += 1
+        try:
+            async with self._slots:
+                with span("api.gerar"):
+                    try:
+                        data, atestado_id = await self._run(self._writers, _save_declaration, payload)
+                    except OverlapError as e:
+                        self.counters["rejeitadas"] += 1
+                        raise HttpError(409, str(e), campo=e.field, sobreposicoes=e.overlaps)
+                    except ValidationError as e:
+                        self.counters["rejeitadas"] += 1
+                        raise HttpError(422, str(e), campo=e.field)
+
+                    file_name = default_file_name(data) + ".docx"
+                    try:
+                        with span("api.renderizar"):
+                            content = await self._run(self._renderers, render_row, data)
+                    except Exception as e:
+                        # O atestado já está gravado; o documento pode ser gerado de novo pela interface
+                        print(f"Erro ao gerar documento do atestado {atestado_id}: {e}")
+                        raise HttpError(500, "Atestado gravado, mas não foi possível gerar o documento.",
+                                        atestado_id=atestado_id)
+                    digest = await self._run(self._writers, services.archive_document, atestado_id, content, file_name)
+        finally:
+            self.pending -= 1
+        self.counters["geradas"] += 1
+
+        headers = {"Location": f"/atestados/{atestado_id}/documento", "X-Atestado-Id": str(atestado_id),
+                   "X-Documento-Hash": digest}
+        if request.param("formato") == "docx" or DOCX_CONTENT_TYPE in request.headers.get("accept", ""):
+            headers["Content-Disposition"] = f"attachment; filename*=UTF-8''{quote(file_name)}"
+            return Response(201, content, DOCX_CONTENT_TYPE, headers)
+        return json_response(201, {
+            "atestado_id": atestado_id,
+            "arquivo": file_name,
+            "hash": digest,
+            "documento": headers["Location"],
+        }, headers)
+
+    # --- Consultas ---
+
+    async def get_document(self, request, atestado_id):
+        entry = await self._run(self._readers, services.get_archived_document, int(atestado_id))
+        if entry is None:
+            raise HttpError(404, f"Nenhum documento arquivado para o atestado {atestado_id}.")
+        file_name, content = entry
+        return Response(200, content, DOCX_CONTENT_TYPE,
+                        {"Content-Disposition": f"attachment; filename*=UTF-8''{quote(file_name)}"})
+
+    async def get_patient(self, request):
+        cpf = request.param("cpf")
+        if cpf:
+            patient = await self._run(self._readers, _fresh_lookup, services.find_patient_by_cpf, normalize_cpf(cpf))
+            if patient is None:
+                raise HttpError(404, "Paciente não encontrado.")
+            return json_response(200, patient)
+        prefix = request.param("prefixo")
+        if not prefix:
+            raise HttpError(400, "Informe 'cpf' ou 'prefixo'.")
+        names = await self._run(self._readers, services.search_patient_names, prefix, request.param("apos"),
+                                _limit(request))
+        return json_response(200, {"nomes": names})
+
+    async def get_doctor(self, request):
+        registro, nome = request.param("registro"), request.param("nome")
+        if registro:
+            doctor = await self._run(self._readers, _fresh_lookup, services.find_doctor_by_registro,
+                                     request.param("tipo", "CRM"), registro)
+        elif nome:
+            doctor = await self._run(self._readers, _fresh_lookup, services.find_doctor_by_name, nome)
+        else:
+            raise HttpError(400, "Informe 'registro' (e 'tipo') ou 'nome'.")
+        if doctor is None:
+            raise HttpError(404, "Médico não encontrado.")
+        return json_response(200, doctor)
+
+    async def get_cid10(self, request):
+        catalog = await self._run(self._readers, cid10.get_catalog)
+        if catalog is None:
+            error = cid10.get_catalog_error()
+            if error:
+                raise HttpError(500, error)
+            raise HttpError(404, "Catálogo da CID-10 não instalado.")
+        suggestions = catalog.suggestions(request.param("q", ""), request.param("apos"), _limit(request))
+        return json_response(200, {"resultados": [
+            dict(zip(("codigo", "descricao"), suggestion.split(cid10.SUGGESTION_SEPARATOR, 1)))
+            for suggestion in suggestions
+        ]})
+
+    async def get_health(self, request):
+        return json_response(200, {
+            "status": "ok",
+            "geracoes_em_andamento": self.pending,
+            "max_simultaneas": self.max_concurrent,
+            "max_fila": self.max_pending,
+            "contadores": dict(self.counters),
+            "escrita": get_writer_stats(),
+        })
+
+
+def _limit(request, default=50, maximum=500):
+    try:
+        return max(1, min(int(request.param("limite", default)), maximum))
+    except ValueError:
+        raise HttpError(400, "'limite' deve ser um número inteiro.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serviço HTTP local para envio de homologações por outros sistemas.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"Endereço de escuta (padrão: {DEFAULT_HOST})")
+    parser.add_argument("--porta", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--simultaneas", type=int, default=DEFAULT_MAX_CONCURRENT, help="Gerações processadas ao mesmo tempo")
+    parser.add_argument("--fila", type=int, default=DEFAULT_MAX_PENDING, help="Gerações aguardando antes de responder 503")
+    parser.add_argument("--workers", type=int, default=None, help="Processos de renderização (padrão: CPUs disponíveis)")
+    args = parser.parse_args(argv)
+
+    create_tables()
+    server = HomologacaoServer(args.simultaneas, args.fila, args.workers)
+
+    def ready(listening):
+        addresses = ", ".join(f"http://{sock.getsockname()[0]}:{sock.getsockname()[1]}" for sock in listening.sockets)
+        print(f"Serviço de homologação ouvindo em {addresses} (Ctrl+C encerra).", flush=True)
+
+    try:
+        asyncio.run(server.serve(args.host, args.porta, ready))
+    except KeyboardInterrupt:
+        print("Serviço encerrado.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
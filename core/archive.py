@@ -0,0 +1,255 @@
+"""
+Arquivo compactado das declarações geradas.
+
+Em vez de um .docx solto por geração em data/generated_documents, os documentos
+são acrescentados a arquivos .zip sequenciais ("shards") de tamanho limitado,
+identificados pelo hash SHA-256 do conteúdo: documentos idênticos são guardados
+uma única vez. O índice fica no banco de dados (tabelas documentos_arquivo e
+atestado_documentos, migração 5), o que permite localizar o documento de um
+atestado com uma consulta pela chave primária e uma leitura no .zip.
+
+A gravação acontece na thread de escrita do banco (core.writer), dentro de uma
+transação BEGIN IMMEDIATE: o bloqueio de escrita do SQLite serializa os acréscimos
+aos shards também entre processos diferentes. O acréscimo é levado ao disco (fsync)
+antes do COMMIT, e o índice guarda o deslocamento do conteúdo no shard: a leitura
+não depende do diretório central do .zip, que é reescrito a cada acréscimo. Se uma
+queda interromper um acréscimo, os documentos anteriores continuam legíveis e o
+shard danificado deixa de receber documentos (o próximo é iniciado).
+"""
+import hashlib
+import io
+import os
+import re
+import struct
+import threading
+import zipfile
+from datetime import datetime
+
+from core import database
+
+# Tamanho a partir do qual um novo shard é iniciado
+MAX_SHARD_BYTES = 64 * 1024 * 1024
+
+_SHARD_PATTERN = re.compile(r"^shard_(\d{6})\.zip$")
+
+
+def default_archive_dir():
+    """
+    Pasta do arquivo: HOMOLOGACAO_ARQUIVO ou 'arquivo_documentos' ao lado do banco de dados.
+    """
+    return os.environ.get("HOMOLOGACAO_ARQUIVO") or os.path.join(os.path.dirname(database.DB_FILE), "arquivo_documentos")
+
+
+def content_hash(content):
+    """
+    Hash do conteúdo de um .docx. O .docx é um .zip cujas entradas carregam a data
+    de gravação, então o hash é calculado sobre os nomes e o conteúdo descompactado
+    das entradas: duas renderizações iguais em horários diferentes têm o mesmo hash.
+    Conteúdo que não é um .zip válido é identificado pelos bytes brutos.
+    """
+    digest = hashlib.sha256()
+    source = _as_file(content)
+    try:
+        with zipfile.ZipFile(source) as package:
+            for name in sorted(package.namelist()):
+                data = package.read(name)
+                digest.update(name.encode("utf-8") + b"\0" + str(len(data)).encode("ascii") + b"\0")
+                digest.update(data)
+    except zipfile.BadZipFile:
+        digest = hashlib.sha256(_as_bytes(content))
+    finally:
+        source.seek(0)
+    return digest.hexdigest()
+
+
+def _shard_intact(path):
+    """
+    O shard termina no registro de fim do diretório central (sem comentário), logo
+    depois do diretório central. Um acréscimo interrompido não passa nesta verificação
+    (zipfile.is_zipfile não basta: os .docx guardados também são .zip).
+    """
+    size = os.path.getsize(path)
+    if size < 22:
+        return False
+    with open(path, "rb") as f:
+        f.seek(size - 22)
+        end = f.read(22)
+    if end[:4] != b"PK\x05\x06":
+        return False
+    directory_size, directory_offset = struct.unpack("<II", end[12:20])
+    return directory_offset + directory_size == size - 22
+
+
+def _fsync_directory(directory):
+    # Garante que a criação de um shard novo também chegue ao disco (não disponível no Windows)
+    if os.name == "nt":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _as_file(content):
+    return content if hasattr(content, "seek") else io.BytesIO(bytes(content))
+
+
+def _as_bytes(content):
+    if hasattr(content, "getbuffer"):
+        return content.getbuffer()
+    return content
+
+
+class DocumentArchive:
+    """
+    Armazena e recupera documentos nos shards .zip de 'root'.
+    Os leitores de cada shard ficam abertos (o diretório central do .zip é lido
+    uma única vez) e são reabertos quando o shard cresce.
+    """
+
+    def __init__(self, root=None, max_shard_bytes=MAX_SHARD_BYTES):
+        self.root = root
+        self.max_shard_bytes = max_shard_bytes
+        self._lock = threading.Lock()
+        self._readers = {}  # caminho do shard -> (tamanho do arquivo, ZipFile)
+
+    @property
+    def directory(self):
+        return self.root or default_archive_dir()
+
+    def _shard_path(self, shard):
+        return os.path.join(self.directory, shard)
+
+    def _current_shard(self):
+        """
+        Último shard existente, ou o próximo se ele já atingiu o tamanho máximo ou
+        não é mais um .zip válido (acréscimo interrompido por uma queda).
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        numbers = [int(m.group(1)) for m in map(_SHARD_PATTERN.match, os.listdir(self.directory)) if m]
+        number = max(numbers, default=1)
+        path = self._shard_path(f"shard_{number:06d}.zip")
+        if os.path.exists(path) and (os.path.getsize(path) >= self.max_shard_bytes or not _shard_intact(path)):
+            number += 1
+        return f"shard_{number:06d}.zip"
+
+    def _append(self, shard, name, data):
+        """
+        Acrescenta a entrada ao shard (se ainda não estiver nele), grava em disco com
+        fsync e retorna o deslocamento do conteúdo no arquivo.
+        """
+        path = self._shard_path(shard)
+        created = not os.path.exists(path)
+        with open(path, "w+b" if created else "r+b") as f:
+            with zipfile.ZipFile(f, "a", compression=zipfile.ZIP_STORED) as package:
+                # Uma entrada pode existir sem registro no índice se uma gravação anterior
+                # foi interrompida entre o acréscimo ao .zip e o COMMIT
+                if name not in package.NameToInfo:
+                    # .docx já é compactado: ZIP_STORED evita recompactar
+                    package.writestr(name, bytes(data))
+                header_offset = package.getinfo(name).header_offset
+            f.flush()
+            os.fsync(f.fileno())
+            # Cabeçalho local: 30 bytes fixos, seguidos do nome e do campo extra
+            f.seek(header_offset)
+            name_length, extra_length = struct.unpack("<HH", f.read(30)[26:30])
+        if created:
+            _fsync_directory(self.directory)
+        return header_offset + 30 + name_length + extra_length
+
+    def put(self, content, atestado_id=None, file_name=None):
+        """
+        Guarda o documento (BytesIO, bytes ou memoryview) se o hash ainda não existir
+        e, se 'atestado_id' for informado, associa o atestado a ele. Retorna o hash.
+        """
+        digest = content_hash(content)
+        database.run_write(self._put, digest, content, atestado_id, file_name)
+        return digest
+
+    def _put(self, cursor, digest, content, atestado_id, file_name):
+        # Executado na thread de escrita, dentro da transação do grupo
+        cursor.execute("SELECT 1 FROM documentos_arquivo WHERE hash = ?", (digest,))
+        if cursor.fetchone() is None:
+            shard = self._current_shard()
+            data = _as_bytes(content)
+            offset = self._append(shard, digest + ".docx", data)
+            cursor.execute(
+                "INSERT INTO documentos_arquivo (hash, shard, tamanho, arquivado_em, deslocamento) VALUES (?, ?, ?, ?, ?)",
+                (digest, shard, len(data), datetime.now().strftime("%Y-%m-%d %H:%M:%S"), offset),
+            )
+        if atestado_id is not None:
+            cursor.execute(
+                "INSERT OR REPLACE INTO atestado_documentos (atestado_id, hash, nome_arquivo) VALUES (?, ?, ?)",
+                (atestado_id, digest, file_name or f"{digest}.docx"),
+            )
+
+    def _reader(self, shard):
+        path = self._shard_path(shard)
+        size = os.path.getsize(path)
+        with self._lock:
+            entry = self._readers.get(path)
+            if entry is None or entry[0] != size:
+                if entry is not None:
+                    entry[1].close()
+                entry = (size, zipfile.ZipFile(path))
+                self._readers[path] = entry
+            return entry[1]
+
+    def get(self, digest):
+        """
+        Retorna o conteúdo do documento com o hash informado, ou None se não existir.
+        """
+        with database.db_cursor() as cursor:
+            cursor.execute("SELECT shard, tamanho, deslocamento FROM documentos_arquivo WHERE hash = ?", (digest,))
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        if row["deslocamento"] is not None:
+            with open(self._shard_path(row["shard"]), "rb") as f:
+                f.seek(row["deslocamento"])
+                return f.read(row["tamanho"])
+        # Documentos arquivados antes da versão 9 do esquema: leitura pelo diretório central
+        package = self._reader(row["shard"])
+        with self._lock:
+            return package.read(digest + ".docx")
+
+    def lookup(self, atestado_id):
+        """
+        Retorna (hash, nome do arquivo) do documento associado ao atestado, ou None.
+        """
+        with database.db_cursor() as cursor:
+            cursor.execute("SELECT hash, nome_arquivo FROM atestado_documentos WHERE atestado_id = ?", (atestado_id,))
+            row = cursor.fetchone()
+        return (row["hash"], row["nome_arquivo"]) if row else None
+
+    def get_for_atestado(self, atestado_id):
+        """
+        Retorna (nome do arquivo, conteúdo) do documento do atestado, ou None.
+        """
+        entry = self.lookup(atestado_id)
+        if entry is None:
+            return None
+        content = self.get(entry[0])
+        return (entry[1], content) if content is not None else None
+
+    def stats(self):
+        with database.db_cursor() as cursor:
+            cursor.execute("SELECT COUNT(*), COALESCE(SUM(tamanho), 0), COUNT(DISTINCT shard) FROM documentos_arquivo")
+            documents, size, shards = cursor.fetchone()
+            cursor.execute("SELECT COUNT(*) FROM atestado_documentos")
+            linked = cursor.fetchone()[0]
+        return {"documentos": documents, "bytes": size, "shards": shards, "atestados_vinculados": linked}
+
+    def close(self):
+        with self._lock:
+            for _, package in self._readers.values():
+                package.close()
+            self._readers.clear()
+
+
+_archive = DocumentArchive()
+
+
+def get_archive():
+    return _archive
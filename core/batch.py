@@ -0,0 +1,180 @@
+"""
+Geração de declarações em lote a partir de um arquivo CSV ou JSON-lines.
+
+Cada linha usa as mesmas chaves do formulário da janela principal
+(nome_paciente, cpf_paciente, data_atestado, ...). As linhas válidas são
+gravadas no banco pela mesma camada de serviço da interface e os documentos
+são renderizados em paralelo em um pool de processos.
+
+Uso:
+    python -m core.batch planilha.csv [--workers 4] [--saida pasta]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+
+from core.csv_utils import iter_csv_rows
+from core.database import create_tables
+from core.services import archive_document, save_declaration
+from core.document_generator import default_file_name, render_document, save_document
+from core.validation import DECLARATION_FIELDS, ValidationError, format_cpf, validate_declaration_data
+
+
+@dataclass
+class BatchReport:
+    """
+    Resultado de uma execução em lote.
+    'failures' guarda (número da linha, mensagem) para cada linha rejeitada ou que falhou.
+    """
+    total: int = 0
+    generated: list = field(default_factory=list)
+    failures: list = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def throughput(self):
+        return len(self.generated) / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        lines = [
+            f"Linhas lidas: {self.total}",
+            f"Declarações geradas: {len(self.generated)}",
+            f"Falhas: {len(self.failures)}",
+            f"Tempo total: {self.elapsed:.2f}s ({self.throughput:.1f} documentos/s)",
+        ]
+        for line_number, message in self.failures:
+            lines.append(f"  Linha {line_number}: {message}")
+        return "\n".join(lines)
+
+
+def read_rows(path):
+    """
+    Lê as linhas do arquivo de entrada (CSV com ',' ou ';', ou JSON-lines).
+    Gera tuplas (número da linha, dicionário de dados).
+    """
+    if path.lower().endswith(('.jsonl', '.json', '.ndjson')):
+        with open(path, encoding='utf-8') as f:
+            for line_number, line in enumerate(f, start=1):
+                if line.strip():
+                    yield line_number, json.loads(line)
+        return
+
+    yield from iter_csv_rows(path)
+
+
+def prepare_row(row):
+    """
+    Mantém apenas os campos conhecidos, valida e formata o CPF para o documento.
+    """
+    data = {key: (row.get(key) or '') for key in DECLARATION_FIELDS}
+    if not data["tipo_registro_medico"]:
+        data["tipo_registro_medico"] = "CRM"
+    data = validate_declaration_data(data)
+    data["cpf_paciente"] = format_cpf(data["cpf_paciente"])
+    return data
+
+
+def render_row(data):
+    """
+    Renderiza a declaração e retorna o .docx em bytes.
+    """
+    # Executado nos processos do pool: cada processo mantém seu próprio cache de modelo.
+    # O documento volta como bytes para o processo principal, que o arquiva.
+    return render_document(data).getvalue()
+
+
+def run_batch(path, workers=None, progress=None, output_dir=None, allow_overlap=False):
+    """
+    Processa o arquivo de entrada e retorna um BatchReport.
+    'progress' (opcional) recebe (concluídos, documentos enfileirados até o momento).
+    Os documentos são guardados no arquivo de documentos (core.archive); com
+    'output_dir', uma cópia de cada um também é salva nessa pasta.
+    Em 'generated' ficam os caminhos das cópias ou, sem 'output_dir', os hashes.
+    Linhas cujo período coincide com outro atestado do paciente são rejeitadas,
+    a menos que 'allow_overlap' seja verdadeiro.
+    """
+    report = BatchReport()
+    started = time.perf_counter()
+    # Documentos em renderização ao mesmo tempo: o bastante para manter o pool ocupado,
+    # sem acumular em memória os .docx de um arquivo inteiro
+    window = 2 * (workers or os.cpu_count() or 1)
+
+    pending = {}
+    submitted = done = 0
+
+    def collect(futures):
+        # Cada documento sai de 'pending' assim que é arquivado, liberando seus bytes
+        nonlocal done
+        for future in futures:
+            line_number, atestado_id, base_name = pending.pop(future)
+            done += 1
+            try:
+                content = future.result()
+                digest = archive_document(atestado_id, content, base_name + ".docx")
+                report.generated.append(save_document(content, base_name, output_dir) if output_dir else digest)
+            except Exception as e:
+                report.failures.append((line_number, f"Erro ao gerar documento: {e}"))
+            if progress:
+                progress(done, submitted)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Validação, gravação no banco e arquivamento ficam no processo principal
+        # (um único escritor); a renderização é distribuída entre os processos do pool.
+        for line_number, row in read_rows(path):
+            report.total += 1
+            try:
+                data = prepare_row(row)
+                atestado_id = save_declaration(data, allow_overlap=allow_overlap)
+            except ValidationError as e:
+                report.failures.append((line_number, str(e)))
+                continue
+            except Exception as e:
+                report.failures.append((line_number, f"Erro ao gravar no banco: {e}"))
+                continue
+            if len(pending) >= window:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(finished)
+            pending[executor.submit(render_row, data)] = (line_number, atestado_id, default_file_name(data))
+            submitted += 1
+
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            collect(finished)
+
+    report.failures.sort()
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera declarações em lote a partir de um arquivo CSV ou JSON-lines.")
+    parser.add_argument("arquivo", help="Arquivo .csv ou .jsonl com os dados das declarações")
+    parser.add_argument("--workers", type=int, default=None, help="Número de processos de renderização (padrão: CPUs disponíveis)")
+    parser.add_argument("--saida", help="Pasta onde salvar também uma cópia de cada documento (padrão: somente o arquivo de documentos)")
+    parser.add_argument("--permitir-sobreposicao", action="store_true", help="Não rejeita atestados com período coincidente")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.arquivo):
+        print(f"Arquivo não encontrado: {args.arquivo}")
+        return 1
+
+    create_tables()
+
+    def progress(done, total):
+        print(f"\rGerando documentos: {done}/{total}", end="", flush=True)
+
+    if args.saida:
+        os.makedirs(args.saida, exist_ok=True)
+    report = run_batch(args.arquivo, workers=args.workers, progress=progress, output_dir=args.saida,
+                       allow_overlap=args.permitir_sobreposicao)
+    print()
+    print(report.summary())
+    return 0 if not report.failures else 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
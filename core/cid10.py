@@ -0,0 +1,319 @@
+"""
+Catálogo local da CID-10 (categorias e subcategorias, cerca de 14 mil códigos)
+para o autocompletar e a validação do campo CID, sem acesso à rede.
+
+O catálogo fica em data/cid10.csv (UTF-8, 'codigo;descricao', códigos no formato
+A00 / A00.0) e é gerado a partir dos arquivos CSV da CID-10 publicados pelo DATASUS:
+    python -m core cid10 importar CID10CSV.zip
+
+Ele só é lido na primeira consulta (get_catalog), não na inicialização. O índice
+é compacto: listas ordenadas de códigos e de palavras das descrições, pesquisadas
+por prefixo com bisect. Tempo de carga e memória ocupada:
+    python -m core cid10 medir
+"""
+import csv
+import io
+import os
+import re
+import threading
+import time
+import unicodedata
+import zipfile
+from array import array
+from bisect import bisect_left
+from itertools import dropwhile, islice
+
+from core.instrumentation import span
+
+# HOMOLOGACAO_CID10 aponta para outro arquivo de catálogo
+CATALOG_PATH = os.environ.get("HOMOLOGACAO_CID10") or os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'cid10.csv')
+
+# Letra, dois dígitos e, opcionalmente, o dígito da subcategoria (com ou sem ponto)
+_CODE_PATTERN = re.compile(r"^([A-Z])(\d{2})\.?(\d)?$")
+# Início de código digitado no campo (A, A0, A00, A00., A00.1)
+_CODE_PREFIX_PATTERN = re.compile(r"^[A-Z](\d{1,2}(\.?\d?)?)?$")
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+# Palavras comuns que não entram no índice das descrições
+_STOPWORDS = frozenset(("a", "as", "o", "os", "e", "de", "da", "das", "do", "dos", "em", "na", "no", "com", "por", "ou"))
+
+# Separador entre código e descrição nas sugestões do autocompletar
+SUGGESTION_SEPARATOR = " - "
+
+# Arquivos da CID-10 do DATASUS: nome -> coluna do código
+_DATASUS_FILES = {
+    "CID-10-CATEGORIAS.CSV": "CAT",
+    "CID-10-SUBCATEGORIAS.CSV": "SUBCAT",
+}
+
+
+def normalize_code(text):
+    """
+    Código CID-10 no formato do catálogo (A00 ou A00.0), aceitando minúsculas e
+    subcategorias sem ponto (A000). Retorna None se o texto não for um código.
+    """
+    match = _CODE_PATTERN.match((text or '').strip().upper())
+    if not match:
+        return None
+    letter, number, subcategory = match.groups()
+    return f"{letter}{number}.{subcategory}" if subcategory else f"{letter}{number}"
+
+
+def _fold(text):
+    """
+    Texto em minúsculas e sem acentos, para comparar descrições.
+    """
+    return unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii").lower()
+
+
+def _words(text):
+    return [word for word in _WORD_PATTERN.findall(_fold(text)) if word not in _STOPWORDS]
+
+
+class CidCatalog:
+    """
+    Índice de prefixos da CID-10 em listas ordenadas.
+    Códigos: chaves sem ponto ordenadas (A00 < A000 < A001 < A01), de modo que as
+    subcategorias ficam logo depois da categoria e um prefixo é um intervalo contíguo.
+    Descrições: lista ordenada das palavras distintas (sem acentos); as entradas de
+    cada palavra ficam contíguas em um único array de inteiros, delimitadas por
+    'self._word_offsets' (palavras com o mesmo prefixo também ficam contíguas).
+    """
+
+    def __init__(self, entries):
+        entries = sorted(
+            ((code.replace('.', ''), code, description) for code, description in entries),
+            key=lambda entry: entry[0]
+        )
+        self._keys = [key for key, _, _ in entries]
+        self._codes = [code for _, code, _ in entries]
+        self._descriptions = [description for _, _, description in entries]
+
+        # Palavra -> entradas em que aparece (em ordem crescente, pela ordem de inserção);
+        # as descrições são convertidas de uma vez só, separadas por quebras de linha
+        postings = {}
+        folded = _fold("\n".join(self._descriptions)).split("\n")
+        for index, description in enumerate(folded):
+            for word in set(_WORD_PATTERN.findall(description)):
+                postings.setdefault(word, []).append(index)
+        for word in _STOPWORDS:
+            postings.pop(word, None)
+        self._words = sorted(postings)
+        self._word_offsets = array('I', [0])
+        self._word_entries = array('I')
+        for word in self._words:
+            self._word_entries.extend(postings[word])
+            self._word_offsets.append(len(self._word_entries))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Lê um catálogo no formato 'codigo;descricao' (UTF-8, com cabeçalho).
+        """
+        with open(path, encoding='utf-8-sig', newline='') as f:
+            reader = csv.reader(f, delimiter=';')
+            next(reader, None)
+            return cls((row[0], row[1]) for row in reader if len(row) >= 2)
+
+    def __len__(self):
+        return len(self._codes)
+
+    def __contains__(self, code):
+        return self.describe(code) is not None
+
+    def _position(self, code):
+        code = normalize_code(code)
+        if code is None:
+            return None
+        key = code.replace('.', '')
+        pos = bisect_left(self._keys, key)
+        if pos < len(self._keys) and self._keys[pos] == key:
+            return pos
+        return None
+
+    def describe(self, code):
+        """
+        Descrição do código (A00, A00.0 ou A000) ou None se ele não estiver no catálogo.
+        """
+        pos = self._position(code)
+        return None if pos is None else self._descriptions[pos]
+
+    def _code_range(self, prefix):
+        key = prefix.replace('.', '')
+        return range(bisect_left(self._keys, key), bisect_left(self._keys, key + '\uffff'))
+
+    def _word_matches(self, prefix):
+        start = bisect_left(self._words, prefix)
+        stop = bisect_left(self._words, prefix + '\uffff', start)
+        return set(self._word_entries[self._word_offsets[start]:self._word_offsets[stop]])
+
+    def search(self, text):
+        """
+        Gera (código, descrição) em ordem de código para o texto digitado: um início
+        de código (J, J1, J11, J11.8) ou palavras da descrição, cada uma podendo estar
+        incompleta ("influ", "dor lomb").
+        """
+        text = (text or '').strip()
+        if _CODE_PREFIX_PATTERN.match(text.upper()):
+            positions = self._code_range(text.upper())
+        else:
+            words = _words(text)
+            if not words:
+                return
+            # A palavra mais longa costuma ser a mais seletiva; as demais filtram o resultado
+            words.sort(key=len, reverse=True)
+            candidates = self._word_matches(words[0])
+            for word in words[1:]:
+                if not candidates:
+                    break
+                candidates &= self._word_matches(word)
+            positions = sorted(candidates)
+        for pos in positions:
+            yield self._codes[pos], self._descriptions[pos]
+
+    def suggestions(self, text, after=None, limit=50):
+        """
+        Página de sugestões 'código - descrição' para o autocompletar, continuando
+        depois da sugestão 'after' (a última da página anterior).
+        """
+        results = self.search(text)
+        if after:
+            after_key = after.split(SUGGESTION_SEPARATOR, 1)[0].replace('.', '')
+            results = dropwhile(lambda item: item[0].replace('.', '') <= after_key, results)
+        return [f"{code}{SUGGESTION_SEPARATOR}{description}" for code, description in islice(results, limit)]
+
+
+_catalog = None
+_catalog_loaded = False
+# Mensagem da falha de leitura do catálogo, exibida por quem chamou get_catalog
+_catalog_error = None
+_catalog_lock = threading.Lock()
+
+
+def configure_catalog(path):
+    """
+    Troca o arquivo do catálogo; ele será lido de novo na próxima consulta.
+    """
+    global CATALOG_PATH, _catalog, _catalog_loaded, _catalog_error
+    with _catalog_lock:
+        CATALOG_PATH = path
+        _catalog = None
+        _catalog_loaded = False
+        _catalog_error = None
+
+
+def get_catalog():
+    """
+    Catálogo carregado na primeira chamada, ou None se o arquivo não existir ou não
+    puder ser lido (nesse caso o CID é validado apenas quanto ao formato e o motivo
+    fica em get_catalog_error()).
+    """
+    global _catalog, _catalog_loaded, _catalog_error
+    if _catalog_loaded:
+        return _catalog
+    with _catalog_lock:
+        if not _catalog_loaded:
+            if os.path.exists(CATALOG_PATH):
+                with span("cid10.carga"):
+                    try:
+                        _catalog = CidCatalog.load(CATALOG_PATH)
+                    except (OSError, csv.Error, UnicodeDecodeError) as e:
+                        _catalog_error = f"Erro ao carregar o catálogo CID-10 '{CATALOG_PATH}': {e}"
+            _catalog_loaded = True
+    return _catalog
+
+
+def get_catalog_error():
+    """
+    Mensagem do erro da última carga do catálogo, ou None se não houve falha.
+    """
+    return _catalog_error
+
+
+def measure_catalog(path=None):
+    """
+    Carrega o catálogo do zero e retorna {entradas, palavras, ocorrencias, carga_ms, memoria_bytes}.
+    A memória é a alocada na carga e ainda em uso pelo índice, medida com tracemalloc
+    em uma segunda carga.
+    """
+    import tracemalloc
+
+    path = path or CATALOG_PATH
+    # O tempo é medido sem o tracemalloc, que deixa a carga bem mais lenta
+    started = time.perf_counter()
+    catalog = CidCatalog.load(path)
+    elapsed = time.perf_counter() - started
+    del catalog
+
+    tracemalloc.start()
+    try:
+        catalog = CidCatalog.load(path)
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "entradas": len(catalog),
+        "palavras": len(catalog._words),
+        "ocorrencias": len(catalog._word_entries),
+        "carga_ms": elapsed * 1000,
+        "memoria_bytes": current,
+    }
+
+
+def _read_source_rows(name, content):
+    """
+    Gera (código, descrição) de um CSV de origem: os arquivos do DATASUS (latin-1,
+    colunas CAT/SUBCAT e DESCRICAO) ou um CSV simples 'codigo;descricao'.
+    """
+    try:
+        text = content.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        text = content.decode('latin-1')
+    reader = csv.reader(io.StringIO(text), delimiter=';')
+    header = [column.strip().upper() for column in next(reader, [])]
+    code_column = _DATASUS_FILES.get(os.path.basename(name).upper())
+    if code_column in header and "DESCRICAO" in header:
+        code_index, description_index = header.index(code_column), header.index("DESCRICAO")
+    else:
+        code_index, description_index = 0, 1
+    for row in reader:
+        if len(row) > max(code_index, description_index):
+            yield row[code_index], row[description_index].strip()
+
+
+def import_catalog(source, destination=None):
+    """
+    Gera o arquivo do catálogo a partir de 'source': o zip da CID-10 do DATASUS,
+    a pasta com os CSVs extraídos ou um único CSV 'codigo;descricao'.
+    Retorna a quantidade de códigos gravados.
+    """
+    destination = destination or CATALOG_PATH
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            files = [(name, archive.read(name)) for name in archive.namelist()
+                     if os.path.basename(name).upper() in _DATASUS_FILES]
+    elif os.path.isdir(source):
+        files = []
+        for name in os.listdir(source):
+            if name.upper() in _DATASUS_FILES:
+                with open(os.path.join(source, name), 'rb') as f:
+                    files.append((name, f.read()))
+    else:
+        with open(source, 'rb') as f:
+            files = [(source, f.read())]
+    if not files:
+        raise ValueError(f"Nenhum arquivo da CID-10 encontrado em '{source}'.")
+
+    entries = {}
+    for name, content in files:
+        for code, description in _read_source_rows(name, content):
+            code = normalize_code(code)
+            if code and description:
+                entries[code] = description
+
+    os.makedirs(os.path.dirname(os.path.abspath(destination)), exist_ok=True)
+    with open(destination, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, delimiter=';')
+        writer.writerow(("codigo", "descricao"))
+        writer.writerows(sorted(entries.items(), key=lambda item: item[0].replace('.', '')))
+    configure_catalog(CATALOG_PATH)
+    return len(entries)
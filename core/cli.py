@@ -0,0 +1,276 @@
+"""
+Linha de comando do sistema de homologação (não importa PyQt5).
+
+Uso:
+    python -m core generate --nome-paciente "..." --cpf-paciente ... [...]
+    python -m core generate --json declaracao.json
+    python -m core import planilha.csv [--workers 4]
+    python -m core import-pacientes funcionarios.csv
+    python -m core import-medicos medicos.csv
+    python -m core export atestados.csv
+    python -m core documento 123 [destino.docx]
+    python -m core relatorio empresas|cids|medicos|meses [--de 2026-01 --ate 2026-06] [--por-mes]
+    python -m core relatorio reconstruir
+    python -m core auditar-sobreposicoes
+    python -m core servidor [--porta 8765] [--simultaneas 8]
+    python -m core cid10 importar CID10CSV.zip | buscar "dor lombar" | medir
+    python -m core stats
+"""
+import argparse
+import json
+import os
+import sys
+
+from core.database import create_tables
+from core.validation import DECLARATION_FIELDS, ValidationError
+
+
+def _cmd_generate(args):
+    from core import services
+    from core.batch import prepare_row
+
+    if args.json:
+        with open(args.json, encoding='utf-8') as f:
+            row = json.load(f)
+    else:
+        row = vars(args)
+
+    try:
+        # Mesmo preparo do lote: registro "CRM" por padrão e CPF formatado para o documento
+        data = prepare_row(row)
+        atestado_id, output_path = services.generate_declaration(data, open_file=args.abrir, allow_overlap=args.permitir_sobreposicao)
+    except ValidationError as e:
+        print(f"Erro: {e}")
+        return 1
+    if not output_path:
+        print(f"Atestado {atestado_id} gravado, mas não foi possível gerar o documento.")
+        return 1
+    print(f"Atestado {atestado_id} gravado. Declaração salva em: {output_path}")
+    return 0
+
+def _cmd_import(args):
+    from core.batch import main as batch_main
+
+    argv = [args.arquivo]
+    if args.workers:
+        argv += ["--workers", str(args.workers)]
+    if args.saida:
+        argv += ["--saida", args.saida]
+    if args.permitir_sobreposicao:
+        argv.append("--permitir-sobreposicao")
+    return batch_main(argv)
+
+def _cmd_server(args):
+    from core.api import main as api_main
+
+    argv = ["--host", args.host, "--porta", str(args.porta), "--simultaneas", str(args.simultaneas), "--fila", str(args.fila)]
+    if args.workers:
+        argv += ["--workers", str(args.workers)]
+    return api_main(argv)
+
+def _cmd_import_roster(args):
+    from core import services
+
+    importer = services.import_patients if args.command == "import-pacientes" else services.import_doctors
+    report = importer(args.arquivo)
+    print(report.summary())
+    for line_number, message in report.errors[:50]:
+        print(f"  Linha {line_number}: {message}" if line_number else f"  {message}")
+    if len(report.errors) > 50:
+        print(f"  ... e mais {len(report.errors) - 50} erro(s).")
+    return 0 if not report.rejected else 2
+
+def _cmd_export(args):
+    from core import services
+
+    if args.arquivo == '-':
+        count = services.export_atestados(sys.stdout)
+    else:
+        with open(args.arquivo, 'w', encoding='utf-8-sig', newline='') as f:
+            count = services.export_atestados(f)
+    print(f"{count} atestado(s) exportado(s).", file=sys.stderr)
+    return 0
+
+def _cmd_document(args):
+    from core import services
+
+    entry = services.get_archived_document(args.atestado_id)
+    if entry is None:
+        print(f"Nenhum documento arquivado para o atestado {args.atestado_id}.")
+        return 1
+    file_name, content = entry
+    if args.destino == '-':
+        sys.stdout.buffer.write(content)
+        return 0
+    destination = args.destino or file_name
+    if os.path.isdir(destination):
+        destination = os.path.join(destination, file_name)
+    with open(destination, 'wb') as f:
+        f.write(content)
+    print(f"Documento do atestado {args.atestado_id} salvo em: {destination}")
+    return 0
+
+def _cmd_report(args):
+    from core import reports
+
+    if args.relatorio == "reconstruir":
+        elapsed = reports.rebuild()
+        print(f"Resumos reconstruídos em {elapsed:.2f}s.")
+        return 0
+
+    if args.relatorio == "medicos":
+        rows = reports.doctor_summary(limit=args.limite)
+    elif args.relatorio == "meses":
+        rows = reports.monthly_totals(args.de, args.ate)
+    else:
+        rows = reports.monthly_summary(args.relatorio, args.de, args.ate, por_mes=args.por_mes, limit=args.limite)
+
+    if args.json:
+        print(json.dumps(rows, ensure_ascii=False))
+        return 0
+    for row in rows:
+        label = row.get("chave", row.get("mes")) or "(não informado)"
+        if args.relatorio == "medicos" and row.get("crm"):
+            label = f"{label} ({row['tipo_crm']} {row['crm']}-{row['uf_crm']})"
+        elif row.get("mes") and "chave" in row:
+            label = f"{row['mes']}  {label}"
+        print(f"{label:<60} {row['atestados']:>8} atestado(s) {row['dias']:>9} dia(s)")
+    if not rows:
+        print("Nenhum atestado no período.")
+    return 0
+
+def _cmd_audit_overlaps(args):
+    from core import services
+    from core.validation import format_cpf, format_date_br
+
+    def period(row):
+        return f"nº {row['id']} ({format_date_br(row['data_atestado'])} a {format_date_br(row['data_fim'])}, CID {row['codigo_cid']})"
+
+    count = 0
+    for earlier, overlapping in services.iter_overlapping_atestados():
+        count += 1
+        print(f"{overlapping['nome_paciente']} ({format_cpf(overlapping['cpf_paciente'] or '')}): "
+              f"{period(overlapping)} coincide com {period(earlier)}")
+    print(f"{count} sobreposição(ões) encontrada(s).", file=sys.stderr)
+    return 0 if not count else 2
+
+def _cmd_cid10(args):
+    from core import cid10
+
+    if args.acao == "importar":
+        if not args.texto:
+            print("Informe o zip da CID-10 do DATASUS, a pasta com os CSVs ou um CSV 'codigo;descricao'.")
+            return 1
+        try:
+            count = cid10.import_catalog(args.texto)
+        except (OSError, ValueError) as e:
+            print(f"Erro ao importar o catálogo CID-10: {e}")
+            return 1
+        print(f"{count} código(s) gravado(s) em: {cid10.CATALOG_PATH}")
+        return 0
+
+    if not os.path.exists(cid10.CATALOG_PATH):
+        print(f"Catálogo CID-10 não encontrado em: {cid10.CATALOG_PATH}")
+        return 1
+    if args.acao == "medir":
+        result = cid10.measure_catalog()
+        print(f"Códigos: {result['entradas']} ({result['palavras']} palavras distintas, {result['ocorrencias']} ocorrências no índice)")
+        print(f"Carga: {result['carga_ms']:.1f} ms")
+        print(f"Memória do índice: {result['memoria_bytes'] / 1024 / 1024:.1f} MB")
+        return 0
+
+    catalog = cid10.get_catalog()
+    if catalog is None:
+        print(cid10.get_catalog_error())
+        return 1
+    results = catalog.suggestions(args.texto or "", limit=args.limite)
+    for suggestion in results:
+        print(suggestion)
+    return 0 if results else 2
+
+def _cmd_stats(args):
+    from core import services
+
+    stats = services.get_stats()
+    if args.json:
+        print(json.dumps(stats, ensure_ascii=False))
+    else:
+        print(f"Pacientes: {stats['pacientes']}")
+        print(f"Médicos: {stats['medicos']}")
+        print(f"Atestados: {stats['atestados']}")
+        print(f"Dias de afastamento: {stats['dias_afastamento']}")
+        archive = stats["arquivo"]
+        print(f"Documentos arquivados: {archive['documentos']} em {archive['shards']} shard(s), "
+              f"{archive['bytes'] / 1024 / 1024:.1f} MB ({archive['atestados_vinculados']} atestados vinculados)")
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m core", description="Sistema de Homologação de Atestados Médicos (linha de comando).")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    generate = subparsers.add_parser("generate", help="Gera uma declaração")
+    generate.add_argument("--json", help="Arquivo JSON com os dados da declaração")
+    for key in DECLARATION_FIELDS:
+        generate.add_argument("--" + key.strip('_').replace('__', '_').replace('_', '-'), dest=key)
+    generate.add_argument("--abrir", action="store_true", help="Abre o documento gerado no editor padrão")
+    generate.add_argument("--permitir-sobreposicao", action="store_true", help="Grava mesmo se o período coincidir com outro atestado")
+    generate.set_defaults(func=_cmd_generate)
+
+    importer = subparsers.add_parser("import", help="Gera declarações em lote a partir de CSV/JSON-lines")
+    importer.add_argument("arquivo")
+    importer.add_argument("--workers", type=int)
+    importer.add_argument("--saida", help="Pasta onde salvar também uma cópia de cada documento")
+    importer.add_argument("--permitir-sobreposicao", action="store_true")
+    importer.set_defaults(func=_cmd_import)
+
+    server = subparsers.add_parser("servidor", help="Serviço HTTP local para envio de homologações por outros sistemas")
+    server.add_argument("--host", default="127.0.0.1")
+    server.add_argument("--porta", type=int, default=8765)
+    server.add_argument("--simultaneas", type=int, default=8, help="Gerações processadas ao mesmo tempo")
+    server.add_argument("--fila", type=int, default=64, help="Gerações aguardando antes de responder 503")
+    server.add_argument("--workers", type=int, help="Processos de renderização")
+    server.set_defaults(func=_cmd_server)
+
+    for name, help_text in (("import-pacientes", "Importa pacientes de um CSV (nome_completo, cpf, cargo, empresa)"),
+                            ("import-medicos", "Importa médicos de um CSV (nome_completo, tipo_crm, crm, uf_crm)")):
+        roster = subparsers.add_parser(name, help=help_text)
+        roster.add_argument("arquivo")
+        roster.set_defaults(func=_cmd_import_roster)
+
+    export = subparsers.add_parser("export", help="Exporta os atestados para CSV ('-' para a saída padrão)")
+    export.add_argument("arquivo")
+    export.set_defaults(func=_cmd_export)
+
+    document = subparsers.add_parser("documento", help="Extrai do arquivo o documento de um atestado")
+    document.add_argument("atestado_id", type=int)
+    document.add_argument("destino", nargs="?", help="Arquivo ou pasta de destino ('-' para a saída padrão)")
+    document.set_defaults(func=_cmd_document)
+
+    report = subparsers.add_parser("relatorio", help="Dias de afastamento por empresa, CID, médico ou mês (tabelas de resumo)")
+    report.add_argument("relatorio", choices=("empresas", "cids", "medicos", "meses", "reconstruir"))
+    report.add_argument("--de", help="Mês inicial (aaaa-mm)")
+    report.add_argument("--ate", help="Mês final (aaaa-mm)")
+    report.add_argument("--por-mes", action="store_true", help="Uma linha por mês em vez do total do período")
+    report.add_argument("--limite", type=int)
+    report.add_argument("--json", action="store_true")
+    report.set_defaults(func=_cmd_report)
+
+    audit = subparsers.add_parser("auditar-sobreposicoes", help="Lista atestados de um mesmo paciente com períodos coincidentes")
+    audit.set_defaults(func=_cmd_audit_overlaps)
+
+    cid = subparsers.add_parser("cid10", help="Importa, pesquisa ou mede o catálogo local da CID-10")
+    cid.add_argument("acao", choices=("importar", "buscar", "medir"))
+    cid.add_argument("texto", nargs="?", help="Arquivo de origem (importar) ou texto pesquisado (buscar)")
+    cid.add_argument("--limite", type=int, default=20)
+    cid.set_defaults(func=_cmd_cid10)
+
+    stats = subparsers.add_parser("stats", help="Mostra contagens do banco de dados")
+    stats.add_argument("--json", action="store_true")
+    stats.set_defaults(func=_cmd_stats)
+
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    create_tables()
+    return args.func(args)
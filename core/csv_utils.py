@@ -0,0 +1,30 @@
+import csv
+
+
+def iter_csv_rows(path):
+    """
+    Lê um CSV (separador ',' ou ';', com ou sem BOM) linha a linha, sem carregar o
+    arquivo inteiro. Gera tuplas (número da linha no arquivo, dicionário da linha).
+    """
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;')
+        except csv.Error:
+            dialect = csv.excel
+        # A linha 1 é o cabeçalho
+        for line_number, row in enumerate(csv.DictReader(f, dialect=dialect), start=2):
+            yield line_number, row
+
+
+def first_value(row, *keys):
+    """
+    Retorna o primeiro valor não vazio entre as colunas 'keys' (sem espaços nas pontas).
+    Permite aceitar nomes de coluna alternativos (ex.: 'cpf' ou 'cpf_paciente').
+    """
+    for key in keys:
+        value = row.get(key)
+        if value is not None and str(value).strip():
+            return str(value).strip()
+    return ''
@@ -1,25 +1,216 @@
 import sqlite3
 import os
+import threading
+import atexit
+import time
+import weakref
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+from core.csv_utils import first_value, iter_csv_rows
+from core.instrumentation import span
+from core.validation import OverlapError, fold_name, parse_date, to_iso_date
+from core.writer import DatabaseWriter
 
 # Define o caminho para o arquivo do banco de dados na pasta 'data'
-DB_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'homologacao.db')
+# (HOMOLOGACAO_DB permite apontar para outro arquivo, ex.: uma cópia de testes)
+DB_FILE = os.environ.get("HOMOLOGACAO_DB") or os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'homologacao.db')
+
+# Ajustes aplicados a cada conexão aberta pelo gerenciador.
+# WAL permite leituras enquanto outra estação grava; synchronous=NORMAL é seguro com WAL
+# e evita um fsync por commit; mmap e cache maiores mantêm as páginas quentes em memória.
+# busy_timeout: quem encontra o banco travado por outra estação espera (em vez de
+# falhar na hora com "database is locked").
+BUSY_TIMEOUT_MS = 15000
+
+PRAGMAS = (
+    f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}",
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA mmap_size = 268435456",   # 256 MB
+    "PRAGMA cache_size = -16000",     # ~16 MB (valor negativo = KiB)
+)
+
+# Quantidade de comandos SQL preparados mantidos em cache por conexão (padrão do sqlite3 é 128)
+STATEMENT_CACHE_SIZE = 512
+
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except sqlite3.Error:
+        pass
+
+
+class _ThreadConnection:
+    """
+    Conexão guardada no threading.local de uma thread.
+    """
+    __slots__ = ('conn', '__weakref__')
+
+    def __init__(self, conn):
+        self.conn = conn
+
+
+class ConnectionManager:
+    """
+    Mantém conexões SQLite de longa duração, já configuradas, reutilizadas durante
+    todo o processo. Cada thread recebe a sua própria conexão (o sqlite3 não permite
+    compartilhar a mesma conexão entre threads com segurança).
+    """
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self._local = threading.local()
+        # Conexões das threads vivas; quando uma thread termina, o seu _ThreadConnection
+        # é descartado junto com o threading.local e a conexão é fechada
+        self._connections = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.db_file,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            cached_statements=STATEMENT_CACHE_SIZE,
+            check_same_thread=False,
+        )
+        conn.row_factory = sqlite3.Row  # Isso permite acessar colunas como dicionários
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def connection(self):
+        """
+        Retorna a conexão da thread atual, abrindo-a na primeira chamada.
+        """
+        holder = getattr(self._local, 'holder', None)
+        if holder is None:
+            holder = _ThreadConnection(self._connect())
+            weakref.finalize(holder, _close_quietly, holder.conn)
+            self._local.holder = holder
+            with self._lock:
+                self._connections.add(holder)
+        return holder.conn
+
+    @contextmanager
+    def cursor(self):
+        """
+        Fornece um cursor da conexão compartilhada. Não faz commit.
+        """
+        cursor = self.connection().cursor()
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+
+    @contextmanager
+    def transaction(self, immediate=False):
+        """
+        Fornece um cursor dentro de uma transação: commit ao final do bloco,
+        rollback se ocorrer uma exceção. Com 'immediate', a trava de escrita é obtida
+        logo no início (BEGIN IMMEDIATE), evitando falhas ao promover uma leitura a escrita.
+        """
+        conn = self.connection()
+        cursor = conn.cursor()
+        try:
+            if immediate:
+                cursor.execute("BEGIN IMMEDIATE")
+            yield cursor
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def close_all(self):
+        """
+        Fecha todas as conexões abertas pelo gerenciador.
+        """
+        with self._lock:
+            holders, self._connections = list(self._connections), weakref.WeakSet()
+        for holder in holders:
+            _close_quietly(holder.conn)
+        self._local = threading.local()
+
+
+_manager = ConnectionManager(DB_FILE)
+atexit.register(_manager.close_all)
+
+# Gravações do processo serializadas em uma única thread com group commit (core.writer).
+# Registrado depois do gerenciador: ao sair, a fila é gravada antes de as conexões fecharem.
+_writer = DatabaseWriter(_manager.connection)
+atexit.register(_writer.close)
+
 
 def get_db_connection():
     """
-    Retorna uma conexão com o banco de dados SQLite.
-    Cria o arquivo do banco de dados se ele não existir.
+    Retorna a conexão SQLite compartilhada da thread atual.
+    A conexão é reutilizada entre chamadas e NÃO deve ser fechada pelo chamador.
     """
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row  # Isso permite acessar colunas como dicionários
-    return conn
+    return _manager.connection()
 
-def create_tables():
+def db_cursor():
+    """
+    Context manager que fornece um cursor da conexão compartilhada (somente leitura).
+    """
+    return _manager.cursor()
+
+def db_transaction(immediate=False):
+    """
+    Context manager que fornece um cursor e faz commit (ou rollback) ao final.
+    """
+    return _manager.transaction(immediate)
+
+def run_write(func, *args):
+    """
+    Executa 'func(cursor, *args)' na thread de escrita, dentro de uma transação
+    compartilhada com as demais gravações enfileiradas, e espera o COMMIT.
+    Retorna o valor devolvido por 'func' ou lança a exceção que ela lançou
+    (nesse caso só as alterações feitas por 'func' são desfeitas).
+    """
+    return _writer.run(func, *args)
+
+def submit_write(func, *args):
     """
-    Cria as tabelas de Pacientes, Medicos e Atestados se elas não existirem.
+    Como run_write, mas sem esperar: retorna um concurrent.futures.Future.
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    return _writer.submit(func, *args)
 
+def get_writer_stats():
+    """
+    Contadores da thread de escrita: fila atual e máxima, transações, gravações,
+    falhas, maior grupo e tempo de espera pela trava de escrita (ms).
+    """
+    return _writer.stats()
+
+def configure_database(db_file):
+    """
+    Passa a usar outro arquivo de banco de dados (grava a fila de escrita e fecha as conexões abertas).
+    """
+    global DB_FILE
+    _writer.close()
+    _manager.close_all()
+    _manager.db_file = DB_FILE = db_file
+
+def close_db_connections():
+    """
+    Fecha as conexões compartilhadas (chamado automaticamente ao sair).
+    """
+    _writer.close()
+    _manager.close_all()
+
+# --- Migrações de esquema ---
+# Cada migração é aplicada uma única vez, em ordem, dentro de uma transação.
+# A versão aplicada fica gravada em PRAGMA user_version no próprio arquivo do banco.
+
+def _migracao_tabelas_iniciais(cursor):
+    """
+    Versão 1: tabelas de Pacientes, Medicos e Atestados.
+    Usa IF NOT EXISTS para adotar bancos criados antes do controle de versão.
+    """
     # Tabela Pacientes
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS pacientes (
@@ -57,10 +248,662 @@ def create_tables():
         )
     ''')
 
+def _migracao_indices_consulta(cursor):
+    """
+    Versão 2: índices usados pelo preenchimento automático, pelos completers
+    e pelas consultas de histórico de atestados.
+    """
+    # Histórico por paciente/médico ordenado por data e consultas por período
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_atestados_paciente_data ON atestados (paciente_id, data_atestado)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_atestados_medico_data ON atestados (medico_id, data_atestado)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_atestados_data ON atestados (data_atestado)")
+    # Busca por nome exato e SELECT DISTINCT ... ORDER BY dos completers (índice cobre a consulta)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_pacientes_nome ON pacientes (nome_completo)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_medicos_nome ON medicos (nome_completo)")
+    # Busca por tipo + número de registro
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_medicos_registro ON medicos (tipo_crm, crm)")
+    cursor.execute("ANALYZE")
+
+def _migracao_indice_prefixo_pacientes(cursor):
+    """
+    Versão 3: índice sem distinção de maiúsculas/minúsculas para a busca paginada
+    por prefixo do completer de pacientes (ordem e paginação por chave usam o índice).
+    """
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_pacientes_nome_nocase ON pacientes (nome_completo COLLATE NOCASE, nome_completo)")
+
+def _migracao_registro_unico_medicos(cursor):
+    """
+    Versão 4: a unicidade de médicos passa a ser (tipo_crm, crm), a mesma chave usada
+    nas buscas e no UPSERT, em vez do número de registro sozinho (um CRM e um CRO podem
+    ter o mesmo número). O SQLite não altera restrições existentes, então a tabela é recriada.
+    """
+    cursor.execute('''
+        CREATE TABLE medicos_novo (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome_completo TEXT NOT NULL,
+            tipo_crm TEXT NOT NULL DEFAULT 'CRM',
+            crm TEXT,
+            uf_crm TEXT,
+            UNIQUE (tipo_crm, crm)
+        )
+    ''')
+    cursor.execute("INSERT INTO medicos_novo (id, nome_completo, tipo_crm, crm, uf_crm) SELECT id, nome_completo, tipo_crm, crm, uf_crm FROM medicos")
+    cursor.execute("DROP TABLE medicos")
+    cursor.execute("ALTER TABLE medicos_novo RENAME TO medicos")
+    # O índice UNIQUE (tipo_crm, crm) substitui idx_medicos_registro
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_medicos_nome ON medicos (nome_completo)")
+
+def _migracao_arquivo_documentos(cursor):
+    """
+    Versão 5: índice do arquivo compactado de documentos (core.archive).
+    Cada documento é guardado uma única vez, identificado pelo hash do conteúdo,
+    e cada atestado aponta para o documento gerado mais recentemente.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS documentos_arquivo (
+            hash TEXT PRIMARY KEY,
+            shard TEXT NOT NULL,
+            tamanho INTEGER NOT NULL,
+            arquivado_em TEXT NOT NULL
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS atestado_documentos (
+            atestado_id INTEGER PRIMARY KEY,
+            hash TEXT NOT NULL,
+            nome_arquivo TEXT NOT NULL,
+            FOREIGN KEY (atestado_id) REFERENCES atestados(id),
+            FOREIGN KEY (hash) REFERENCES documentos_arquivo(hash)
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_atestado_documentos_hash ON atestado_documentos (hash)")
+
+# --- Resumos para relatórios (core.reports) ---
+# Totais por empresa/mês, CID/mês e médico mantidos por gatilhos a cada inserção,
+# alteração ou exclusão de atestado. A empresa é a atual do paciente: quando ela
+# muda, os totais do histórico do paciente passam para a nova empresa.
+
+def _mes_ddmmaaaa(column):
+    # Mês (aaaa-mm) de uma data gravada como dd/mm/aaaa
+    return f"substr({column}, 7, 4) || '-' || substr({column}, 4, 2)"
+
+def _create_summary_triggers(cursor, month_of):
+    """
+    (Re)cria os gatilhos que mantêm as tabelas de resumo. 'month_of(coluna)' retorna
+    a expressão SQL do mês (aaaa-mm) da data gravada na coluna.
+    """
+    for name in ("trg_resumo_atestado_insert", "trg_resumo_atestado_delete",
+                 "trg_resumo_atestado_update", "trg_resumo_paciente_empresa"):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+    def add(row, sign):
+        # Soma (sign = '+') ou subtrai (sign = '-') o atestado 'row' (NEW/OLD) dos três resumos
+        dias = f"{sign}{row}.qtd_dias_atestado"
+        count = f"{sign}1"
+        return f'''
+            INSERT INTO resumo_empresa_mes (empresa, mes, atestados, dias)
+            VALUES (COALESCE((SELECT empresa FROM pacientes WHERE id = {row}.paciente_id), ''), {month_of(row + ".data_atestado")}, {count}, {dias})
+            ON CONFLICT (empresa, mes) DO UPDATE SET atestados = atestados + excluded.atestados, dias = dias + excluded.dias;
+            INSERT INTO resumo_cid_mes (codigo_cid, mes, atestados, dias)
+            VALUES ({row}.codigo_cid, {month_of(row + ".data_atestado")}, {count}, {dias})
+            ON CONFLICT (codigo_cid, mes) DO UPDATE SET atestados = atestados + excluded.atestados, dias = dias + excluded.dias;
+            INSERT INTO resumo_medico (medico_id, atestados, dias)
+            VALUES (COALESCE({row}.medico_id, 0), {count}, {dias})
+            ON CONFLICT (medico_id) DO UPDATE SET atestados = atestados + excluded.atestados, dias = dias + excluded.dias;
+        '''
+
+    # Linhas zeradas por exclusões não ficam nos resumos
+    prune = '''
+            DELETE FROM resumo_empresa_mes WHERE atestados = 0;
+            DELETE FROM resumo_cid_mes WHERE atestados = 0;
+            DELETE FROM resumo_medico WHERE atestados = 0;
+    '''
+
+    cursor.execute(f"CREATE TRIGGER trg_resumo_atestado_insert AFTER INSERT ON atestados BEGIN {add('NEW', '+')} END")
+    cursor.execute(f"CREATE TRIGGER trg_resumo_atestado_delete AFTER DELETE ON atestados BEGIN {add('OLD', '-')} {prune} END")
+    cursor.execute(f'''
+        CREATE TRIGGER trg_resumo_atestado_update
+        AFTER UPDATE OF paciente_id, medico_id, data_atestado, qtd_dias_atestado, codigo_cid ON atestados
+        BEGIN {add('OLD', '-')} {add('NEW', '+')} {prune} END
+    ''')
+    # Troca de empresa do paciente: o histórico dele passa, mês a mês, para a nova empresa
+    cursor.execute(f'''
+        CREATE TRIGGER trg_resumo_paciente_empresa
+        AFTER UPDATE OF empresa ON pacientes
+        WHEN OLD.empresa IS NOT NEW.empresa
+        BEGIN
+            INSERT INTO resumo_empresa_mes (empresa, mes, atestados, dias)
+            SELECT COALESCE(OLD.empresa, ''), {month_of("data_atestado")}, -COUNT(*), -SUM(qtd_dias_atestado)
+            FROM atestados WHERE paciente_id = OLD.id GROUP BY 2
+            ON CONFLICT (empresa, mes) DO UPDATE SET atestados = atestados + excluded.atestados, dias = dias + excluded.dias;
+            INSERT INTO resumo_empresa_mes (empresa, mes, atestados, dias)
+            SELECT COALESCE(NEW.empresa, ''), {month_of("data_atestado")}, COUNT(*), SUM(qtd_dias_atestado)
+            FROM atestados WHERE paciente_id = NEW.id GROUP BY 2
+            ON CONFLICT (empresa, mes) DO UPDATE SET atestados = atestados + excluded.atestados, dias = dias + excluded.dias;
+            DELETE FROM resumo_empresa_mes WHERE atestados = 0;
+        END
+    ''')
+
+def _rebuild_summaries(cursor, month_of):
+    """
+    Recalcula as tabelas de resumo a partir de todos os atestados.
+    """
+    cursor.execute("DELETE FROM resumo_empresa_mes")
+    cursor.execute("DELETE FROM resumo_cid_mes")
+    cursor.execute("DELETE FROM resumo_medico")
+    cursor.execute(f'''
+        INSERT INTO resumo_empresa_mes (empresa, mes, atestados, dias)
+        SELECT COALESCE(p.empresa, ''), {month_of("a.data_atestado")}, COUNT(*), SUM(a.qtd_dias_atestado)
+        FROM atestados a LEFT JOIN pacientes p ON p.id = a.paciente_id
+        GROUP BY 1, 2
+    ''')
+    cursor.execute(f'''
+        INSERT INTO resumo_cid_mes (codigo_cid, mes, atestados, dias)
+        SELECT codigo_cid, {month_of("data_atestado")}, COUNT(*), SUM(qtd_dias_atestado)
+        FROM atestados GROUP BY 1, 2
+    ''')
+    cursor.execute('''
+        INSERT INTO resumo_medico (medico_id, atestados, dias)
+        SELECT COALESCE(medico_id, 0), COUNT(*), SUM(qtd_dias_atestado)
+        FROM atestados GROUP BY 1
+    ''')
+
+def _migracao_resumos_relatorios(cursor):
+    """
+    Versão 6: tabelas de resumo para os relatórios (empresa/mês, CID/mês, médico),
+    mantidas por gatilhos e preenchidas a partir dos atestados existentes.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS resumo_empresa_mes (
+            empresa TEXT NOT NULL,
+            mes TEXT NOT NULL,
+            atestados INTEGER NOT NULL,
+            dias INTEGER NOT NULL,
+            PRIMARY KEY (empresa, mes)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS resumo_cid_mes (
+            codigo_cid TEXT NOT NULL,
+            mes TEXT NOT NULL,
+            atestados INTEGER NOT NULL,
+            dias INTEGER NOT NULL,
+            PRIMARY KEY (codigo_cid, mes)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS resumo_medico (
+            medico_id INTEGER PRIMARY KEY,
+            atestados INTEGER NOT NULL,
+            dias INTEGER NOT NULL
+        )
+    ''')
+    # Consultas por período sem filtro de empresa/CID
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_resumo_empresa_mes_mes ON resumo_empresa_mes (mes)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_resumo_cid_mes_mes ON resumo_cid_mes (mes)")
+    _create_summary_triggers(cursor, _mes_ddmmaaaa)
+    _rebuild_summaries(cursor, _mes_ddmmaaaa)
+
+def _mes_iso(column):
+    # Mês (aaaa-mm) de uma data gravada como aaaa-mm-dd
+    return f"substr({column}, 1, 7)"
+
+# Expressão do mês de data_atestado no formato atualmente gravado
+_month_of_data_atestado = _mes_iso
+
+# Quantidade de atestados convertidos por transação na migração de datas
+DATE_MIGRATION_CHUNK_SIZE = 50000
+
+def _iso_from_ddmmaaaa(column):
+    # Expressão que converte 'column' de dd/mm/aaaa para aaaa-mm-dd (outros valores ficam como estão)
+    return (f"CASE WHEN {column} GLOB '[0-9][0-9]/[0-9][0-9]/[0-9][0-9][0-9][0-9]*' "
+            f"THEN substr({column}, 7, 4) || '-' || substr({column}, 4, 2) || '-' || substr({column}, 1, 2) || substr({column}, 11) "
+            f"ELSE {column} END")
+
+def _migracao_datas_iso(cursor):
+    """
+    Versão 7: data_atestado e data_homologacao passam de dd/mm/aaaa para aaaa-mm-dd,
+    que ordena como texto: consultas por período usam idx_atestados_data e
+    idx_atestados_paciente_data. A conversão é feita em lotes de ids, cada um em
+    sua própria transação, para não segurar o bloqueio de escrita em bancos grandes.
+    O andamento fica em migracoes_em_andamento: uma estação que abre o banco durante
+    a conversão (ou depois de uma interrupção) continua do lote seguinte, em vez de
+    recomeçar ou usar o banco antes do fim. A última transação recria índices e
+    gatilhos e recalcula os resumos a partir de todos os atestados (incluindo o que
+    foi gravado enquanto os gatilhos estavam removidos); run_migrations grava a nova
+    versão nessa mesma transação.
+    """
+    conn = cursor.connection
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS migracoes_em_andamento (
+            versao INTEGER PRIMARY KEY,
+            proximo_id INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute("SELECT 1 FROM migracoes_em_andamento WHERE versao = 7")
+    if cursor.fetchone() is None:
+        # Sem os gatilhos durante a conversão: cada UPDATE dispararia o recálculo dos resumos
+        for name in ("trg_resumo_atestado_insert", "trg_resumo_atestado_delete",
+                     "trg_resumo_atestado_update", "trg_resumo_paciente_empresa"):
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+        # Índices sobre data_atestado são recriados no final: atualizá-los linha a linha custa mais
+        for name in ("idx_atestados_paciente_data", "idx_atestados_medico_data", "idx_atestados_data"):
+            cursor.execute(f"DROP INDEX IF EXISTS {name}")
+        cursor.execute("INSERT INTO migracoes_em_andamento (versao, proximo_id) SELECT 7, COALESCE(MIN(id), 0) FROM atestados")
     conn.commit()
-    conn.close()
+
+    pattern = "'[0-9][0-9]/[0-9][0-9]/[0-9][0-9][0-9][0-9]'"
+    while True:
+        cursor.execute("BEGIN IMMEDIATE")
+        if get_schema_version(conn) >= 7:
+            # Outra estação concluiu a migração enquanto esta esperava a trava
+            return
+        cursor.execute("SELECT proximo_id FROM migracoes_em_andamento WHERE versao = 7")
+        start = cursor.fetchone()[0]
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM atestados")
+        if start > cursor.fetchone()[0]:
+            break
+        stop = start + DATE_MIGRATION_CHUNK_SIZE
+        cursor.execute(f'''
+            UPDATE atestados
+            SET data_atestado = {_iso_from_ddmmaaaa("data_atestado")},
+                data_homologacao = {_iso_from_ddmmaaaa("data_homologacao")}
+            WHERE id >= ? AND id < ?
+              AND (data_atestado GLOB {pattern} OR data_homologacao GLOB {pattern})
+        ''', (start, stop))
+        cursor.execute("UPDATE migracoes_em_andamento SET proximo_id = ? WHERE versao = 7", (stop,))
+        conn.commit()
+
+    # Última transação, com a trava de escrita já obtida
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_atestados_paciente_data ON atestados (paciente_id, data_atestado)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_atestados_medico_data ON atestados (medico_id, data_atestado)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_atestados_data ON atestados (data_atestado)")
+
+    # Data de arquivamento dos documentos (dd/mm/aaaa hh:mm:ss)
+    cursor.execute(f"UPDATE documentos_arquivo SET arquivado_em = {_iso_from_ddmmaaaa('arquivado_em')}")
+
+    _create_summary_triggers(cursor, _mes_iso)
+    _rebuild_summaries(cursor, _mes_iso)
+    cursor.execute("DELETE FROM migracoes_em_andamento WHERE versao = 7")
+    cursor.execute("ANALYZE")
+
+def rebuild_summaries():
+    """
+    Recalcula as tabelas de resumo em uma transação (reconstrução manual, por exemplo
+    após alterações feitas com os gatilhos desativados). Retorna o tempo gasto em segundos.
+    """
+    started = time.perf_counter()
+    with db_transaction(immediate=True) as cursor:
+        _rebuild_summaries(cursor, _month_of_data_atestado)
+    return time.perf_counter() - started
+
+# Último dia coberto pelo atestado (aaaa-mm-dd). A mesma expressão é usada no
+# índice idx_atestados_paciente_fim e nas consultas, para que o índice seja usado.
+DATA_FIM_SQL = "date(data_atestado, '+' || max(qtd_dias_atestado - 1, 0) || ' days')"
+
+def _migracao_indice_fim_afastamento(cursor):
+    """
+    Versão 8: índice (paciente, último dia do afastamento) para a verificação de
+    sobreposição: os atestados do paciente que terminam a partir do início do novo
+    período são encontrados por uma busca no índice, sem percorrer o histórico.
+    """
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_atestados_paciente_fim ON atestados (paciente_id, {DATA_FIM_SQL})")
+
+def _migracao_deslocamento_documentos(cursor):
+    """
+    Versão 9: posição do conteúdo de cada documento dentro do shard. A leitura vai
+    direto ao deslocamento, sem depender do diretório central do .zip (reescrito a
+    cada acréscimo), de modo que um acréscimo interrompido não torna ilegíveis os
+    documentos já gravados. Documentos anteriores (NULL) são lidos pelo diretório central.
+    """
+    cursor.execute("ALTER TABLE documentos_arquivo ADD COLUMN deslocamento INTEGER")
+
+def _migracao_nome_busca_pacientes(cursor):
+    """
+    Versão 10: coluna nome_busca (nome em minúsculas e sem acentos, ver
+    core.validation.fold_name) com índice, para que a busca por início do nome
+    encontre "ícaro" ou "JOÃO" (COLLATE NOCASE só ignora maiúsculas em ASCII).
+    Substitui o índice idx_pacientes_nome_nocase.
+    """
+    cursor.execute("ALTER TABLE pacientes ADD COLUMN nome_busca TEXT")
+    cursor.execute("SELECT id, nome_completo FROM pacientes")
+    cursor.executemany(
+        "UPDATE pacientes SET nome_busca = ? WHERE id = ?",
+        [(fold_name(nome), paciente_id) for paciente_id, nome in cursor.fetchall()]
+    )
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_pacientes_nome_busca ON pacientes (nome_busca, nome_completo)")
+    cursor.execute("DROP INDEX IF EXISTS idx_pacientes_nome_nocase")
+
+def _migracao_indices_filtros_historico(cursor):
+    """
+    Versão 11: índices para os filtros de empresa e CID do histórico, resolvidos
+    por faixa de índice (empresa sem distinção de maiúsculas, como o LIKE anterior).
+    """
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_pacientes_empresa ON pacientes (empresa COLLATE NOCASE)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_atestados_cid ON atestados (codigo_cid)")
+
+# Lista ordenada de (versão, função). Novas migrações devem ser adicionadas ao final.
+MIGRATIONS = [
+    (1, _migracao_tabelas_iniciais),
+    (2, _migracao_indices_consulta),
+    (3, _migracao_indice_prefixo_pacientes),
+    (4, _migracao_registro_unico_medicos),
+    (5, _migracao_arquivo_documentos),
+    (6, _migracao_resumos_relatorios),
+    (7, _migracao_datas_iso),
+    (8, _migracao_indice_fim_afastamento),
+    (9, _migracao_deslocamento_documentos),
+    (10, _migracao_nome_busca_pacientes),
+    (11, _migracao_indices_filtros_historico),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def get_schema_version(conn=None):
+    """
+    Retorna a versão de esquema gravada no banco (PRAGMA user_version).
+    """
+    conn = conn or get_db_connection()
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def run_migrations(conn=None):
+    """
+    Aplica, em ordem, as migrações ainda não aplicadas ao banco.
+    Retorna a lista de versões aplicadas (vazia se o banco já está atualizado).
+    """
+    conn = conn or get_db_connection()
+    if get_schema_version(conn) >= SCHEMA_VERSION:
+        return []
+
+    applied = []
+    for version, migration in MIGRATIONS:
+        cursor = conn.cursor()
+        try:
+            # BEGIN IMMEDIATE impede que duas estações apliquem a mesma migração ao mesmo tempo
+            cursor.execute("BEGIN IMMEDIATE")
+            if get_schema_version(conn) >= version:
+                conn.rollback()
+                continue
+            migration(cursor)
+            # A migração em lotes (versão 7) faz commit entre os lotes; se outra estação
+            # a concluiu nesse meio-tempo, a versão já está gravada
+            if get_schema_version(conn) >= version:
+                conn.rollback()
+                continue
+            cursor.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+            applied.append(version)
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+    return applied
+
+def create_tables():
+    """
+    Cria ou atualiza o esquema do banco de dados (tabelas e índices).
+    Se o banco já estiver na versão atual, nenhuma instrução DDL é executada.
+    """
+    return run_migrations()
+
+def normalize_cpf(cpf):
+    """
+    Mantém apenas os dígitos do CPF (formato gravado no banco).
+    """
+    return ''.join(filter(str.isdigit, cpf or ''))
+
+# RETURNING existe a partir do SQLite 3.35; versões anteriores usam um SELECT após o UPSERT
+HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+_UPSERT_PACIENTE = '''
+    INSERT INTO pacientes (nome_completo, cpf, cargo, empresa, nome_busca) VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (cpf) DO UPDATE SET
+        nome_completo = excluded.nome_completo,
+        nome_busca = excluded.nome_busca,
+        cargo = excluded.cargo,
+        empresa = excluded.empresa
+'''
+
+_UPSERT_MEDICO = '''
+    INSERT INTO medicos (nome_completo, tipo_crm, crm, uf_crm) VALUES (?, ?, ?, ?)
+    ON CONFLICT (tipo_crm, crm) DO UPDATE SET
+        nome_completo = excluded.nome_completo,
+        uf_crm = excluded.uf_crm
+'''
+
+def _upsert_returning_id(cursor, upsert_sql, params, select_sql, select_params):
+    if HAS_RETURNING:
+        cursor.execute(upsert_sql + " RETURNING id", params)
+        return cursor.fetchone()[0]
+    cursor.execute(upsert_sql, params)
+    cursor.execute(select_sql, select_params)
+    return cursor.fetchone()[0]
+
+def leave_end_date(data_atestado, qtd_dias):
+    """
+    Último dia (aaaa-mm-dd) coberto por um atestado de 'qtd_dias' dias a partir de 'data_atestado'.
+    """
+    return (parse_date(data_atestado) + timedelta(days=max(int(qtd_dias) - 1, 0))).isoformat()
+
+def find_overlaps(cursor, paciente_id, data_inicio, data_fim, exclude_id=None):
+    """
+    Atestados do paciente cujo período [data_atestado, data_fim] coincide com
+    [data_inicio, data_fim] (aaaa-mm-dd). Uma única busca em idx_atestados_paciente_fim:
+    só são lidos os atestados que terminam a partir de 'data_inicio' (o '+' impede que
+    o planejador troque esse índice pela faixa de data_atestado, que leria o histórico).
+    """
+    cursor.execute(f'''
+        SELECT id, data_atestado, {DATA_FIM_SQL} AS data_fim, qtd_dias_atestado, codigo_cid
+        FROM atestados
+        WHERE paciente_id = ? AND {DATA_FIM_SQL} >= ? AND +data_atestado <= ? AND id IS NOT ?
+        ORDER BY data_atestado
+    ''', (paciente_id, data_inicio, data_fim, exclude_id))
+    return [dict(row) for row in cursor.fetchall()]
+
+def _insert_declaration(cursor, data, data_atestado, data_homologacao, allow_overlap):
+    cpf_para_db = normalize_cpf(data.get("cpf_paciente", ''))
+    tipo_registro = data.get("tipo_registro_medico")
+    numero_registro = data.get("crm__medico")
+
+    paciente_id = _upsert_returning_id(
+        cursor, _UPSERT_PACIENTE,
+        (data.get("nome_paciente"), cpf_para_db, data.get("cargo_paciente"), data.get("empresa_paciente"),
+         fold_name(data.get("nome_paciente"))),
+        "SELECT id FROM pacientes WHERE cpf = ?", (cpf_para_db,)
+    )
+    if not allow_overlap:
+        # Dentro da transação de escrita: nenhuma outra estação grava entre a verificação e o INSERT
+        overlaps = find_overlaps(cursor, paciente_id, data_atestado, leave_end_date(data_atestado, data.get("qtd_dias_atestado") or 1))
+        if overlaps:
+            raise OverlapError(overlaps)
+    medico_id = _upsert_returning_id(
+        cursor, _UPSERT_MEDICO,
+        (data.get("nome_medico"), tipo_registro, numero_registro, data.get("uf_crm_medico")),
+        "SELECT id FROM medicos WHERE tipo_crm = ? AND crm = ?", (tipo_registro, numero_registro)
+    )
+    cursor.execute(
+        "INSERT INTO atestados (paciente_id, medico_id, data_atestado, qtd_dias_atestado, codigo_cid, data_homologacao) VALUES (?, ?, ?, ?, ?, ?)",
+        (paciente_id, medico_id, data_atestado, data.get("qtd_dias_atestado"), data.get("codigo_cid"), data_homologacao)
+    )
+    return cursor.lastrowid, paciente_id, medico_id
+
+def persist_declaration(data, data_homologacao=None, allow_overlap=False):
+    """
+    Grava (ou atualiza) o paciente e o médico informados e registra o atestado,
+    em uma única transação: um UPSERT por entidade, que já devolve o id, e o INSERT
+    do atestado com esses ids. Retorna (id do atestado, id do paciente, id do médico).
+    'data' usa as mesmas chaves do formulário da janela principal.
+    As datas são gravadas em aaaa-mm-dd (aceitas também em dd/mm/aaaa);
+    'data_homologacao' assume a data de hoje quando não informada.
+    Se o período coincidir com outro atestado do mesmo paciente, lança OverlapError
+    (nada é gravado), a menos que 'allow_overlap' seja verdadeiro.
+    A gravação passa pela thread de escrita (run_write), junto com as demais do processo.
+    """
+    data_homologacao = to_iso_date(data_homologacao) if data_homologacao else date.today().isoformat()
+    data_atestado = to_iso_date(data.get("data_atestado"))
+
+    with span("db.persistencia"):
+        return run_write(_insert_declaration, data, data_atestado, data_homologacao, allow_overlap)
+
+def save_or_update_data(data, data_homologacao=None, allow_overlap=False):
+    """
+    Grava paciente, médico e atestado (ver persist_declaration). Retorna o id do atestado.
+    """
+    return persist_declaration(data, data_homologacao, allow_overlap)[0]
+
+# --- Importação em massa de pacientes e médicos ---
+
+# Linhas enviadas ao banco por chamada de executemany
+IMPORT_CHUNK_SIZE = 5000
+
+
+@dataclass
+class ImportReport:
+    """
+    Resultado de uma importação em massa. 'errors' guarda (linha do arquivo, motivo)
+    das linhas rejeitadas.
+    """
+    inserted: int = 0
+    updated: int = 0
+    rejected: int = 0
+    errors: list = field(default_factory=list)
+    elapsed: float = 0.0
+
+    def reject(self, line_number, message):
+        self.rejected += 1
+        self.errors.append((line_number, message))
+
+    def summary(self):
+        return (f"Inseridos: {self.inserted} | Atualizados: {self.updated} | "
+                f"Rejeitados: {self.rejected} | Tempo: {self.elapsed:.2f}s")
+
+
+@contextmanager
+def _deferred_indexes(cursor, table):
+    """
+    Remove os índices secundários de 'table' durante o bloco e os recria ao final
+    (na mesma transação). Reconstruir um índice de uma vez é bem mais rápido que
+    mantê-lo linha a linha em cargas grandes. Índices UNIQUE implícitos das colunas
+    (usados para detectar registros já existentes) não são tocados.
+    """
+    cursor.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+        (table,)
+    )
+    indexes = cursor.fetchall()
+    for index in indexes:
+        cursor.execute(f'DROP INDEX "{index["name"]}"')
+    yield
+    for index in indexes:
+        cursor.execute(index["sql"])
+
+def _should_defer_indexes(cursor, table, path):
+    # Vale a pena reconstruir os índices quando a carga é grande em relação à tabela
+    with open(path, 'rb') as f:
+        incoming = sum(1 for _ in f)
+    cursor.execute(f"SELECT COUNT(*) FROM {table}")
+    return incoming >= 1000 and incoming * 4 >= cursor.fetchone()[0]
+
+def _bulk_upsert(path, table, key_columns, value_columns, parse_row, defer_indexes=None):
+    """
+    Núcleo da importação: lê o CSV em fluxo, separa inserções de atualizações pela chave
+    e grava tudo com executemany, em lotes. A importação é uma única gravação da thread
+    de escrita (run_write): a transação já começa com a trava de escrita, de modo que a
+    leitura das chaves existentes não precisa ser promovida a escrita depois.
+    'parse_row' recebe o dicionário da linha e retorna a tupla chave + valores, ou lança ValueError.
+    """
+    report = ImportReport()
+    started = time.perf_counter()
+    key_sql = " AND ".join(f"{column} = ?" for column in key_columns)
+    columns = key_columns + value_columns
+    insert_sql = f"INSERT OR IGNORE INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})"
+    update_sql = f"UPDATE {table} SET {', '.join(f'{column} = ?' for column in value_columns)} WHERE {key_sql}"
+    key_size = len(key_columns)
+
+    def import_rows(cursor, defer_indexes):
+        conn = cursor.connection
+        cursor.execute(f"SELECT {', '.join(key_columns)} FROM {table}")
+        existing = {tuple(row) for row in cursor.fetchall()}
+        if defer_indexes is None:
+            defer_indexes = _should_defer_indexes(cursor, table, path)
+
+        def flush(inserts, updates):
+            if inserts:
+                before = conn.total_changes
+                cursor.executemany(insert_sql, inserts)
+                inserted = conn.total_changes - before
+                report.inserted += inserted
+                # Conflitos com outras restrições UNIQUE da tabela são ignorados e contados como rejeitados
+                if inserted < len(inserts):
+                    report.rejected += len(inserts) - inserted
+                    report.errors.append((None, f"{len(inserts) - inserted} linha(s) em conflito com registros existentes."))
+            if updates:
+                cursor.executemany(update_sql, updates)
+                report.updated += len(updates)
+
+        with (_deferred_indexes(cursor, table) if defer_indexes else nullcontext()):
+            inserts, updates = [], []
+            for line_number, row in iter_csv_rows(path):
+                try:
+                    values = parse_row(row)
+                except ValueError as e:
+                    report.reject(line_number, str(e))
+                    continue
+                key = values[:key_size]
+                if key in existing:
+                    updates.append(values[key_size:] + key)
+                else:
+                    existing.add(key)
+                    inserts.append(values)
+                if len(inserts) + len(updates) >= IMPORT_CHUNK_SIZE:
+                    # Inserções antes das atualizações: uma linha repetida no arquivo atualiza a recém-inserida
+                    flush(inserts, updates)
+                    inserts, updates = [], []
+            flush(inserts, updates)
+
+    run_write(import_rows, defer_indexes)
+    report.elapsed = time.perf_counter() - started
+    return report
+
+def _parse_patient_row(row):
+    nome = first_value(row, "nome_completo", "nome", "nome_paciente")
+    cpf = normalize_cpf(first_value(row, "cpf", "cpf_paciente"))
+    if not nome:
+        raise ValueError("Nome do paciente não informado.")
+    if len(cpf) != 11:
+        raise ValueError("CPF inválido ou incompleto.")
+    return (cpf, nome, first_value(row, "cargo", "cargo_paciente"), first_value(row, "empresa", "empresa_paciente"),
+            fold_name(nome))
+
+def _parse_doctor_row(row):
+    nome = first_value(row, "nome_completo", "nome", "nome_medico")
+    tipo = (first_value(row, "tipo_crm", "tipo_registro_medico", "tipo_registro") or "CRM").upper()
+    crm = first_value(row, "crm", "crm__medico", "numero_registro")
+    if not nome:
+        raise ValueError("Nome do médico não informado.")
+    if not crm:
+        raise ValueError("Número de registro não informado.")
+    return (tipo, crm, nome, first_value(row, "uf_crm", "uf_crm_medico", "uf").upper())
+
+def bulk_import_patients(path, defer_indexes=None):
+    """
+    Importa (ou atualiza pelo CPF) pacientes de um CSV com as colunas
+    nome_completo, cpf, cargo e empresa. O CPF é gravado apenas com dígitos.
+    Retorna um ImportReport.
+    """
+    return _bulk_upsert(path, "pacientes", ["cpf"], ["nome_completo", "cargo", "empresa", "nome_busca"], _parse_patient_row, defer_indexes)
+
+def bulk_import_doctors(path, defer_indexes=None):
+    """
+    Importa (ou atualiza pelo tipo + número de registro) médicos de um CSV com as
+    colunas nome_completo, tipo_crm, crm e uf_crm. Retorna um ImportReport.
+    """
+    return _bulk_upsert(path, "medicos", ["tipo_crm", "crm"], ["nome_completo", "uf_crm"], _parse_doctor_row, defer_indexes)
 
 if __name__ == '__main__':
-    create_tables()
+    applied = create_tables()
     print(f"Banco de dados criado em: {DB_FILE}")
-    print("Tabelas 'pacientes', 'medicos' e 'atestados' verificadas/criadas.")
\ No newline at end of file
+    if applied:
+        print(f"Migrações aplicadas: {', '.join(str(v) for v in applied)}")
+    print(f"Esquema na versão {get_schema_version()}.")
@@ -1,77 +1,304 @@
-from docx import Document
+import io
 import os
+import re
+import copy
+import threading
+from bisect import bisect_right
 from datetime import datetime
-import subprocess
+
+from core.instrumentation import span
+from core.validation import format_date_br
 
 # Define o caminho para o arquivo do modelo
 MODEL_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'models', 'modelo homologação.docx')
 # Define o caminho para a pasta onde os documentos gerados serão salvos
 OUTPUT_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'generated_documents')
 
-# Garante que a pasta de saída exista
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+# Placeholders existentes no modelo. A ordem não importa: a expressão combinada
+# testa primeiro as chaves mais longas.
+PLACEHOLDERS = (
+    "{nome_paciente}",
+    "{cpf_paciente}",
+    "{data_atestado}",
+    "{qtd_dias_atestado}",
+    "{código_cid}",
+    "{cargo_paciente}",
+    "{empresa_paciente}",
+    "___/___/____",
+    "{nome_medico}{crm__medico}-{uf_crm_medico}",
+)
+
+_W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_W_P = _W_NS + 'p'
+_W_T = _W_NS + 't'
+_XML_SPACE = '{http://www.w3.org/XML/1998/namespace}space'
+# Cabeçalhos e rodapés ficam em partes próprias do pacote, ligadas ao documento principal
+_HEADER_FOOTER_RELTYPES = (
+    'http://schemas.openxmlformats.org/officeDocument/2006/relationships/header',
+    'http://schemas.openxmlformats.org/officeDocument/2006/relationships/footer',
+)
 
-def generate_document(data):
+
+def build_replacements(data):
     """
-    Carrega o modelo .docx, substitui os placeholders pelos dados fornecidos
-    e salva o novo documento.
+    Monta o mapeamento placeholder -> texto a partir dos dados do atestado.
     """
-    try:
-        document = Document(MODEL_PATH)
-
-        # Mapeamento dos campos do modelo para os dados recebidos
-        replacements = {
-            "{nome_paciente}": data.get("nome_paciente", ""),
-            "{cpf_paciente}": data.get("cpf_paciente", ""), # AGORA PEGARÁ O CPF JÁ FORMATADO
-            "{data_atestado}": data.get("data_atestado", ""),
-            "{qtd_dias_atestado}": str(data.get("qtd_dias_atestado", "")),
-            "{código_cid}": data.get("codigo_cid", ""),
-            "{cargo_paciente}": data.get("cargo_paciente", ""),
-            "{empresa_paciente}": data.get("empresa_paciente", ""),
-            "___/___/____": datetime.now().strftime("%d/%m/%Y"),
-            
-            # Formatação do médico com tipo de registro
-            "{nome_medico}{crm__medico}-{uf_crm_medico}": 
-                f"{data.get('nome_medico', '')} {data.get('tipo_registro_medico', '')} {data.get('crm__medico', '')}-{data.get('uf_crm_medico', '')}."
-        }
-
-        # Iterar sobre todos os parágrafos do documento
-        for paragraph in document.paragraphs:
-            for key, value in replacements.items():
-                if key in paragraph.text:
-                    paragraph.text = paragraph.text.replace(key, value)
-        
-        # Iterar sobre todas as tabelas no documento
-        for table in document.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    for paragraph in cell.paragraphs:
-                        for key, value in replacements.items():
-                            if key in paragraph.text:
-                                paragraph.text = paragraph.text.replace(key, value)
-
-        # Gerar nome do arquivo de saída
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_filename = f"Declaracao_{data.get('nome_paciente', 'Paciente').replace(' ', '_')}_{timestamp}.docx"
-        output_path = os.path.join(OUTPUT_DIR, output_filename)
-
-        document.save(output_path)
-
-        # --- ABRIR O ARQUIVO AUTOMATICAMENTE ---
+    return {
+        "{nome_paciente}": data.get("nome_paciente", ""),
+        "{cpf_paciente}": data.get("cpf_paciente", ""), # AGORA PEGARÁ O CPF JÁ FORMATADO
+        "{data_atestado}": format_date_br(data.get("data_atestado", "")),
+        "{qtd_dias_atestado}": str(data.get("qtd_dias_atestado", "")),
+        "{código_cid}": data.get("codigo_cid", ""),
+        "{cargo_paciente}": data.get("cargo_paciente", ""),
+        "{empresa_paciente}": data.get("empresa_paciente", ""),
+        "___/___/____": datetime.now().strftime("%d/%m/%Y"),
+
+        # Formatação do médico com tipo de registro
+        "{nome_medico}{crm__medico}-{uf_crm_medico}":
+            f"{data.get('nome_medico', '')} {data.get('tipo_registro_medico', '')} {data.get('crm__medico', '')}-{data.get('uf_crm_medico', '')}."
+    }
+
+
+def _replace_in_paragraph(paragraph_element, pattern, replacements):
+    """
+    Substitui, em uma única passada, todas as ocorrências de placeholders de um parágrafo.
+    O texto é tratado nó a nó (<w:t>), então um placeholder dividido entre vários runs
+    é escrito no run onde começa e removido dos seguintes, preservando a formatação.
+    """
+    nodes = list(paragraph_element.iter(_W_T))
+    texts = [node.text or "" for node in nodes]
+    matches = list(pattern.finditer("".join(texts)))
+    if not matches:
+        return
+
+    # Posição inicial de cada nó no texto concatenado
+    starts = []
+    offset = 0
+    for text in texts:
+        starts.append(offset)
+        offset += len(text)
+
+    # De trás para frente, para que os deslocamentos calculados continuem válidos
+    for match in reversed(matches):
+        # Nó que contém o primeiro e o último caractere da ocorrência
+        first = bisect_right(starts, match.start()) - 1
+        last = bisect_right(starts, match.end() - 1) - 1
+        head = texts[first][:match.start() - starts[first]]
+        tail = texts[last][match.end() - starts[last]:]
+        value = replacements.get(match.group(0), "")
+        if first == last:
+            texts[first] = head + value + tail
+        else:
+            texts[first] = head + value
+            for index in range(first + 1, last):
+                texts[index] = ""
+            texts[last] = tail
+
+    for node, text in zip(nodes, texts):
+        if node.text != text:
+            node.text = text
+            if text != text.strip():
+                node.set(_XML_SPACE, 'preserve')
+
+
+class CompiledTemplate:
+    """
+    Modelo .docx analisado uma única vez: guarda o documento protótipo, a expressão
+    regular combinada com todos os placeholders e o índice dos parágrafos que
+    realmente contêm algum placeholder (no corpo, em tabelas, cabeçalhos e rodapés).
+    """
+
+    def __init__(self, document, placeholders=PLACEHOLDERS):
+        self.prototype = document
+        keys = sorted(placeholders, key=len, reverse=True)
+        self.pattern = re.compile("|".join(re.escape(key) for key in keys))
+        self.locations = [
+            index for index, element in enumerate(self._paragraph_elements(document))
+            if self.pattern.search("".join(node.text or "" for node in element.iter(_W_T)))
+        ]
+
+    @staticmethod
+    def _paragraph_elements(document):
+        """
+        Parágrafos do corpo (inclusive tabelas) seguidos dos de cada cabeçalho e rodapé,
+        em ordem de rId: a mesma ordem no protótipo e nas cópias.
+        """
+        yield from document.element.body.iter(_W_P)
+        rels = document.part.rels
+        for rId in sorted(rels):
+            rel = rels[rId]
+            if rel.reltype in _HEADER_FOOTER_RELTYPES and not rel.is_external:
+                yield from rel.target_part.element.iter(_W_P)
+
+    def new_document(self):
+        """
+        Retorna uma cópia independente do documento protótipo.
+        """
+        return copy.deepcopy(self.prototype)
+
+    def apply(self, document, replacements):
+        """
+        Aplica as substituições, apenas nos parágrafos indexados, a uma cópia obtida por new_document().
+        """
+        wanted = set(self.locations)
+        for index, element in enumerate(self._paragraph_elements(document)):
+            if index in wanted:
+                _replace_in_paragraph(element, self.pattern, replacements)
+        return document
+
+    def render(self, replacements):
+        """
+        Cria uma cópia do modelo e aplica as substituições.
+        """
+        return self.apply(self.new_document(), replacements)
+
+
+class TemplateCache:
+    """
+    Mantém em memória o modelo .docx já carregado (descompactado e com o XML analisado).
+    A chave do cache é o caminho do arquivo e sua data de modificação: se o modelo
+    for alterado em disco, ele é recarregado automaticamente na próxima renderização.
+    Cada renderização recebe uma cópia independente do documento protótipo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}  # caminho -> (mtime_ns, tamanho, modelo compilado)
+
+    def get(self, path=None):
+        """
+        Retorna o modelo compilado, recarregando-o se o arquivo mudou em disco.
+        """
+        path = path or MODEL_PATH
+        stat = os.stat(path)
+        key = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None or entry[:2] != key:
+                # python-docx (lxml incluído) só é importado no primeiro carregamento do
+                # modelo: importar este módulo não custa nada na inicialização da interface
+                from docx import Document
+
+                entry = (key[0], key[1], CompiledTemplate(Document(path)))
+                self._entries[path] = entry
+            return entry[2]
+
+    def get_document(self, path=None):
+        """
+        Retorna uma cópia do documento modelo pronta para receber as substituições.
+        """
+        return self.get(path).new_document()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_template_cache = TemplateCache()
+
+
+def _reserve_output_path(directory, base_name, extension=".docx"):
+    """
+    Reserva um nome de arquivo ainda inexistente (Nome.docx, Nome_2.docx, ...).
+    A criação exclusiva evita que duas gerações no mesmo segundo, inclusive em
+    processos diferentes, gravem no mesmo arquivo. A pasta é criada se não existir.
+    """
+    os.makedirs(directory, exist_ok=True)
+    counter = 1
+    while True:
+        suffix = "" if counter == 1 else f"_{counter}"
+        path = os.path.join(directory, f"{base_name}{suffix}{extension}")
+        try:
+            with open(path, 'x'):
+                return path
+        except FileExistsError:
+            counter += 1
+
+
+def default_file_name(data):
+    """
+    Nome base (sem extensão) do documento gerado para os dados informados.
+    """
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return f"Declaracao_{data.get('nome_paciente', 'Paciente').replace(' ', '_')}_{timestamp}"
+
+
+def render_document(data, model_path=None):
+    """
+    Renderiza a declaração inteiramente em memória e retorna um BytesIO posicionado
+    no início, pronto para ser gravado em disco, anexado a um e-mail, incluído em
+    um .zip ou enviado como resposta HTTP. Use getbuffer() para obter um memoryview
+    sem cópia. Erros de renderização são propagados ao chamador.
+    """
+    with span("docx.modelo"):
+        template = _template_cache.get(model_path or MODEL_PATH)
+        document = template.new_document()
+    with span("docx.substituicao"):
+        template.apply(document, build_replacements(data))
+    with span("docx.serializar"):
+        buffer = io.BytesIO()
+        document.save(buffer)
+        buffer.seek(0)
+    return buffer
+
+
+def save_document(content, base_name, output_dir=None, extension=".docx"):
+    """
+    Grava o conteúdo renderizado (BytesIO, bytes ou memoryview) com um nome
+    exclusivo em 'output_dir' (padrão: OUTPUT_DIR) e retorna o caminho.
+    """
+    if isinstance(content, io.BytesIO):
+        content = content.getbuffer()
+    output_path = _reserve_output_path(output_dir or OUTPUT_DIR, base_name, extension)
+    with span("docx.salvar"):
         try:
+            with open(output_path, 'wb') as f:
+                f.write(content)
+        except Exception:
+            # Não deixa para trás o arquivo vazio (ou incompleto) criado pela reserva do nome
+            try:
+                os.remove(output_path)
+            except OSError:
+                pass
+            raise
+    return output_path
+
+
+def open_document(path):
+    """
+    Abre o arquivo no editor padrão do sistema. Retorna False se não foi possível.
+    """
+    import subprocess
+
+    try:
+        with span("docx.abrir_arquivo"):
             if os.name == 'nt': # Para Windows
-                os.startfile(output_path)
+                os.startfile(path)
             elif os.uname().sysname == 'Darwin': # Para macOS
-                subprocess.Popen(['open', output_path])
+                subprocess.Popen(['open', path])
             else: # Para Linux
-                subprocess.Popen(['xdg-open', output_path])
-            print(f"Abrindo arquivo: {output_path}")
-        except Exception as e:
-            print(f"Não foi possível abrir o arquivo automaticamente: {e}")
-            print("Por favor, abra-o manualmente em:", output_path)
+                subprocess.Popen(['xdg-open', path])
+        print(f"Abrindo arquivo: {path}")
+        return True
+    except Exception as e:
+        print(f"Não foi possível abrir o arquivo automaticamente: {e}")
+        print("Por favor, abra-o manualmente em:", path)
+        return False
 
-        return output_path
 
+def generate_document(data, open_file=True, output_dir=None):
+    """
+    Renderiza a declaração (render_document), salva o novo documento (em OUTPUT_DIR
+    ou 'output_dir') e, se 'open_file' for verdadeiro, abre-o no editor padrão.
+    Retorna o caminho do arquivo ou None em caso de erro.
+    """
+    try:
+        content = render_document(data)
+        output_path = save_document(content, default_file_name(data), output_dir)
     except Exception as e:
         print(f"Erro ao gerar documento: {e}")
-        return None
\ No newline at end of file
+        return None
+
+    if open_file:
+        open_document(output_path)
+    return output_path
@@ -0,0 +1,117 @@
+"""
+Medição de tempo por etapa do fluxo de geração de declarações.
+
+Uso:
+    with span("docx.salvar"):
+        document.save(path)
+
+As durações ficam em memória (últimas amostras de cada etapa) e podem ser
+consultadas com snapshot() ou gravadas em JSON com dump_json().
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Quantidade de amostras mantidas por etapa para o cálculo dos percentis
+MAX_SAMPLES = 1000
+
+
+class StageStats:
+    """
+    Agrega as durações de cada etapa: contagem, total e as últimas amostras
+    (usadas para p50/p95). Seguro para uso por várias threads.
+    """
+
+    def __init__(self, max_samples=MAX_SAMPLES):
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._stages = {}  # etapa -> [contagem, total, máximo, amostras]
+
+    def record(self, stage, seconds):
+        with self._lock:
+            entry = self._stages.get(stage)
+            if entry is None:
+                entry = self._stages[stage] = [0, 0.0, 0.0, deque(maxlen=self.max_samples)]
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+            entry[3].append(seconds)
+
+    @staticmethod
+    def _percentile(ordered, fraction):
+        if not ordered:
+            return 0.0
+        index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+        return ordered[index]
+
+    def snapshot(self):
+        """
+        Retorna {etapa: {count, total_ms, mean_ms, p50_ms, p95_ms, max_ms}}.
+        """
+        with self._lock:
+            items = [(stage, entry[0], entry[1], entry[2], sorted(entry[3])) for stage, entry in self._stages.items()]
+        result = {}
+        for stage, count, total, maximum, ordered in sorted(items):
+            result[stage] = {
+                "count": count,
+                "total_ms": round(total * 1000, 3),
+                "mean_ms": round(total / count * 1000, 3) if count else 0.0,
+                "p50_ms": round(self._percentile(ordered, 0.50) * 1000, 3),
+                "p95_ms": round(self._percentile(ordered, 0.95) * 1000, 3),
+                "max_ms": round(maximum * 1000, 3),
+            }
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+
+
+_stats = StageStats()
+
+
+@contextmanager
+def span(stage):
+    """
+    Mede o tempo do bloco e o registra na etapa 'stage' (também em caso de exceção).
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _stats.record(stage, time.perf_counter() - started)
+
+def record(stage, seconds):
+    _stats.record(stage, seconds)
+
+def snapshot():
+    return _stats.snapshot()
+
+def reset():
+    _stats.reset()
+
+def dump_json(path):
+    """
+    Grava as estatísticas atuais em 'path' (JSON).
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "stages": snapshot()}, f, ensure_ascii=False, indent=2)
+
+def dump_json_on_exit(path):
+    """
+    Agenda a gravação das estatísticas em 'path' ao encerrar o processo.
+    """
+    def _dump():
+        if _stats.snapshot():
+            try:
+                dump_json(path)
+            except OSError as e:
+                print(f"Não foi possível gravar as métricas em {path}: {e}")
+    atexit.register(_dump)
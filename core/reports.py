@@ -0,0 +1,83 @@
+"""
+Relatórios de afastamento lidos apenas das tabelas de resumo (migração 6):
+dias de afastamento por empresa, por CID e por médico. Os resumos são mantidos
+por gatilhos a cada gravação, então o custo das consultas depende do número de
+empresas/CIDs/meses, e não do tamanho do histórico de atestados.
+"""
+from core.database import db_cursor, rebuild_summaries
+
+# Dimensões por mês: nome do relatório -> (tabela de resumo, coluna agrupada)
+MONTHLY_SUMMARIES = {
+    "empresas": ("resumo_empresa_mes", "empresa"),
+    "cids": ("resumo_cid_mes", "codigo_cid"),
+}
+
+
+def _period_filter(mes_inicio, mes_fim):
+    conditions, params = [], []
+    if mes_inicio:
+        conditions.append("mes >= ?")
+        params.append(mes_inicio)
+    if mes_fim:
+        conditions.append("mes <= ?")
+        params.append(mes_fim)
+    return conditions, params
+
+
+def monthly_summary(report, mes_inicio=None, mes_fim=None, por_mes=False, limit=None):
+    """
+    Atestados e dias de afastamento por empresa ou CID ('report' = 'empresas' ou 'cids'),
+    no período de meses 'mes_inicio'..'mes_fim' (aaaa-mm, inclusivos).
+    Com 'por_mes', uma linha por (chave, mês) em ordem cronológica; senão, totais
+    do período por chave, dos maiores para os menores em dias.
+    """
+    table, key = MONTHLY_SUMMARIES[report]
+    conditions, params = _period_filter(mes_inicio, mes_fim)
+    where = " WHERE " + " AND ".join(conditions) if conditions else ""
+    if por_mes:
+        sql = f"SELECT {key} AS chave, mes, atestados, dias FROM {table}{where} ORDER BY mes, dias DESC"
+    else:
+        sql = (f"SELECT {key} AS chave, SUM(atestados) AS atestados, SUM(dias) AS dias FROM {table}{where}"
+               f" GROUP BY {key} ORDER BY dias DESC, chave")
+    if limit:
+        sql += " LIMIT ?"
+        params.append(limit)
+    with db_cursor() as cursor:
+        cursor.execute(sql, params)
+        return [dict(row) for row in cursor.fetchall()]
+
+
+def monthly_totals(mes_inicio=None, mes_fim=None):
+    """
+    Atestados e dias de afastamento de todas as empresas, mês a mês.
+    """
+    conditions, params = _period_filter(mes_inicio, mes_fim)
+    where = " WHERE " + " AND ".join(conditions) if conditions else ""
+    with db_cursor() as cursor:
+        cursor.execute(f"SELECT mes, SUM(atestados) AS atestados, SUM(dias) AS dias FROM resumo_empresa_mes{where} GROUP BY mes ORDER BY mes", params)
+        return [dict(row) for row in cursor.fetchall()]
+
+
+def doctor_summary(limit=None):
+    """
+    Atestados e dias de afastamento por médico (todo o histórico), dos maiores para os menores.
+    """
+    sql = '''
+        SELECT COALESCE(m.nome_completo, '') AS chave, m.tipo_crm, m.crm, m.uf_crm, r.atestados, r.dias
+        FROM resumo_medico r LEFT JOIN medicos m ON m.id = r.medico_id
+        ORDER BY r.dias DESC, chave
+    '''
+    params = []
+    if limit:
+        sql += " LIMIT ?"
+        params.append(limit)
+    with db_cursor() as cursor:
+        cursor.execute(sql, params)
+        return [dict(row) for row in cursor.fetchall()]
+
+
+def rebuild():
+    """
+    Reconstrução completa dos resumos a partir dos atestados. Retorna o tempo gasto em segundos.
+    """
+    return rebuild_summaries()
@@ -0,0 +1,401 @@
+"""
+Camada de serviço sem dependência de Qt: consultas de preenchimento automático,
+persistência e geração de declarações. Usada pela interface gráfica, pelo
+processamento em lote e pela linha de comando.
+"""
+import csv
+import os
+import threading
+
+from core.archive import get_archive
+from core.cache import LRUCache
+from core.database import (
+    DATA_FIM_SQL, bulk_import_doctors, bulk_import_patients, db_cursor, find_overlaps, leave_end_date,
+    normalize_cpf, save_or_update_data
+)
+from core.validation import fold_name, to_iso_date, validate_declaration_data
+
+
+# --- Consultas para preenchimento automático ---
+# Pacientes e médicos mudam pouco: as buscas passam por caches LRU em memória.
+# Só resultados encontrados são guardados (um CPF ainda inexistente é sempre consultado
+# no banco). As gravações feitas por save_declaration invalidam as entradas afetadas;
+# alterações vindas de fora do processo são tratadas por clear_entity_cache().
+
+_patient_cache = LRUCache(maxsize=2048)
+_doctor_cache = LRUCache(maxsize=512)
+
+def _fetch_one(query, params):
+    with db_cursor() as cursor:
+        cursor.execute(query, params)
+        row = cursor.fetchone()
+    return dict(row) if row else None
+
+def _cached_lookup(cache, key, query, params):
+    row = cache.get(key)
+    if row is None:
+        row = _fetch_one(query, params)
+        if row is None:
+            return None
+        cache.put(key, row)
+    return dict(row)
+
+def find_patient_by_cpf(cpf):
+    """
+    Retorna o paciente com o CPF informado (somente dígitos) ou None.
+    """
+    return _cached_lookup(_patient_cache, ("cpf", cpf), "SELECT * FROM pacientes WHERE cpf = ?", (cpf,))
+
+def find_patient_by_name(name):
+    """
+    Retorna o paciente com o nome completo exato ou None.
+    """
+    return _cached_lookup(_patient_cache, ("nome", name), "SELECT * FROM pacientes WHERE nome_completo = ?", (name,))
+
+def find_doctor_by_registro(tipo_registro, numero_registro):
+    """
+    Retorna o médico com o tipo e número de registro informados ou None.
+    """
+    return _cached_lookup(
+        _doctor_cache, ("registro", tipo_registro, numero_registro),
+        "SELECT * FROM medicos WHERE tipo_crm = ? AND crm = ?", (tipo_registro, numero_registro)
+    )
+
+def find_doctor_by_name(name):
+    """
+    Retorna o médico com o nome completo exato ou None.
+    """
+    return _cached_lookup(_doctor_cache, ("nome", name), "SELECT * FROM medicos WHERE nome_completo = ?", (name,))
+
+def invalidate_patient(cpf, nome=None):
+    """
+    Remove do cache as entradas do paciente (por CPF e por nome, inclusive o nome antigo).
+    """
+    _patient_cache.invalidate(("cpf", cpf))
+    _patient_cache.invalidate_where(lambda row: row["cpf"] == cpf)
+    if nome is not None:
+        _patient_cache.invalidate(("nome", nome))
+
+def invalidate_doctor(tipo_registro, numero_registro, nome=None):
+    """
+    Remove do cache as entradas do médico (por registro e por nome, inclusive o nome antigo).
+    """
+    _doctor_cache.invalidate(("registro", tipo_registro, numero_registro))
+    _doctor_cache.invalidate_where(lambda row: row["tipo_crm"] == tipo_registro and row["crm"] == numero_registro)
+    if nome is not None:
+        _doctor_cache.invalidate(("nome", nome))
+
+def clear_entity_cache():
+    """
+    Esvazia os caches de pacientes e médicos (usado quando o banco foi alterado fora do processo).
+    """
+    _patient_cache.clear()
+    _doctor_cache.clear()
+
+# Último PRAGMA data_version visto por thread (o valor é de cada conexão)
+_seen_data_version = threading.local()
+
+def clear_entity_cache_if_changed():
+    """
+    Esvazia os caches de pacientes e médicos se o banco foi alterado por outra conexão
+    desde a última verificação feita nesta thread (na primeira, sempre). Para processos
+    de longa duração sem um momento natural de recarga, como o serviço HTTP.
+    """
+    version = get_data_version()
+    if getattr(_seen_data_version, "value", None) != version:
+        clear_entity_cache()
+        _seen_data_version.value = version
+
+def get_cache_stats():
+    """
+    Contadores de acertos/falhas dos caches de pacientes e médicos.
+    """
+    return {"pacientes": _patient_cache.stats(), "medicos": _doctor_cache.stats()}
+
+def list_patient_names():
+    """
+    Lista ordenada de nomes de pacientes (usada pelos completers).
+    """
+    with db_cursor() as cursor:
+        cursor.execute("SELECT DISTINCT nome_completo FROM pacientes ORDER BY nome_completo")
+        return [row['nome_completo'] for row in cursor.fetchall()]
+
+def search_patient_names(prefix, after=None, limit=50):
+    """
+    Página de nomes de pacientes que começam com 'prefix' (sem distinção de maiúsculas
+    nem de acentos), em ordem alfabética. 'after' é o último nome da página anterior (paginação por chave),
+    então cada página é uma busca direta no índice, sem OFFSET.
+    """
+    # Todo nome que começa com o prefixo fica entre 'prefix' e 'prefix' + maior caractere Unicode
+    prefix = fold_name(prefix)
+    upper = prefix + "\U0010ffff"
+    after = after if after is not None else ""
+    with db_cursor() as cursor:
+        cursor.execute('''
+            SELECT DISTINCT nome_completo FROM pacientes
+            WHERE nome_busca >= ? AND nome_busca < ?
+              AND (nome_busca, nome_completo) > (?, ?)
+            ORDER BY nome_busca, nome_completo
+            LIMIT ?
+        ''', (prefix, upper, fold_name(after), after, limit))
+        return [row['nome_completo'] for row in cursor.fetchall()]
+
+def list_doctor_names():
+    """
+    Lista ordenada de nomes de médicos (usada pelos completers).
+    """
+    with db_cursor() as cursor:
+        cursor.execute("SELECT DISTINCT nome_completo FROM medicos ORDER BY nome_completo")
+        return [row['nome_completo'] for row in cursor.fetchall()]
+
+
+def get_data_version():
+    """
+    Valor de PRAGMA data_version da conexão da thread atual. Ele muda sempre que
+    outra conexão (outra thread, processo ou estação) confirma uma alteração no banco.
+    """
+    with db_cursor() as cursor:
+        cursor.execute("PRAGMA data_version")
+        return cursor.fetchone()[0]
+
+
+# --- Persistência e geração ---
+
+def save_declaration(data, data_homologacao=None, allow_overlap=False):
+    """
+    Grava paciente, médico e atestado de uma declaração já validada.
+    Retorna o id do atestado criado. Lança core.validation.OverlapError se o
+    período coincidir com outro atestado do paciente e 'allow_overlap' for falso.
+    """
+    try:
+        return save_or_update_data(data, data_homologacao, allow_overlap)
+    finally:
+        invalidate_patient(normalize_cpf(data.get("cpf_paciente")), data.get("nome_paciente"))
+        invalidate_doctor(data.get("tipo_registro_medico"), data.get("crm__medico"), data.get("nome_medico"))
+
+def generate_declaration(data, open_file=False, data_homologacao=None, output_dir=None, allow_overlap=False):
+    """
+    Fluxo completo de uma declaração: valida, grava no banco, gera o .docx e o guarda
+    no arquivo de documentos (core.archive). Uma cópia é salva em 'output_dir'
+    (padrão: pasta de documentos gerados) e, se 'open_file', aberta no editor.
+    Retorna (id do atestado, caminho da cópia ou None se a geração falhou).
+    Lança core.validation.ValidationError se os dados forem inválidos.
+    """
+    # Importação tardia: python-docx só é carregado quando um documento é gerado
+    from core.document_generator import open_document, save_document
+
+    atestado_id, file_name, content = render_declaration(data, data_homologacao, allow_overlap)
+    if content is None:
+        return atestado_id, None
+    try:
+        output_path = save_document(content, os.path.splitext(file_name)[0], output_dir)
+    except OSError as e:
+        print(f"Erro ao salvar documento: {e}")
+        return atestado_id, None
+    if open_file:
+        open_document(output_path)
+    return atestado_id, output_path
+
+
+def render_declaration(data, data_homologacao=None, allow_overlap=False):
+    """
+    Como generate_declaration, mas sem gravar cópias em disco: retorna (id do atestado,
+    nome sugerido do arquivo, BytesIO com o .docx) para envio por HTTP, e-mail ou .zip.
+    O documento é guardado no arquivo de documentos e associado ao atestado.
+    O BytesIO é None se a renderização falhou (o atestado continua gravado).
+    """
+    from core.document_generator import default_file_name, render_document
+
+    data = validate_declaration_data(data)
+    atestado_id = save_declaration(data, data_homologacao, allow_overlap)
+    file_name = default_file_name(data) + ".docx"
+    try:
+        content = render_document(data)
+    except Exception as e:
+        print(f"Erro ao gerar documento: {e}")
+        return atestado_id, file_name, None
+    archive_document(atestado_id, content, file_name)
+    return atestado_id, file_name, content
+
+
+# --- Sobreposição de afastamentos ---
+
+def find_overlapping_atestados(cpf, data_atestado, qtd_dias):
+    """
+    Atestados já homologados do paciente (pelo CPF) que coincidem com o período
+    informado. Usada pela interface para avisar antes de gravar.
+    """
+    patient = find_patient_by_cpf(normalize_cpf(cpf))
+    if patient is None:
+        return []
+    data_inicio = to_iso_date(data_atestado)
+    with db_cursor() as cursor:
+        return find_overlaps(cursor, patient["id"], data_inicio, leave_end_date(data_inicio, qtd_dias or 1))
+
+def iter_overlapping_atestados():
+    """
+    Auditoria de todo o histórico em uma única varredura ordenada por paciente e
+    data de início (idx_atestados_paciente_data), em vez de comparar todos os pares:
+    para cada paciente guarda o atestado que termina mais tarde até o momento e
+    acusa cada atestado que começa antes desse término. Gera tuplas
+    (atestado anterior, atestado sobreposto), com nome e CPF do paciente.
+    """
+    with db_cursor() as cursor:
+        cursor.execute(f'''
+            SELECT a.id, a.paciente_id, a.data_atestado, {DATA_FIM_SQL} AS data_fim,
+                   a.qtd_dias_atestado, a.codigo_cid, p.nome_completo AS nome_paciente, p.cpf AS cpf_paciente
+            FROM atestados a LEFT JOIN pacientes p ON p.id = a.paciente_id
+            ORDER BY a.paciente_id, a.data_atestado, a.id
+        ''')
+        current_patient = covering = None
+        for row in cursor:
+            row = dict(row)
+            if row["paciente_id"] != current_patient:
+                current_patient, covering = row["paciente_id"], row
+                continue
+            if row["data_atestado"] <= covering["data_fim"]:
+                yield covering, row
+            if row["data_fim"] > covering["data_fim"]:
+                covering = row
+
+
+# --- Arquivo de documentos ---
+
+def archive_document(atestado_id, content, file_name):
+    """
+    Guarda o .docx renderizado no arquivo de documentos e o associa ao atestado.
+    Retorna o hash do conteúdo.
+    """
+    return get_archive().put(content, atestado_id=atestado_id, file_name=file_name)
+
+def get_archived_document(atestado_id):
+    """
+    Retorna (nome do arquivo, conteúdo em bytes) do documento do atestado, ou None.
+    """
+    return get_archive().get_for_atestado(atestado_id)
+
+
+def import_patients(path):
+    """
+    Importação em massa de pacientes (ver core.database.bulk_import_patients).
+    """
+    try:
+        return bulk_import_patients(path)
+    finally:
+        _patient_cache.clear()
+
+def import_doctors(path):
+    """
+    Importação em massa de médicos (ver core.database.bulk_import_doctors).
+    """
+    try:
+        return bulk_import_doctors(path)
+    finally:
+        _doctor_cache.clear()
+
+
+# --- Histórico, exportação e estatísticas ---
+
+EXPORT_COLUMNS = (
+    "id", "data_atestado", "qtd_dias_atestado", "codigo_cid", "data_homologacao",
+    "nome_paciente", "cpf_paciente", "cargo_paciente", "empresa_paciente",
+    "nome_medico", "tipo_registro_medico", "crm__medico", "uf_crm_medico",
+)
+
+# Atestados com os dados de paciente e médico, nas colunas de EXPORT_COLUMNS
+_ATESTADOS_SELECT = '''
+    SELECT a.id, a.data_atestado, a.qtd_dias_atestado, a.codigo_cid, a.data_homologacao,
+           p.nome_completo AS nome_paciente, p.cpf AS cpf_paciente,
+           p.cargo AS cargo_paciente, p.empresa AS empresa_paciente,
+           m.nome_completo AS nome_medico, m.tipo_crm AS tipo_registro_medico,
+           m.crm AS crm__medico, m.uf_crm AS uf_crm_medico
+    FROM atestados a
+    LEFT JOIN pacientes p ON p.id = a.paciente_id
+    LEFT JOIN medicos m ON m.id = a.medico_id
+'''
+
+def iter_atestados():
+    """
+    Percorre todos os atestados com os dados de paciente e médico, sem carregar tudo em memória.
+    """
+    with db_cursor() as cursor:
+        cursor.execute(_ATESTADOS_SELECT + " ORDER BY a.id")
+        for row in cursor:
+            yield dict(row)
+
+def search_atestados(paciente=None, empresa=None, cid=None, data_inicio=None, data_fim=None,
+                     after_id=None, limit=200):
+    """
+    Página do histórico de atestados, do mais recente para o mais antigo, com os
+    dados de paciente e médico. Filtros opcionais (combinados com E):
+    'paciente' (início do nome ou do CPF), 'empresa' (início do nome), 'cid'
+    (início do código) e período 'data_inicio'/'data_fim' (aaaa-mm-dd ou dd/mm/aaaa,
+    inclusivos). As datas do resultado vêm como gravadas (aaaa-mm-dd).
+    'after_id' é o id do último atestado da página anterior (paginação por chave).
+    """
+    conditions, params = [], []
+    if after_id is not None:
+        conditions.append("a.id < ?")
+        params.append(after_id)
+    if paciente:
+        # Pacientes resolvidos primeiro por faixa de índice (CPF ou nome sem distinção
+        # de maiúsculas e acentos); os atestados vêm de idx_atestados_paciente_data
+        digits = normalize_cpf(paciente)
+        if digits and digits == paciente.replace(".", "").replace("-", "").strip():
+            conditions.append("a.paciente_id IN (SELECT id FROM pacientes WHERE cpf >= ? AND cpf < ?)")
+            params += [digits, digits + "\U0010ffff"]
+        else:
+            prefix = fold_name(paciente.strip())
+            conditions.append("a.paciente_id IN (SELECT id FROM pacientes WHERE nome_busca >= ? AND nome_busca < ?)")
+            params += [prefix, prefix + "\U0010ffff"]
+    if empresa:
+        # Empresa e CID por faixa de índice (idx_pacientes_empresa, idx_atestados_cid),
+        # em vez de LIKE, que percorreria a tabela inteira na ordem de a.id
+        prefix = empresa.strip()
+        conditions.append(
+            "a.paciente_id IN (SELECT id FROM pacientes"
+            " WHERE empresa COLLATE NOCASE >= ? AND empresa COLLATE NOCASE < ?)"
+        )
+        params += [prefix, prefix + "\U0010ffff"]
+    if cid:
+        prefix = cid.strip().upper()
+        conditions.append("a.codigo_cid >= ? AND a.codigo_cid < ?")
+        params += [prefix, prefix + "\U0010ffff"]
+    if data_inicio:
+        conditions.append("a.data_atestado >= ?")
+        params.append(to_iso_date(data_inicio))
+    if data_fim:
+        conditions.append("a.data_atestado <= ?")
+        params.append(to_iso_date(data_fim))
+
+    where = " WHERE " + " AND ".join(conditions) if conditions else ""
+    with db_cursor() as cursor:
+        cursor.execute(_ATESTADOS_SELECT + where + " ORDER BY a.id DESC LIMIT ?", (*params, limit))
+        return [dict(row) for row in cursor.fetchall()]
+
+def export_atestados(output_file):
+    """
+    Exporta os atestados para CSV (separador ';'). Retorna a quantidade de linhas exportadas.
+    'output_file' é um arquivo texto já aberto.
+    """
+    writer = csv.DictWriter(output_file, fieldnames=EXPORT_COLUMNS, delimiter=';')
+    writer.writeheader()
+    count = 0
+    for row in iter_atestados():
+        writer.writerow(row)
+        count += 1
+    return count
+
+def get_stats():
+    """
+    Contagens gerais do banco de dados.
+    """
+    with db_cursor() as cursor:
+        stats = {}
+        for table in ("pacientes", "medicos", "atestados"):
+            cursor.execute(f"SELECT COUNT(*) FROM {table}")
+            stats[table] = cursor.fetchone()[0]
+        cursor.execute("SELECT COALESCE(SUM(qtd_dias_atestado), 0) FROM atestados")
+        stats["dias_afastamento"] = cursor.fetchone()[0]
+    stats["arquivo"] = get_archive().stats()
+    return stats
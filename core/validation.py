@@ -0,0 +1,194 @@
+import unicodedata
+from datetime import date, datetime
+
+from core.cid10 import get_catalog, normalize_code
+
+# Campos obrigatórios da declaração e o nome exibido ao usuário
+REQUIRED_FIELDS = {
+    "nome_paciente": "Nome do Paciente",
+    "cpf_paciente": "CPF do Paciente",
+    "data_atestado": "Data do Atestado",
+    "qtd_dias_atestado": "Dias Afastados",
+    "codigo_cid": "CID",
+    "nome_medico": "Nome do Médico",
+    "tipo_registro_medico": "Tipo de Registro do Médico",
+    "crm__medico": "Número de Registro do Médico",
+    "uf_crm_medico": "UF do Registro do Médico"
+}
+
+# Todos os campos aceitos no dicionário de dados da declaração
+DECLARATION_FIELDS = (
+    "nome_paciente",
+    "cpf_paciente",
+    "cargo_paciente",
+    "empresa_paciente",
+    "data_atestado",
+    "qtd_dias_atestado",
+    "codigo_cid",
+    "nome_medico",
+    "tipo_registro_medico",
+    "crm__medico",
+    "uf_crm_medico",
+)
+
+
+class ValidationError(ValueError):
+    """
+    Erro de validação dos dados de uma declaração.
+    'title' e 'status_message' são usados pela interface para exibir o erro.
+    """
+
+    def __init__(self, message, field=None, title="Campos Obrigatórios", status_message=None):
+        super().__init__(message)
+        self.field = field
+        self.title = title
+        self.status_message = status_message or message
+
+
+class OverlapError(ValidationError):
+    """
+    O atestado cobre dias já cobertos por outro atestado homologado do mesmo paciente.
+    'overlaps' lista os atestados existentes (dicionários com id, data_atestado,
+    data_fim, qtd_dias_atestado e codigo_cid).
+    """
+
+    def __init__(self, overlaps):
+        self.overlaps = overlaps
+        periods = "; ".join(
+            f"nº {item['id']}: {format_date_br(item['data_atestado'])} a {format_date_br(item['data_fim'])}"
+            for item in overlaps
+        )
+        super().__init__(
+            f"O período do atestado coincide com atestado(s) já homologado(s) deste paciente ({periods}).",
+            field="data_atestado",
+            title="Atestados Sobrepostos",
+            status_message="Atenção: período sobreposto a atestado já homologado."
+        )
+
+
+def fold_name(text):
+    """
+    Nome em minúsculas e sem acentos ("Ícaro João" -> "icaro joao"), gravado em
+    pacientes.nome_busca para a busca por início do nome. COLLATE NOCASE do SQLite
+    só ignora maiúsculas de letras ASCII.
+    """
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).lower()
+
+
+def format_cpf(cpf):
+    """
+    Formata um CPF com 11 dígitos como XXX.XXX.XXX-XX (outros valores são devolvidos como vieram).
+    """
+    digits = ''.join(filter(str.isdigit, cpf or ''))
+    if len(digits) != 11:
+        return cpf
+    return f"{digits[:3]}.{digits[3:6]}.{digits[6:9]}-{digits[9:]}"
+
+
+# Datas são gravadas e trafegam internamente em ISO 8601 (aaaa-mm-dd), que ordena como
+# texto e permite consultas por período nos índices; dd/mm/aaaa é só para exibição.
+DATE_FORMAT_ISO = "%Y-%m-%d"
+DATE_FORMAT_BR = "%d/%m/%Y"
+
+
+def parse_date(text):
+    """
+    Converte uma data em aaaa-mm-dd ou dd/mm/aaaa para datetime.date.
+    Lança ValueError se o texto não estiver em nenhum dos dois formatos.
+    """
+    if isinstance(text, date):
+        return text
+    text = (text or '').strip()
+    for date_format in (DATE_FORMAT_ISO, DATE_FORMAT_BR):
+        try:
+            return datetime.strptime(text, date_format).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Data inválida: {text!r}")
+
+
+def to_iso_date(text):
+    """
+    Data (aaaa-mm-dd ou dd/mm/aaaa) no formato gravado no banco: aaaa-mm-dd.
+    """
+    return parse_date(text).strftime(DATE_FORMAT_ISO)
+
+
+def format_date_br(text):
+    """
+    Formata uma data como dd/mm/aaaa para exibição (valores inválidos são devolvidos como vieram).
+    """
+    try:
+        return parse_date(text).strftime(DATE_FORMAT_BR)
+    except ValueError:
+        return text
+
+
+def validate_declaration_data(data):
+    """
+    Valida os dados de uma declaração e retorna uma cópia normalizada (textos sem
+    espaços nas pontas, 'qtd_dias_atestado' como inteiro positivo, 'data_atestado' em
+    aaaa-mm-dd e 'codigo_cid' no formato A00/A00.0; a data pode ser informada como
+    dd/mm/aaaa ou aaaa-mm-dd). Com o catálogo da CID-10 presente, o CID precisa constar nele.
+    Lança ValidationError no primeiro campo inválido encontrado.
+    """
+    data = {key: (value.strip() if isinstance(value, str) else value) for key, value in data.items()}
+
+    cpf_para_validacao = ''.join(filter(str.isdigit, data.get("cpf_paciente") or ''))
+
+    for key, display_name in REQUIRED_FIELDS.items():
+        if not data.get(key) or (key == "cpf_paciente" and len(cpf_para_validacao) != 11):
+            raise ValidationError(
+                f"O campo '{display_name}' é obrigatório ou está incompleto.",
+                field=key,
+                status_message=f"Erro: Campo '{display_name}' não preenchido."
+            )
+
+    try:
+        data["qtd_dias_atestado"] = int(data.get("qtd_dias_atestado", 0))
+    except (TypeError, ValueError):
+        raise ValidationError(
+            "O campo 'Dias Afastados' deve ser um número inteiro.",
+            field="qtd_dias_atestado",
+            title="Erro de Entrada",
+            status_message="Erro: Dias Afastados inválido."
+        )
+    # Zero ou negativo deixaria o fim do afastamento antes do início (sobreposição e resumos)
+    if data["qtd_dias_atestado"] < 1:
+        raise ValidationError(
+            "O campo 'Dias Afastados' deve ser de pelo menos 1 dia.",
+            field="qtd_dias_atestado",
+            title="Erro de Entrada",
+            status_message="Erro: Dias Afastados inválido."
+        )
+
+    try:
+        data["data_atestado"] = to_iso_date(data["data_atestado"])
+    except ValueError:
+        raise ValidationError(
+            "O campo 'Data do Atestado' deve estar no formato dd/mm/aaaa.",
+            field="data_atestado",
+            title="Erro de Entrada",
+            status_message="Erro: Data do Atestado inválida."
+        )
+
+    codigo_cid = normalize_code(data["codigo_cid"])
+    if codigo_cid is None:
+        raise ValidationError(
+            "O campo 'CID' deve ser um código CID-10, como A00 ou F32.9.",
+            field="codigo_cid",
+            title="Erro de Entrada",
+            status_message="Erro: CID inválido."
+        )
+    catalog = get_catalog()
+    if catalog is not None and codigo_cid not in catalog:
+        raise ValidationError(
+            f"O CID '{codigo_cid}' não consta no catálogo da CID-10.",
+            field="codigo_cid",
+            title="Erro de Entrada",
+            status_message="Erro: CID não encontrado no catálogo."
+        )
+    data["codigo_cid"] = codigo_cid
+
+    return data
@@ -0,0 +1,184 @@
+"""
+Serialização das gravações no banco de dados.
+
+As gravações do processo (declarações da interface, do lote e do serviço HTTP, e o
+arquivo de documentos) não abrem cada uma a sua transação: são enfileiradas para
+uma única thread de escrita, com a sua própria conexão. O que chega enquanto uma
+transação está aberta é gravado na transação seguinte ("group commit"): um
+BEGIN IMMEDIATE e um COMMIT para o grupo todo, com cada gravação em um SAVEPOINT
+próprio, de modo que a falha de uma (ex.: atestado sobreposto) desfaz apenas a
+sua parte. As leituras continuam nas conexões de cada thread (WAL: leitores não
+esperam o escritor). A espera pela trava de escrita de outras estações que usam
+o mesmo arquivo fica a cargo do busy_timeout da conexão.
+
+Contadores (DatabaseWriter.stats): profundidade atual e máxima da fila, transações,
+gravações, maior grupo e tempo de espera pela trava. As durações por gravação
+também vão para core.instrumentation (db.espera_fila, db.espera_trava, db.grupo).
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from core.instrumentation import record
+
+# Gravações no máximo por transação
+MAX_GROUP_SIZE = 64
+
+
+class DatabaseWriter:
+    """
+    Thread de escrita única. 'connect' devolve a conexão da thread atual (a thread
+    de escrita usa sempre a mesma). As gravações são funções 'func(cursor, *args)'
+    executadas dentro da transação do grupo; o resultado (ou a exceção) de cada uma
+    é entregue só depois do COMMIT.
+    """
+
+    def __init__(self, connect, max_group_size=MAX_GROUP_SIZE):
+        self._connect = connect
+        self.max_group_size = max_group_size
+        self._queue = queue.Queue()
+        self._thread = None
+        self._cursor = None  # cursor da transação do grupo em andamento
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._counters = {}
+        self.reset_stats()
+
+    # --- Uso ---
+
+    def submit(self, func, *args):
+        """
+        Enfileira a gravação e retorna um Future com o valor devolvido por 'func'.
+        """
+        future = Future()
+        if threading.current_thread() is self._thread:
+            # Gravação feita por outra gravação: já está dentro da transação do grupo
+            future.set_result(func(self._cursor, *args))
+            return future
+        self._ensure_started()
+        self._queue.put((func, args, future, time.perf_counter()))
+        with self._stats_lock:
+            self._counters["fila_maxima"] = max(self._counters["fila_maxima"], self._queue.qsize())
+        return future
+
+    def run(self, func, *args):
+        """
+        Enfileira a gravação e espera o COMMIT. Retorna o valor devolvido por 'func'
+        ou lança a exceção que ela lançou.
+        """
+        return self.submit(func, *args).result()
+
+    def stats(self):
+        """
+        Retorna {fila, fila_maxima, transacoes, gravacoes, falhas, maior_grupo,
+        espera_trava_ms, espera_trava_max_ms}.
+        """
+        with self._stats_lock:
+            return dict(self._counters, fila=self._queue.qsize())
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._counters = {
+                "fila_maxima": 0, "transacoes": 0, "gravacoes": 0, "falhas": 0, "maior_grupo": 0,
+                "espera_trava_ms": 0.0, "espera_trava_max_ms": 0.0,
+            }
+
+    def close(self):
+        """
+        Grava o que ainda está na fila e encerra a thread de escrita.
+        """
+        with self._start_lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    # --- Thread de escrita ---
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="homologacao-escrita", daemon=True)
+                self._thread.start()
+
+    def _loop(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            group = [job]
+            stop = False
+            while len(group) < self.max_group_size:
+                try:
+                    job = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:
+                    stop = True
+                    break
+                group.append(job)
+            self._commit_group(group)
+            if stop:
+                return
+
+    def _commit_group(self, group):
+        outcomes = []
+        lock_wait = None
+        conn = cursor = None
+        try:
+            conn = self._connect()
+            self._cursor = cursor = conn.cursor()
+            started = time.perf_counter()
+            try:
+                cursor.execute("BEGIN IMMEDIATE")
+            finally:
+                lock_wait = time.perf_counter() - started
+                record("db.espera_trava", lock_wait)
+
+            for func, args, future, queued_at in group:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                record("db.espera_fila", started - queued_at)
+                cursor.execute("SAVEPOINT gravacao")
+                try:
+                    result = func(cursor, *args)
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO gravacao")
+                    cursor.execute("RELEASE gravacao")
+                    outcomes.append((future, None, e))
+                else:
+                    cursor.execute("RELEASE gravacao")
+                    outcomes.append((future, result, None))
+            conn.commit()
+            record("db.grupo", time.perf_counter() - started)
+        except Exception as e:
+            # Falha da transação inteira (trava não obtida, disco cheio...): nenhuma gravação do grupo vale
+            if conn is not None and conn.in_transaction:
+                conn.rollback()
+            outcomes = []
+            for _, _, future, _ in group:
+                if future.running() or future.set_running_or_notify_cancel():
+                    outcomes.append((future, None, e))
+        finally:
+            if cursor is not None:
+                cursor.close()
+            self._cursor = None
+
+        failures = sum(1 for _, _, error in outcomes if error is not None)
+        with self._stats_lock:
+            counters = self._counters
+            counters["transacoes"] += 1
+            counters["gravacoes"] += len(outcomes) - failures
+            counters["falhas"] += failures
+            counters["maior_grupo"] = max(counters["maior_grupo"], len(group))
+            if lock_wait is not None:
+                counters["espera_trava_ms"] += lock_wait * 1000
+                counters["espera_trava_max_ms"] = max(counters["espera_trava_max_ms"], lock_wait * 1000)
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
@@ -1,13 +1,136 @@
+"""
+Ponto de entrada da interface gráfica.
+
+A janela é exibida o mais cedo possível: só o PyQt5 e a própria janela são
+carregados antes do primeiro desenho. As migrações do banco e a carga dos
+completers acontecem logo depois, já com a janela na tela, e o python-docx só
+é importado na primeira geração de declaração.
+
+Modo de perfil da inicialização (mede cada etapa, imprime o relatório e encerra;
+código de saída 1 se o tempo até a janela ficar interativa passar do alvo):
+    python main.py --perfil-inicializacao [--alvo-ms 1500]
+Para o detalhamento por módulo importado:
+    python -X importtime main.py --perfil-inicializacao
+"""
+import argparse
+import os
 import sys
-from PyQt5.QtWidgets import QApplication
-from ui.main_window import MainWindow
-from core.database import create_tables
+import time
+
+_STARTED = time.perf_counter()
+
+from core.instrumentation import dump_json_on_exit, record, snapshot, span
+
+# Arquivo onde os tempos por etapa são gravados ao sair (modo de depuração)
+METRICS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'metricas_desempenho.json')
+
+# Tempo máximo (ms) desde o início de main.py até a janela ficar interativa
+STARTUP_TARGET_MS = 1500
+
+# Etapas exibidas no relatório do modo de perfil, na ordem em que acontecem
+STARTUP_STAGES = (
+    ("startup.importar_qt", "Importação do PyQt5"),
+    ("startup.qapplication", "Criação da QApplication"),
+    ("startup.importar_interface", "Importação da interface"),
+    ("startup.janela", "Construção da janela"),
+    ("startup.primeiro_desenho", "Exibição e primeiro desenho"),
+    ("startup.ate_primeiro_desenho", "Total até o primeiro desenho"),
+    ("startup.banco", "Verificação/migração do banco"),
+    ("startup.dados_iniciais", "Carga dos completers"),
+    ("startup.ate_interativo", "Total até a janela interativa"),
+)
+
+
+def parse_arguments(argv):
+    """
+    Separa as opções próprias da aplicação das opções repassadas ao Qt.
+    """
+    parser = argparse.ArgumentParser(description="Sistema de Homologação de Atestados Médicos")
+    parser.add_argument("--perfil-inicializacao", action="store_true",
+                        default=bool(os.environ.get("HOMOLOGACAO_PERFIL_INICIALIZACAO")),
+                        help="Mede as etapas da inicialização, imprime o relatório e encerra")
+    parser.add_argument("--alvo-ms", type=float, default=STARTUP_TARGET_MS,
+                        help="Tempo máximo até a janela ficar interativa no modo de perfil")
+    return parser.parse_known_args(argv[1:])
+
+
+def configure_metrics():
+    # HOMOLOGACAO_DEBUG=1 exibe o painel de desempenho e grava as métricas ao sair;
+    # HOMOLOGACAO_METRICS_FILE escolhe outro arquivo de saída.
+    metrics_file = os.environ.get("HOMOLOGACAO_METRICS_FILE") or (METRICS_FILE if os.environ.get("HOMOLOGACAO_DEBUG") else None)
+    if metrics_file:
+        dump_json_on_exit(metrics_file)
+
+
+def build_window(qt_argv):
+    """
+    Cria a QApplication e a janela principal (sem consultas ao banco).
+    """
+    with span("startup.importar_qt"):
+        from PyQt5.QtWidgets import QApplication
+    with span("startup.qapplication"):
+        app = QApplication(qt_argv)
+    with span("startup.importar_interface"):
+        from ui.main_window import MainWindow
+    with span("startup.janela"):
+        window = MainWindow()
+    return app, window
 
-if __name__ == "__main__":
-    # Garante que as tabelas do banco de dados sejam criadas (ou verificadas)
-    create_tables()
 
-    app = QApplication(sys.argv)
-    window = MainWindow()
-    window.show()
-    sys.exit(app.exec_())
\ No newline at end of file
+def show_window(app, window):
+    with span("startup.primeiro_desenho"):
+        window.show()
+        # Entrega os eventos de exibição e desenho antes de seguir com a inicialização
+        app.processEvents()
+    record("startup.ate_primeiro_desenho", time.perf_counter() - _STARTED)
+
+
+def finish_startup(window):
+    """
+    Etapas adiadas para depois do primeiro desenho: banco de dados e completers.
+    """
+    from core.database import create_tables
+
+    with span("startup.banco"):
+        # Garante que as tabelas do banco de dados sejam criadas (ou verificadas)
+        create_tables()
+    with span("startup.dados_iniciais"):
+        window.load_initial_data()
+    record("startup.ate_interativo", time.perf_counter() - _STARTED)
+
+
+def print_startup_report(target_ms):
+    """
+    Imprime o tempo de cada etapa e retorna True se o total ficou dentro do alvo.
+    """
+    stats = snapshot()
+    print("Perfil da inicialização:")
+    for stage, label in STARTUP_STAGES:
+        if stage in stats:
+            print(f"  {label:<34} {stats[stage]['total_ms']:9.1f} ms")
+    total = stats["startup.ate_interativo"]["total_ms"]
+    within_target = total <= target_ms
+    print(f"Alvo: {target_ms:.0f} ms — {'OK' if within_target else 'ACIMA DO ALVO'}")
+    return within_target
+
+
+def main(argv=None):
+    args, qt_arguments = parse_arguments(sys.argv if argv is None else argv)
+    configure_metrics()
+
+    app, window = build_window([sys.argv[0]] + qt_arguments)
+    show_window(app, window)
+
+    from PyQt5.QtCore import QTimer
+
+    def deferred():
+        finish_startup(window)
+        if args.perfil_inicializacao:
+            app.exit(0 if print_startup_report(args.alvo_ms) else 1)
+
+    QTimer.singleShot(0, deferred)
+    return app.exec_()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
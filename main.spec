@@ -1,16 +1,27 @@
 # -*- mode: python ; coding: utf-8 -*-
+import os
 
+datas = [('models', 'models'), ('data\\homologacao.db', 'data'), ('data\\generated_documents', 'data\\generated_documents'), ('assets', 'assets')]
+
+# Catálogo da CID-10 (python -m core cid10 importar): opcional. Sem ele o executável
+# funciona, mas o campo CID fica sem autocompletar e é conferido só quanto ao formato
+if os.path.exists(os.path.join('data', 'cid10.csv')):
+    datas.append(('data\\cid10.csv', 'data'))
+else:
+    print("AVISO: data/cid10.csv não encontrado; o executável será gerado sem o catálogo da CID-10. "
+          "Gere-o com 'python -m core cid10 importar CID10CSV.zip' para incluí-lo.")
 
 a = Analysis(
     ['main.py'],
     pathex=[],
     binaries=[],
-    datas=[('models', 'models'), ('data\\homologacao.db', 'data'), ('data\\generated_documents', 'data\\generated_documents'), ('assets', 'assets')],
+    datas=datas,
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # Módulos não usados pela aplicação: menos arquivos a extrair a cada execução do executável one-file
+    excludes=['tkinter', 'unittest', 'pydoc_data', 'test', 'PyQt5.QtWebEngineWidgets', 'PyQt5.QtWebEngineCore', 'PyQt5.QtQml', 'PyQt5.QtQuick', 'PyQt5.QtMultimedia', 'PyQt5.QtSql'],
     noarchive=False,
     optimize=0,
 )
@@ -26,7 +37,8 @@ exe = EXE(
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
+    # Binários comprimidos com UPX são descompactados a cada inicialização
+    upx=False,
     upx_exclude=[],
     runtime_tmpdir=None,
     console=False,
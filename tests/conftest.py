@@ -0,0 +1,15 @@
+import pytest
+
+from core import database
+
+
+@pytest.fixture
+def temp_database(tmp_path):
+    """
+    Banco de dados vazio e descartável (com o esquema atual) durante o teste.
+    """
+    previous = database.DB_FILE
+    database.configure_database(str(tmp_path / "homologacao.db"))
+    database.create_tables()
+    yield database
+    database.configure_database(previous)
@@ -0,0 +1,42 @@
+import asyncio
+import json
+
+from core.api import HomologacaoServer, Request
+
+DECLARATION = {
+    "nome_paciente": "Ana Souza",
+    "cpf_paciente": "529.982.247-25",
+    "cargo_paciente": "Auxiliar",
+    "empresa_paciente": "Empresa Teste",
+    "data_atestado": "01/03/2024",
+    "qtd_dias_atestado": "2",
+    "codigo_cid": "J11",
+    "nome_medico": "Dr. Teste",
+    "tipo_registro_medico": "CRM",
+    "crm__medico": "12345",
+    "uf_crm_medico": "DF",
+}
+
+
+def post(server, payload):
+    async def run():
+        server._slots = asyncio.Semaphore(server.max_concurrent)
+        request = Request("POST", "/declaracoes", {}, {}, json.dumps(payload).encode("utf-8"))
+        return await server.dispatch(request)
+
+    server.start_pools()
+    try:
+        return asyncio.run(run())
+    finally:
+        server.shutdown_pools()
+
+
+def test_invalid_data_homologacao_returns_422(temp_database):
+    response = post(HomologacaoServer(max_concurrent=1), dict(DECLARATION, data_homologacao="31/02/2024"))
+
+    assert response.status == 422
+    body = json.loads(response.body)
+    assert body["campo"] == "data_homologacao"
+    with temp_database.db_cursor() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM atestados")
+        assert cursor.fetchone()[0] == 0
@@ -0,0 +1,34 @@
+from core import services
+from core.validation import validate_declaration_data
+
+DECLARATION = {
+    "cpf_paciente": "529.982.247-25",
+    "cargo_paciente": "Auxiliar",
+    "empresa_paciente": "Empresa Teste",
+    "data_atestado": "01/03/2024",
+    "qtd_dias_atestado": "2",
+    "codigo_cid": "J11",
+    "nome_medico": "Dr. Teste",
+    "tipo_registro_medico": "CRM",
+    "crm__medico": "12345",
+    "uf_crm_medico": "DF",
+}
+
+
+def test_search_patient_names_ignores_case_and_accents(temp_database, tmp_path):
+    services.save_declaration(validate_declaration_data(dict(DECLARATION, nome_paciente="Ícaro Araújo")))
+    roster = tmp_path / "pacientes.csv"
+    roster.write_text(
+        "nome_completo,cpf,cargo,empresa\n"
+        "João Conceição,11144477735,Cargo,Empresa\n"
+        "Joana Lima,39053344705,Cargo,Empresa\n",
+        encoding="utf-8",
+    )
+    services.import_patients(str(roster))
+
+    assert services.search_patient_names("ícaro") == ["Ícaro Araújo"]
+    assert services.search_patient_names("icaro ARAU") == ["Ícaro Araújo"]
+    assert services.search_patient_names("JOÃO") == ["João Conceição"]
+    assert services.search_patient_names("joa") == ["Joana Lima", "João Conceição"]
+    assert services.search_patient_names("joa", after="Joana Lima") == ["João Conceição"]
+    assert [row["nome_paciente"] for row in services.search_atestados(paciente="icaro")] == ["Ícaro Araújo"]
@@ -0,0 +1,154 @@
+from bisect import bisect_left
+
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, QStringListModel
+
+
+class SortedStringListModel(QStringListModel):
+    """
+    QStringListModel mantido em ordem e sem duplicatas, atualizado de forma incremental.
+    Uma cópia da lista em Python permite localizar a posição de cada nome com bisect,
+    sem chamar stringList() (que copia a lista inteira) nem reiniciar o modelo.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._names = []
+
+    def set_names(self, names):
+        """
+        Substitui todo o conteúdo (recarga completa). 'names' já deve estar ordenada.
+        """
+        self._names = list(names)
+        self.setStringList(self._names)
+
+    def add_name(self, name):
+        """
+        Insere 'name' na posição ordenada. Retorna False se ele já estava na lista.
+        """
+        if not name:
+            return False
+        pos = bisect_left(self._names, name)
+        if pos < len(self._names) and self._names[pos] == name:
+            return False
+        self._names.insert(pos, name)
+        self.insertRows(pos, 1, QModelIndex())
+        self.setData(self.index(pos), name)
+        return True
+
+    def remove_name(self, name):
+        """
+        Remove 'name' da lista. Retorna False se ele não estava presente.
+        """
+        pos = bisect_left(self._names, name)
+        if pos >= len(self._names) or self._names[pos] != name:
+            return False
+        del self._names[pos]
+        self.removeRows(pos, 1, QModelIndex())
+        return True
+
+    def __contains__(self, name):
+        pos = bisect_left(self._names, name)
+        return pos < len(self._names) and self._names[pos] == name
+
+    def __len__(self):
+        return len(self._names)
+
+
+class PrefixQueryListModel(QAbstractListModel):
+    """
+    Modelo de lista preguiçoso para completers de tabelas grandes.
+    Não guarda a tabela inteira: mantém apenas as páginas já buscadas para o
+    prefixo digitado, obtidas por 'query(prefix, after, limit)'. A view pede
+    novas páginas por canFetchMore/fetchMore conforme o usuário rola a lista.
+    """
+
+    def __init__(self, query, page_size=50, min_prefix_length=1, parent=None):
+        super().__init__(parent)
+        self._query = query
+        self.page_size = page_size
+        self.min_prefix_length = min_prefix_length
+        self._prefix = None
+        self._names = []
+        self._exhausted = True
+        # O QCompleter chama fetchMore a cada reset/inserção do modelo de origem, o que
+        # encadearia a busca de todas as páginas; chamadas aninhadas são ignoradas.
+        self._busy = False
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._names)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or not 0 <= index.row() < len(self._names):
+            return None
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            return self._names[index.row()]
+        return None
+
+    def _fetch_page(self):
+        after = self._names[-1] if self._names else None
+        page = self._query(self._prefix, after, self.page_size)
+        self._exhausted = len(page) < self.page_size
+        return page
+
+    def set_prefix(self, prefix):
+        """
+        Troca o prefixo e carrega a primeira página correspondente.
+        """
+        prefix = (prefix or "").strip()
+        if prefix == self._prefix:
+            return
+        self._busy = True
+        try:
+            self.beginResetModel()
+            self._prefix = prefix
+            self._names = []
+            self._exhausted = True
+            if len(prefix) >= self.min_prefix_length:
+                self._names = self._fetch_page()
+            self.endResetModel()
+        finally:
+            self._busy = False
+
+    def refresh(self):
+        """
+        Descarta as páginas carregadas e busca novamente o prefixo atual.
+        """
+        prefix, self._prefix = self._prefix, None
+        self.set_prefix(prefix)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted and not self._busy
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted or self._busy:
+            return
+        self._busy = True
+        try:
+            page = self._fetch_page()
+            if not page:
+                return
+            first = len(self._names)
+            self.beginInsertRows(QModelIndex(), first, first + len(page) - 1)
+            self._names.extend(page)
+            self.endInsertRows()
+        finally:
+            self._busy = False
+
+
+class CodeDescriptionListModel(PrefixQueryListModel):
+    """
+    PrefixQueryListModel de sugestões 'código - descrição' (catálogo da CID-10):
+    a lista exibe a sugestão inteira e o completer insere no campo só o código.
+    """
+
+    def __init__(self, query, separator=" - ", page_size=50, min_prefix_length=1, parent=None):
+        super().__init__(query, page_size, min_prefix_length, parent)
+        self.separator = separator
+
+    def data(self, index, role=Qt.DisplayRole):
+        value = super().data(index, role)
+        if role == Qt.EditRole and value is not None:
+            return value.split(self.separator, 1)[0]
+        return value
@@ -0,0 +1,72 @@
+from PyQt5.QtCore import QObject, QTimer
+
+
+class Debouncer(QObject):
+    """
+    Agrupa chamadas repetidas em uma só: cada trigger() reinicia a contagem e a
+    função só é executada depois de 'delay_ms' sem novos disparos. Como a função lê
+    o estado atual dos campos ao executar, apenas a consulta mais recente é feita.
+    Os contadores registram quantas execuções foram evitadas.
+    """
+
+    def __init__(self, callback, delay_ms=300, parent=None):
+        super().__init__(parent)
+        self._callback = callback
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._run)
+        self.set_delay(delay_ms)
+        self.requested = 0
+        self.executed = 0
+        self.cancelled = 0
+
+    def set_delay(self, delay_ms):
+        self._timer.setInterval(max(0, int(delay_ms)))
+
+    def delay(self):
+        return self._timer.interval()
+
+    def trigger(self):
+        """
+        Agenda (ou reagenda) a execução.
+        """
+        self.requested += 1
+        self._timer.start()
+
+    def cancel(self):
+        """
+        Descarta a execução pendente, se houver.
+        """
+        if self._timer.isActive():
+            self._timer.stop()
+            self.cancelled += 1
+
+    def flush(self):
+        """
+        Executa imediatamente a chamada pendente, se houver.
+        """
+        if self._timer.isActive():
+            self._timer.stop()
+            self._run()
+
+    def is_pending(self):
+        return self._timer.isActive()
+
+    def _run(self):
+        self.executed += 1
+        self._callback()
+
+    @property
+    def saved(self):
+        # Disparos que não viraram execução (agrupados ou cancelados)
+        pending = 1 if self._timer.isActive() else 0
+        return self.requested - self.executed - pending
+
+    def stats(self):
+        return {
+            "delay_ms": self.delay(),
+            "requested": self.requested,
+            "executed": self.executed,
+            "cancelled": self.cancelled,
+            "saved": self.saved,
+        }
@@ -0,0 +1,172 @@
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt, pyqtSignal
+
+from core.validation import format_cpf, format_date_br
+from ui.workers import QueryWorker
+
+
+class HistoryTableModel(QAbstractTableModel):
+    """
+    Modelo de tabela virtual para o histórico de atestados.
+    As linhas chegam em páginas por 'query(after_id=..., limit=..., **filtros)',
+    paginadas pelo id do último atestado carregado (sem OFFSET): a view pede uma nova
+    página por canFetchMore/fetchMore quando a rolagem chega ao fim do que já foi
+    carregado, então só ficam em memória as linhas que o usuário realmente percorreu.
+    Com 'pool' (QThreadPool), as páginas são buscadas fora da thread da interface.
+    """
+
+    # Mensagem de erro quando a consulta de uma página falha
+    loadFailed = pyqtSignal(str)
+
+    # (chave do resultado, título da coluna)
+    COLUMNS = (
+        ("id", "Nº"),
+        ("data_atestado", "Data do Atestado"),
+        ("nome_paciente", "Paciente"),
+        ("cpf_paciente", "CPF"),
+        ("empresa_paciente", "Empresa"),
+        ("cargo_paciente", "Cargo"),
+        ("codigo_cid", "CID"),
+        ("qtd_dias_atestado", "Dias"),
+        ("nome_medico", "Médico"),
+        ("registro_medico", "Registro"),
+        ("data_homologacao", "Homologação"),
+    )
+
+    def __init__(self, query, page_size=200, parent=None, pool=None):
+        super().__init__(parent)
+        self._query = query
+        self._pool = pool
+        # Incrementada a cada troca de filtros; identifica as respostas já superadas
+        self._generation = 0
+        self.page_size = page_size
+        self._filters = {}
+        self._rows = []
+        self._exhausted = True
+        self._busy = False
+
+    @staticmethod
+    def _to_row(record):
+        # Tuplas já formatadas para exibição ocupam menos memória que os dicionários
+        registro = f"{record['tipo_registro_medico'] or ''} {record['crm__medico'] or ''}-{record['uf_crm_medico'] or ''}"
+        values = dict(
+            record,
+            cpf_paciente=format_cpf(record["cpf_paciente"] or ""),
+            data_atestado=format_date_br(record["data_atestado"]),
+            data_homologacao=format_date_br(record["data_homologacao"]),
+            registro_medico=registro.strip(" -"),
+        )
+        return tuple("" if values[key] is None else values[key] for key, _ in HistoryTableModel.COLUMNS)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.COLUMNS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or not 0 <= index.row() < len(self._rows):
+            return None
+        if role == Qt.DisplayRole:
+            return str(self._rows[index.row()][index.column()])
+        if role == Qt.TextAlignmentRole and self.COLUMNS[index.column()][0] in ("id", "qtd_dias_atestado"):
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUMNS[section][1]
+        return None
+
+    def atestado_id(self, row):
+        """
+        Id do atestado exibido na linha 'row'.
+        """
+        return self._rows[row][0]
+
+    def has_more(self):
+        """
+        Indica se ainda há páginas a carregar com os filtros atuais.
+        """
+        return not self._exhausted
+
+    def filters(self):
+        return dict(self._filters)
+
+    def _request_page(self, reset):
+        """
+        Pede uma página ao 'query'. Com um pool de threads a consulta roda em um
+        QueryWorker e o resultado chega por sinal na thread da interface; sem pool,
+        roda na hora. Respostas de uma geração de filtros anterior são descartadas.
+        """
+        self._busy = True
+        after_id = None if reset or not self._rows else self._rows[-1][0]
+        kwargs = dict(self._filters, after_id=after_id, limit=self.page_size)
+        context = {"geracao": self._generation, "reiniciar": reset}
+        if self._pool is None:
+            try:
+                page = self._query(**kwargs)
+            except Exception as e:
+                self._page_failed(context, str(e))
+                return
+            self._page_loaded(dict(context, resultado=page))
+            return
+        worker = QueryWorker(self._query, kwargs, context)
+        worker.signals.succeeded.connect(self._page_loaded)
+        worker.signals.failed.connect(self._page_failed)
+        self._pool.start(worker)
+
+    def _page_loaded(self, result):
+        if result["geracao"] != self._generation:
+            return
+        self._busy = False
+        page = result["resultado"]
+        self._exhausted = len(page) < self.page_size
+        if result["reiniciar"]:
+            self.beginResetModel()
+            self._rows = [self._to_row(record) for record in page]
+            self.endResetModel()
+        elif page:
+            first = len(self._rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(page) - 1)
+            self._rows.extend(self._to_row(record) for record in page)
+            self.endInsertRows()
+
+    def _page_failed(self, context, message):
+        if context["geracao"] != self._generation:
+            return
+        self._busy = False
+        self._exhausted = True
+        self.loadFailed.emit(message)
+
+    def is_loading(self):
+        """
+        Indica se há uma página sendo carregada.
+        """
+        return self._busy
+
+    def set_filters(self, **filters):
+        """
+        Aplica os filtros (valores vazios são ignorados) e carrega a primeira página.
+        As linhas atuais continuam visíveis até a nova página chegar.
+        """
+        self._generation += 1
+        self._filters = {key: value for key, value in filters.items() if value}
+        self._request_page(reset=True)
+
+    def refresh(self):
+        """
+        Descarta as páginas carregadas e busca novamente com os filtros atuais.
+        """
+        self.set_filters(**self._filters)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted and not self._busy
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted or self._busy:
+            return
+        self._request_page(reset=False)
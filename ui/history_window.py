@@ -0,0 +1,160 @@
+import os
+
+from PyQt5.QtWidgets import (
+    QAbstractItemView, QCheckBox, QDateEdit, QDialog, QGridLayout, QHBoxLayout,
+    QHeaderView, QLabel, QLineEdit, QMessageBox, QPushButton, QTableView, QVBoxLayout
+)
+from PyQt5.QtCore import QDate, Qt, QThreadPool
+
+from core import services
+from ui.debounce import Debouncer
+from ui.history_model import HistoryTableModel
+
+
+class HistoryDialog(QDialog):
+    """
+    Janela de histórico de homologações: tabela paginada sob demanda com filtros
+    por paciente (nome ou CPF), empresa, CID e período da data do atestado.
+    Um duplo clique abre a declaração arquivada do atestado.
+    """
+
+    # Espera (ms) após a última tecla antes de refazer a consulta
+    FILTER_DELAY_MS = 300
+    ROW_HEIGHT = 24
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Histórico de Homologações")
+        self.resize(1100, 600)
+
+        # As páginas são consultadas no pool de workers da janela principal,
+        # para a janela não congelar em filtros que percorrem muitos atestados
+        pool = getattr(parent, "worker_pool", None) or QThreadPool.globalInstance()
+        self.model = HistoryTableModel(services.search_atestados, parent=self, pool=pool)
+        self.model.modelReset.connect(self.update_count)
+        self.model.modelReset.connect(self.table_scroll_to_top)
+        self.model.rowsInserted.connect(self.update_count)
+        self.model.loadFailed.connect(self.show_load_error)
+        self.filter_debouncer = Debouncer(self.apply_filters, self.FILTER_DELAY_MS, self)
+
+        layout = QVBoxLayout(self)
+        layout.addLayout(self.create_filters())
+
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setAlternatingRowColors(True)
+        self.table.setWordWrap(False)
+        # Altura fixa: a view não precisa medir cada linha ao rolar
+        vertical_header = self.table.verticalHeader()
+        vertical_header.setVisible(False)
+        vertical_header.setSectionResizeMode(QHeaderView.Fixed)
+        vertical_header.setDefaultSectionSize(self.ROW_HEIGHT)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.doubleClicked.connect(self.open_document)
+        layout.addWidget(self.table)
+
+        footer = QHBoxLayout()
+        self.count_label = QLabel()
+        footer.addWidget(self.count_label)
+        footer.addStretch()
+        refresh_button = QPushButton("Atualizar")
+        refresh_button.clicked.connect(self.refresh)
+        footer.addWidget(refresh_button)
+        close_button = QPushButton("Fechar")
+        close_button.clicked.connect(self.close)
+        footer.addWidget(close_button)
+        layout.addLayout(footer)
+
+        self.apply_filters()
+        self.set_column_widths()
+
+    def create_filters(self):
+        grid = QGridLayout()
+        self.patient_filter = QLineEdit(placeholderText="Nome ou CPF")
+        self.company_filter = QLineEdit(placeholderText="Empresa")
+        self.cid_filter = QLineEdit(placeholderText="Ex.: J11")
+        for line_edit in (self.patient_filter, self.company_filter, self.cid_filter):
+            line_edit.setClearButtonEnabled(True)
+            line_edit.textChanged.connect(self.filter_debouncer.trigger)
+
+        self.period_filter = QCheckBox("Período:")
+        self.start_date = QDateEdit(QDate.currentDate().addMonths(-1), calendarPopup=True)
+        self.end_date = QDateEdit(QDate.currentDate(), calendarPopup=True)
+        for date_edit in (self.start_date, self.end_date):
+            date_edit.setDisplayFormat("dd/MM/yyyy")
+            date_edit.setEnabled(False)
+            date_edit.dateChanged.connect(self.filter_debouncer.trigger)
+        self.period_filter.toggled.connect(self.start_date.setEnabled)
+        self.period_filter.toggled.connect(self.end_date.setEnabled)
+        self.period_filter.toggled.connect(self.filter_debouncer.trigger)
+
+        grid.addWidget(QLabel("Paciente:"), 0, 0)
+        grid.addWidget(self.patient_filter, 0, 1)
+        grid.addWidget(QLabel("Empresa:"), 0, 2)
+        grid.addWidget(self.company_filter, 0, 3)
+        grid.addWidget(QLabel("CID:"), 0, 4)
+        grid.addWidget(self.cid_filter, 0, 5)
+        grid.addWidget(self.period_filter, 1, 0)
+        grid.addWidget(self.start_date, 1, 1)
+        grid.addWidget(QLabel("até"), 1, 2, alignment=Qt.AlignCenter)
+        grid.addWidget(self.end_date, 1, 3)
+        return grid
+
+    def set_column_widths(self):
+        widths = {"id": 60, "data_atestado": 110, "nome_paciente": 220, "cpf_paciente": 120, "empresa_paciente": 160,
+                  "cargo_paciente": 120, "codigo_cid": 60, "qtd_dias_atestado": 50, "nome_medico": 200}
+        for column, (key, _) in enumerate(HistoryTableModel.COLUMNS):
+            if key in widths:
+                self.table.setColumnWidth(column, widths[key])
+
+    def current_filters(self):
+        filters = {
+            "paciente": self.patient_filter.text().strip(),
+            "empresa": self.company_filter.text().strip(),
+            "cid": self.cid_filter.text().strip(),
+        }
+        if self.period_filter.isChecked():
+            filters["data_inicio"] = self.start_date.date().toString(Qt.ISODate)
+            filters["data_fim"] = self.end_date.date().toString(Qt.ISODate)
+        return filters
+
+    def apply_filters(self):
+        self.model.set_filters(**self.current_filters())
+        self.update_count()
+
+    def refresh(self):
+        self.model.refresh()
+        self.update_count()
+
+    def table_scroll_to_top(self):
+        self.table.scrollToTop()
+
+    def show_load_error(self, message):
+        self.count_label.setText(f"Erro ao consultar o histórico: {message}")
+
+    def update_count(self):
+        if self.model.is_loading():
+            self.count_label.setText("Carregando...")
+            return
+        loaded = self.model.rowCount()
+        more = " (role para carregar mais)" if self.model.has_more() else ""
+        self.count_label.setText(f"{loaded} atestado(s) exibido(s){more}")
+
+    def open_document(self, index):
+        """
+        Abre no editor uma cópia da declaração arquivada do atestado da linha
+        (gravada em data/generated_documents).
+        """
+        # Importação tardia: python-docx só é carregado quando necessário
+        from core.document_generator import open_document, save_document
+
+        atestado_id = self.model.atestado_id(index.row())
+        entry = services.get_archived_document(atestado_id)
+        if entry is None:
+            QMessageBox.information(self, "Histórico", f"Não há declaração arquivada para o atestado nº {atestado_id}.")
+            return
+        file_name, content = entry
+        open_document(save_document(content, os.path.splitext(file_name)[0]))
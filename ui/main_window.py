@@ -4,15 +4,18 @@ from PyQt5.QtWidgets import (
     QDateEdit, QComboBox, QCompleter, QStatusBar, QSpacerItem, QSizePolicy, QFrame,
     QGridLayout, QScrollArea # Adicionado QScrollArea
 )
-from PyQt5.QtCore import Qt, QDate, QStringListModel, QUrl
-from PyQt5.QtGui import QFont, QIntValidator, QIcon, QPixmap # Adicionado QPixmap para imagem
-from PyQt5.Qt import QDesktopServices
+from PyQt5.QtCore import Qt, QDate, QEvent, QUrl, QThreadPool
+from PyQt5.QtGui import QFont, QIntValidator, QIcon, QPixmap, QDesktopServices # Adicionado QPixmap para imagem
 import os
 import sys # Necessário para sys._MEIPASS
 
 # Importa os módulos de negócio e banco de dados
-from core.database import get_db_connection
-from core.document_generator import generate_document
+from core import cid10, services
+from core.validation import validate_declaration_data, OverlapError, ValidationError
+from ui.workers import DeclarationWorker
+from ui.completer_models import CodeDescriptionListModel, PrefixQueryListModel, SortedStringListModel
+from ui.debounce import Debouncer
+from core.instrumentation import snapshot as metrics_snapshot, span
 
 # --- Função auxiliar para lidar com caminhos de recursos no PyInstaller ---
 def resource_path(relative_path):
@@ -27,6 +30,9 @@ def resource_path(relative_path):
     return os.path.join(base_path, relative_path)
 
 class MainWindow(QMainWindow):
+    # Espera (ms) após a última tecla antes de consultar CPF/registro no banco
+    AUTOFILL_DELAY_MS = 300
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Sistema de Homologação de Atestados Médicos")
@@ -35,12 +41,31 @@ class MainWindow(QMainWindow):
         self.setMinimumSize(850, 700) 
 
         self.is_autofilling = False
+        self.history_dialog = None
+
+        # Pool de threads para gerar declarações sem travar a interface
+        self.worker_pool = QThreadPool(self)
+        self.worker_pool.setMaxThreadCount(2)
+        # Threads permanentes: cada thread abre a sua conexão com o banco, e uma thread
+        # recriada depois de ociosa (padrão: 30 s) abriria uma conexão nova a cada vez
+        self.worker_pool.setExpiryTimeout(-1)
+        self.pending_generations = 0
+
+        # Consultas de preenchimento automático agrupadas enquanto o usuário digita
+        self.cpf_lookup_debouncer = Debouncer(self.autofill_patient_by_cpf, self.AUTOFILL_DELAY_MS, self)
+        self.registro_lookup_debouncer = Debouncer(self.autofill_doctor_by_registro, self.AUTOFILL_DELAY_MS, self)
 
         # Configurar a barra de status
         self._statusBar = QStatusBar()
         self.setStatusBar(self._statusBar)
         self.update_status("Sistema pronto.")
 
+        # Painel de desempenho (tempos por etapa) na barra de status, apenas em modo de depuração
+        self.performance_label = None
+        if os.environ.get("HOMOLOGACAO_DEBUG"):
+            self.performance_label = QLabel("Desempenho: sem medições", objectName="performanceLabel")
+            self._statusBar.addPermanentWidget(self.performance_label)
+
         # --- Adicionar o ícone da janela ---
         # O PyInstaller usa o --icon= argument, mas para a janela em si
         # precisamos definir programaticamente.
@@ -221,7 +246,7 @@ class MainWindow(QMainWindow):
         
         # Conectar eventos de autofill
         self.nome_paciente_input.editingFinished.connect(self.autofill_patient_by_name_exact)
-        self.cpf_paciente_input.textEdited.connect(self.autofill_patient_by_cpf)
+        self.cpf_paciente_input.textEdited.connect(self.schedule_patient_cpf_lookup)
 
         return patient_frame
 
@@ -250,7 +275,8 @@ class MainWindow(QMainWindow):
         # Linha 2 (Dias Afastados)
         atestado_grid_layout.addWidget(QLabel("Dias Afastados:", objectName="formLabel", alignment=Qt.AlignRight | Qt.AlignVCenter), 2, 0)
         self.qtd_dias_atestado_input = QLineEdit(placeholderText="Número de dias")
-        self.qtd_dias_atestado_input.setValidator(QIntValidator())
+        # Apenas inteiros positivos (a validação também rejeita zero)
+        self.qtd_dias_atestado_input.setValidator(QIntValidator(1, 2147483647))
         atestado_grid_layout.addWidget(self.qtd_dias_atestado_input, 2, 1)
         
         # Linha 3 (CID)
@@ -320,8 +346,8 @@ class MainWindow(QMainWindow):
         
         # Conectar eventos de autofill para médico
         self.nome_medico_input.editingFinished.connect(self.autofill_doctor_by_name_exact)
-        self.numero_registro_medico_input.textEdited.connect(self.autofill_doctor_by_registro)
-        self.tipo_registro_medico_combo.currentIndexChanged.connect(self.autofill_doctor_by_registro)
+        self.numero_registro_medico_input.textEdited.connect(self.schedule_doctor_registro_lookup)
+        self.tipo_registro_medico_combo.currentIndexChanged.connect(self.schedule_doctor_registro_lookup)
         
         return medico_frame
 
@@ -340,6 +366,10 @@ class MainWindow(QMainWindow):
         self.clear_button.clicked.connect(self.clear_fields)
         button_layout.addWidget(self.clear_button)
 
+        self.history_button = QPushButton("Histórico", objectName="historyButton")
+        self.history_button.clicked.connect(self.open_history)
+        button_layout.addWidget(self.history_button)
+
         self.exit_button = QPushButton("Sair", objectName="exitButton")
         self.exit_button.clicked.connect(self.close)
         button_layout.addWidget(self.exit_button)
@@ -712,50 +742,167 @@ class MainWindow(QMainWindow):
 
     # --- Métodos de Lógica e Funcionalidade (Inalterados, mantidos na versão anterior) ---
     def setup_completers(self):
-        self.patient_name_model = QStringListModel()
+        # Pacientes: modelo paginado consultado por prefixo (a tabela pode ter centenas de milhares de nomes)
+        self.patient_name_model = PrefixQueryListModel(services.search_patient_names, parent=self)
         self.patient_completer = QCompleter(self.patient_name_model, self)
         self.patient_completer.setCaseSensitivity(Qt.CaseInsensitive)
+        # O modelo já vem filtrado pelo banco; o completer só exibe as linhas carregadas
+        self.patient_completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
         self.nome_paciente_input.setCompleter(self.patient_completer)
+        self.nome_paciente_input.textEdited.connect(self.update_patient_completer_prefix)
         self.patient_completer.activated.connect(self.autofill_patient_by_name_selected)
         
-        self.doctor_name_model = QStringListModel()
+        self.doctor_name_model = SortedStringListModel(self)
         self.doctor_completer = QCompleter(self.doctor_name_model, self)
         self.doctor_completer.setCaseSensitivity(Qt.CaseInsensitive)
         self.nome_medico_input.setCompleter(self.doctor_completer)
         self.doctor_completer.activated.connect(self.autofill_doctor_by_name_selected)
 
+        # Os dados vêm do banco depois do primeiro desenho da janela (load_initial_data)
+        self.known_data_version = None
+
+        # CID: o catálogo da CID-10 só é carregado quando o campo recebe o foco pela primeira vez
+        self.cid_completer = None
+        self.codigo_cid_input.installEventFilter(self)
+        self.codigo_cid_input.editingFinished.connect(self.show_cid_description)
+
+    def eventFilter(self, watched, event):
+        if watched is self.codigo_cid_input and event.type() == QEvent.FocusIn and self.cid_completer is None:
+            self.setup_cid_completer()
+        return super().eventFilter(watched, event)
+
+    def setup_cid_completer(self):
+        """
+        Carrega o catálogo da CID-10 e liga o autocompletar por código ou descrição ao campo CID.
+        """
+        self.codigo_cid_input.removeEventFilter(self)
+        with span("gui.cid10_completer"):
+            catalog = cid10.get_catalog()
+        if catalog is None:
+            # Sem catálogo o campo continua livre (validado só quanto ao formato)
+            error = cid10.get_catalog_error()
+            if error:
+                QMessageBox.warning(self, "Catálogo CID-10", f"{error}\n\nO CID será conferido apenas quanto ao formato.")
+            return
+        self.cid_model = CodeDescriptionListModel(catalog.suggestions, separator=cid10.SUGGESTION_SEPARATOR, parent=self)
+        self.cid_completer = QCompleter(self.cid_model, self)
+        self.cid_completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.codigo_cid_input.setCompleter(self.cid_completer)
+        self.codigo_cid_input.textEdited.connect(self.update_cid_completer_prefix)
+        self.cid_completer.activated.connect(self.show_cid_description)
+
+    def update_cid_completer_prefix(self, text):
+        self.cid_model.set_prefix(text)
+        if self.cid_model.rowCount():
+            self.cid_completer.complete()
+        else:
+            self.cid_completer.popup().hide()
+
+    def show_cid_description(self, *args):
+        """
+        Mostra a descrição do CID digitado (dica do campo e barra de status).
+        """
+        catalog = cid10.get_catalog() if self.cid_completer is not None else None
+        code = self.codigo_cid_input.text().strip()
+        description = catalog.describe(code) if catalog is not None and code else None
+        self.codigo_cid_input.setToolTip(description or "")
+        if description:
+            self.update_status(f"CID {cid10.normalize_code(code)}: {description}")
+        elif catalog is not None and code:
+            self.update_status(f"Atenção: CID '{code}' não encontrado no catálogo da CID-10.")
+
+    def load_initial_data(self):
+        """
+        Carga inicial dos completers, feita depois que a janela já foi exibida.
+        """
+        with span("gui.completers_carga_inicial"):
+            self.reload_completers()
+
+    def reload_completers(self):
+        """
+        Recarga completa dos dois completers a partir do banco.
+        """
         self.load_patient_names_for_completer()
         self.load_doctor_names_for_completer()
+        self.known_data_version = services.get_data_version()
+
+    def refresh_completers_if_changed(self):
+        """
+        Recarrega os completers somente se o banco foi alterado por outra conexão
+        (outra estação de trabalho, lote, linha de comando) desde a última sincronização.
+        """
+        if services.get_data_version() != self.known_data_version:
+            services.clear_entity_cache()
+            with span("gui.completers_recarga"):
+                self.reload_completers()
+
+    def update_completers_after_save(self, result):
+        """
+        Atualiza os completers de forma incremental após gravar uma declaração.
+        Médicos: insere o nome novo (ou renomeado) na posição ordenada e remove o nome
+        antigo se nenhum outro registro ainda o utiliza. Pacientes: refaz só a página atual.
+        """
+        data = result["data"]
+        previous_doctor = result.get("nome_medico_anterior")
+
+        # O modelo de pacientes é paginado: basta refazer a busca do prefixo em uso
+        self.patient_name_model.refresh()
+
+        if previous_doctor and previous_doctor != data["nome_medico"] and not services.find_doctor_by_name(previous_doctor):
+            self.doctor_name_model.remove_name(previous_doctor)
+        self.doctor_name_model.add_name(data["nome_medico"])
+
+        # A gravação do worker usa outra conexão: registra a nova versão como já sincronizada
+        self.known_data_version = services.get_data_version()
 
     def load_patient_names_for_completer(self):
-        self.update_status("Carregando nomes de pacientes...")
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT DISTINCT nome_completo FROM pacientes ORDER BY nome_completo")
-        names = [row['nome_completo'] for row in cursor.fetchall()]
-        conn.close()
-        self.patient_name_model.setStringList(names)
-        self.update_status("Nomes de pacientes carregados.")
+        # O modelo de pacientes não carrega a lista inteira: apenas refaz a busca do prefixo atual
+        self.patient_name_model.refresh()
+
+    def update_patient_completer_prefix(self, text):
+        self.patient_name_model.set_prefix(text)
+        if self.patient_name_model.rowCount():
+            self.patient_completer.complete()
+        else:
+            self.patient_completer.popup().hide()
 
     def load_doctor_names_for_completer(self):
         self.update_status("Carregando nomes de médicos...")
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT DISTINCT nome_completo FROM medicos ORDER BY nome_completo")
-        names = [row['nome_completo'] for row in cursor.fetchall()]
-        conn.close()
-        self.doctor_name_model.setStringList(names)
+        names = services.list_doctor_names()
+        self.doctor_name_model.set_names(names)
         self.update_status("Nomes de médicos carregados.")
 
+    def schedule_patient_cpf_lookup(self):
+        if self.is_autofilling:
+            return
+        self.cpf_lookup_debouncer.trigger()
+
+    def schedule_doctor_registro_lookup(self):
+        if self.is_autofilling:
+            return
+        self.registro_lookup_debouncer.trigger()
+
+    def set_autofill_delay(self, delay_ms):
+        """
+        Altera o tempo de espera das consultas por CPF e por registro.
+        """
+        self.cpf_lookup_debouncer.set_delay(delay_ms)
+        self.registro_lookup_debouncer.set_delay(delay_ms)
+
+    def autofill_lookup_stats(self):
+        """
+        Contadores das consultas agrupadas (quantas foram evitadas pelo agrupamento).
+        """
+        return {
+            "cpf": self.cpf_lookup_debouncer.stats(),
+            "registro": self.registro_lookup_debouncer.stats(),
+        }
+
     def autofill_patient_by_name_selected(self, text):
         if self.is_autofilling:
             return
         self.update_status(f"Buscando dados de paciente: {text}...")
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM pacientes WHERE nome_completo = ?", (text,))
-        patient = cursor.fetchone()
-        conn.close()
+        patient = services.find_patient_by_name(text)
 
         if patient:
             self.is_autofilling = True
@@ -784,11 +931,7 @@ class MainWindow(QMainWindow):
             return
         
         self.update_status(f"Verificando paciente por nome exato: {name}...")
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM pacientes WHERE nome_completo = ?", (name,))
-        patient = cursor.fetchone()
-        conn.close()
+        patient = services.find_patient_by_name(name)
 
         if patient:
             self.is_autofilling = True
@@ -814,11 +957,7 @@ class MainWindow(QMainWindow):
             return
 
         self.update_status(f"Buscando paciente por CPF: {cpf_cleaned}...")
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM pacientes WHERE cpf = ?", (cpf_cleaned,))
-        patient = cursor.fetchone()
-        conn.close()
+        patient = services.find_patient_by_cpf(cpf_cleaned)
 
         if patient:
             self.is_autofilling = True
@@ -836,11 +975,7 @@ class MainWindow(QMainWindow):
         if self.is_autofilling:
             return
         self.update_status(f"Buscando dados de médico: {text}...")
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM medicos WHERE nome_completo = ?", (text,))
-        doctor = cursor.fetchone()
-        conn.close()
+        doctor = services.find_doctor_by_name(text)
 
         if doctor:
             self.is_autofilling = True
@@ -869,11 +1004,7 @@ class MainWindow(QMainWindow):
             return
 
         self.update_status(f"Verificando médico por nome exato: {name}...")
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM medicos WHERE nome_completo = ?", (name,))
-        doctor = cursor.fetchone()
-        conn.close()
+        doctor = services.find_doctor_by_name(name)
 
         if doctor:
             self.is_autofilling = True
@@ -903,11 +1034,7 @@ class MainWindow(QMainWindow):
             return
 
         self.update_status(f"Buscando médico por registro: {tipo_registro} {numero_registro}...")
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM medicos WHERE tipo_crm = ? AND crm = ?", (tipo_registro, numero_registro))
-        doctor = cursor.fetchone()
-        conn.close()
+        doctor = services.find_doctor_by_registro(tipo_registro, numero_registro)
 
         if doctor:
             self.is_autofilling = True
@@ -920,6 +1047,10 @@ class MainWindow(QMainWindow):
 
 
     def clear_fields(self):
+        # Consultas pendentes se referem aos dados que estão sendo apagados
+        self.cpf_lookup_debouncer.cancel()
+        self.registro_lookup_debouncer.cancel()
+
         self.nome_paciente_input.clear()
         self.cpf_paciente_input.clear()
         self.cargo_paciente_input.clear()
@@ -927,24 +1058,26 @@ class MainWindow(QMainWindow):
         self.data_atestado_input.setDate(QDate.currentDate())
         self.qtd_dias_atestado_input.clear()
         self.codigo_cid_input.clear()
+        self.codigo_cid_input.setToolTip("")
         self.nome_medico_input.clear()
         self.tipo_registro_medico_combo.setCurrentText("CRM") 
         self.numero_registro_medico_input.clear()
         self.uf_crm_input.setCurrentIndex(0)
 
-        self.load_patient_names_for_completer()
-        self.load_doctor_names_for_completer()
+        self.refresh_completers_if_changed()
         self.update_status("Campos limpos. Sistema pronto.")
 
 
-    def generate_declaration(self):
-        self.update_status("Gerando declaração... Verificando campos.")
-        data = {
+    def form_data(self):
+        """
+        Dados do formulário como digitados (sem validação).
+        """
+        return {
             "nome_paciente": self.nome_paciente_input.text().strip(),
             "cpf_paciente": self.cpf_paciente_input.text().strip(),
             "cargo_paciente": self.cargo_paciente_input.text().strip(),
             "empresa_paciente": self.empresa_paciente_input.text().strip(),
-            "data_atestado": self.data_atestado_input.date().toString("dd/MM/yyyy"),
+            "data_atestado": self.data_atestado_input.date().toString(Qt.ISODate),
             "qtd_dias_atestado": self.qtd_dias_atestado_input.text().strip(),
             "codigo_cid": self.codigo_cid_input.text().strip(),
             "nome_medico": self.nome_medico_input.text().strip(),
@@ -953,100 +1086,126 @@ class MainWindow(QMainWindow):
             "uf_crm_medico": self.uf_crm_input.currentText().strip()
         }
 
-        required_fields = {
-            "nome_paciente": "Nome do Paciente",
-            "cpf_paciente": "CPF do Paciente",
-            "data_atestado": "Data do Atestado",
-            "qtd_dias_atestado": "Dias Afastados",
-            "codigo_cid": "CID",
-            "nome_medico": "Nome do Médico",
-            "tipo_registro_medico": "Tipo de Registro do Médico",
-            "crm__medico": "Número de Registro do Médico",
-            "uf_crm_medico": "UF do Registro do Médico"
-        }
-
-        cpf_para_validacao = ''.join(filter(str.isdigit, data.get("cpf_paciente", '')))
+    def generate_declaration(self):
+        # Conclui consultas ainda pendentes para que os campos estejam preenchidos como antes
+        self.cpf_lookup_debouncer.flush()
+        self.registro_lookup_debouncer.flush()
 
-        for key, display_name in required_fields.items():
-            if not data.get(key) or (key == "cpf_paciente" and len(cpf_para_validacao) != 11):
-                QMessageBox.warning(self, "Campos Obrigatórios", f"O campo '{display_name}' é obrigatório ou está incompleto.")
-                self.update_status(f"Erro: Campo '{display_name}' não preenchido.")
-                return
+        self.update_status("Gerando declaração... Verificando campos.")
+        data = self.form_data()
 
         try:
-            data["qtd_dias_atestado"] = int(data.get("qtd_dias_atestado", 0))
-        except ValueError:
-            QMessageBox.warning(self, "Erro de Entrada", "O campo 'Dias Afastados' deve ser um número inteiro.")
-            self.update_status("Erro: Dias Afastados inválido.")
-            return
+            with span("gui.validacao"):
+                data = validate_declaration_data(data)
+        except ValidationError as e:
+            QMessageBox.warning(self, e.title, str(e))
 
-        self.update_status("Salvando dados no banco de dados...")
-        self.save_or_update_data(data)
-
-        self.load_patient_names_for_completer()
-        self.load_doctor_names_for_completer()
+            self.update_status(e.status_message)
+            return
 
-        self.update_status("Gerando arquivo DOCX...")
+        # Aviso antes de gravar: o mesmo paciente já tem atestado cobrindo algum dos dias
+        allow_overlap = False
+        with span("gui.sobreposicao"):
+            overlaps = services.find_overlapping_atestados(data["cpf_paciente"], data["data_atestado"], data["qtd_dias_atestado"])
+        if overlaps:
+            message = OverlapError(overlaps)
+            answer = QMessageBox.warning(
+                self, message.title, f"{message}\n\nDeseja homologar mesmo assim?",
+                QMessageBox.Yes | QMessageBox.No, QMessageBox.No
+            )
+            if answer != QMessageBox.Yes:
+                self.update_status(message.status_message)
+                return
+            allow_overlap = True
+
+        # Gravação, renderização e abertura do documento rodam em segundo plano;
+        # os campos só são limpos quando a declaração é gerada, para que uma falha
+        # não apague o que o operador digitou.
+        worker = DeclarationWorker(data, QDate.currentDate().toString(Qt.ISODate), allow_overlap=allow_overlap)
+        worker.signals.progress.connect(self.update_status)
+        worker.signals.succeeded.connect(self.on_declaration_generated)
+        worker.signals.failed.connect(self.on_declaration_failed)
+        self.pending_generations += 1
+        self.worker_pool.start(worker)
+
+        self.update_status(f"Gerando declaração de '{data['nome_paciente']}' em segundo plano...")
+
+    def on_declaration_generated(self, result):
+        self.pending_generations -= 1
+        with span("gui.completers"):
+            self.update_completers_after_save(result)
+        if self.form_matches(result["data"]):
+            self.clear_fields()
+        self.update_performance_panel()
+        self.update_status(f"Declaração de '{result['data']['nome_paciente']}' gerada e arquivada (atestado nº {result['atestado_id']}).")
+
+    def form_matches(self, data):
+        """
+        Indica se o formulário ainda mostra a declaração 'data' (já validada), ou seja,
+        se o operador não começou outro atestado enquanto ela era gerada.
+        """
         try:
-            output_path = generate_document(data)
-            if output_path:
-                QMessageBox.information(self, "Sucesso", f"Declaração gerada com sucesso!\nSalvo em: {output_path}")
-                self.clear_fields()
-                self.update_status("Declaração gerada e campos limpos.")
-            else:
-                QMessageBox.critical(self, "Erro", "Não foi possível gerar a declaração. Verifique o modelo e os logs.")
-                self.update_status("Falha ao gerar declaração.")
-        except Exception as e:
-            QMessageBox.critical(self, "Erro na Geração", f"Ocorreu um erro ao gerar o documento: {e}")
-            self.update_status(f"Erro crítico na geração: {e}")
+            return validate_declaration_data(self.form_data()) == data
+        except ValidationError:
+            return False
 
+    def on_declaration_failed(self, data, error):
+        self.pending_generations -= 1
+        self.update_performance_panel()
+        QMessageBox.critical(self, "Erro na Geração", f"Ocorreu um erro ao gerar a declaração de '{data.get('nome_paciente', '')}': {error}")
+        self.update_status(f"Erro crítico na geração: {error}")
 
-    def save_or_update_data(self, data):
-        self.update_status("Persistindo dados no banco de dados...")
-        conn = get_db_connection()
-        cursor = conn.cursor()
+    def closeEvent(self, event):
+        # Aguarda as declarações em andamento antes de encerrar
+        if self.pending_generations:
+            self.update_status("Aguardando a conclusão das declarações em andamento...")
+        self.worker_pool.waitForDone()
+        super().closeEvent(event)
 
-        cpf_para_db = ''.join(filter(str.isdigit, data.get("cpf_paciente", '')))
 
-        cursor.execute("SELECT id FROM pacientes WHERE cpf = ?", (cpf_para_db,))
-        patient_row = cursor.fetchone()
-
-        if patient_row:
-            cursor.execute(
-                "UPDATE pacientes SET nome_completo = ?, cargo = ?, empresa = ? WHERE id = ?",
-                (data.get("nome_paciente"), data.get("cargo_paciente"), data.get("empresa_paciente"), patient_row['id'])
-            )
-        else:
-            cursor.execute(
-                "INSERT INTO pacientes (nome_completo, cpf, cargo, empresa) VALUES (?, ?, ?, ?)",
-                (data.get("nome_paciente"), cpf_para_db, data.get("cargo_paciente"), data.get("empresa_paciente"))
-            )
+    def update_status(self, message):
+        self._statusBar.showMessage(message)
 
-        cursor.execute("SELECT id FROM medicos WHERE tipo_crm = ? AND crm = ?", (data.get("tipo_registro_medico"), data.get("crm__medico")))
-        doctor_row = cursor.fetchone()
+    # Etapas exibidas no painel resumido (as demais aparecem na dica de ferramenta)
+    PERFORMANCE_PANEL_STAGES = (
+        ("worker.total", "total"),
+        ("db.persistencia", "banco"),
+        ("db.espera_trava", "trava"),
+        ("docx.substituicao", "substituição"),
+        ("docx.serializar", "serializar"),
+        ("docx.salvar", "salvar"),
+    )
+
+    def update_performance_panel(self):
+        """
+        Atualiza o painel de desempenho com p50/p95 por etapa (se estiver habilitado).
+        """
+        if self.performance_label is None:
+            return
+        stats = metrics_snapshot()
+        parts = [
+            f"{label} {stats[stage]['p50_ms']:.1f}/{stats[stage]['p95_ms']:.1f} ms"
+            for stage, label in self.PERFORMANCE_PANEL_STAGES if stage in stats
+        ]
+        self.performance_label.setText("p50/p95: " + " | ".join(parts) if parts else "Desempenho: sem medições")
+        self.performance_label.setToolTip("\n".join(
+            f"{stage}: n={values['count']} p50={values['p50_ms']:.1f} ms p95={values['p95_ms']:.1f} ms máx={values['max_ms']:.1f} ms"
+            for stage, values in stats.items()
+        ))
+
+    def open_history(self):
+        """
+        Abre (ou traz para frente) a janela de histórico de homologações.
+        """
+        if self.history_dialog is None:
+            from ui.history_window import HistoryDialog
 
-        if doctor_row:
-            cursor.execute(
-                "UPDATE medicos SET nome_completo = ?, uf_crm = ? WHERE id = ?",
-                (data.get("nome_medico"), data.get("uf_crm_medico"), doctor_row['id'])
-            )
+            self.history_dialog = HistoryDialog(self)
         else:
-            cursor.execute(
-                "INSERT INTO medicos (nome_completo, tipo_crm, crm, uf_crm) VALUES (?, ?, ?, ?)",
-                (data.get("nome_medico"), data.get("tipo_registro_medico"), data.get("crm__medico"), data.get("uf_crm_medico"))
-            )
-
-        cursor.execute(
-            "INSERT INTO atestados (paciente_id, medico_id, data_atestado, qtd_dias_atestado, codigo_cid, data_homologacao) VALUES ((SELECT id FROM pacientes WHERE cpf = ?), (SELECT id FROM medicos WHERE tipo_crm = ? AND crm = ?), ?, ?, ?, ?)",
-            (cpf_para_db, data.get("tipo_registro_medico"), data.get("crm__medico"), data.get("data_atestado"), data.get("qtd_dias_atestado"), data.get("codigo_cid"), QDate.currentDate().toString("dd/MM/yyyy"))
-        )
-
-        conn.commit()
-        conn.close()
-        self.update_status("Dados salvos no banco de dados.")
-
-    def update_status(self, message):
-        self._statusBar.showMessage(message)
+            self.history_dialog.model.refresh()
+        self.history_dialog.show()
+        self.history_dialog.raise_()
+        self.history_dialog.activateWindow()
 
     def open_online_consultation(self):
         tipo_registro = self.tipo_registro_medico_combo.currentText().strip()
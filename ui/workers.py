@@ -0,0 +1,90 @@
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+
+from core import services
+from core.instrumentation import span
+
+
+class WorkerSignals(QObject):
+    """
+    Sinais emitidos pelos workers. QRunnable não é um QObject, então os sinais
+    ficam em um objeto separado; as conexões chegam à janela pela fila de eventos
+    da thread principal.
+    """
+    progress = pyqtSignal(str)
+    succeeded = pyqtSignal(dict)
+    failed = pyqtSignal(dict, str)
+
+
+class DeclarationWorker(QRunnable):
+    """
+    Executa fora da thread da interface o fluxo de uma declaração já validada:
+    gravação no banco, renderização do .docx, arquivamento e abertura de uma cópia no editor.
+    """
+
+    def __init__(self, data, data_homologacao=None, open_file=True, allow_overlap=False):
+        super().__init__()
+        self.data = dict(data)
+        self.data_homologacao = data_homologacao
+        self.allow_overlap = allow_overlap
+        self.open_file = open_file
+        self.signals = WorkerSignals()
+
+    def run(self):
+        with span("worker.total"):
+            self._generate()
+
+    def _generate(self):
+        # Importação tardia: python-docx é carregado apenas na primeira geração
+        from core.document_generator import default_file_name, open_document, render_document, save_document
+
+        nome = self.data.get("nome_paciente", "")
+        try:
+            self.signals.progress.emit(f"Salvando dados de '{nome}' no banco de dados...")
+            # Nome atual (antes da gravação) permite atualizar os completers sem recarga completa
+            previous_doctor = services.find_doctor_by_registro(self.data.get("tipo_registro_medico"), self.data.get("crm__medico"))
+            atestado_id = services.save_declaration(self.data, self.data_homologacao, self.allow_overlap)
+
+            self.signals.progress.emit(f"Gerando arquivo DOCX de '{nome}'...")
+            base_name = default_file_name(self.data)
+            content = render_document(self.data)
+            services.archive_document(atestado_id, content, base_name + ".docx")
+
+            # A cópia aberta no editor (que o operador pode ajustar à mão) fica em
+            # data/generated_documents, não em uma pasta temporária do sistema
+            output_path = None
+            if self.open_file:
+                output_path = save_document(content, base_name)
+                open_document(output_path)
+        except Exception as e:
+            self.signals.failed.emit(self.data, str(e))
+            return
+
+        self.signals.succeeded.emit({
+            "atestado_id": atestado_id,
+            "output_path": output_path,
+            "data": self.data,
+            "nome_medico_anterior": previous_doctor["nome_completo"] if previous_doctor else None,
+        })
+
+
+class QueryWorker(QRunnable):
+    """
+    Executa uma consulta ao banco fora da thread da interface. O resultado sai em
+    'succeeded' como {"resultado": ..., **context}; 'context' identifica o pedido
+    para quem o recebe (por exemplo, para descartar respostas já superadas).
+    """
+
+    def __init__(self, query, kwargs, context=None):
+        super().__init__()
+        self.query = query
+        self.kwargs = dict(kwargs)
+        self.context = dict(context or {})
+        self.signals = WorkerSignals()
+
+    def run(self):
+        try:
+            result = self.query(**self.kwargs)
+        except Exception as e:
+            self.signals.failed.emit(self.context, str(e))
+            return
+        self.signals.succeeded.emit(dict(self.context, resultado=result))